@@ -0,0 +1,111 @@
+"""Time server pack extraction by worker count.
+
+Builds a synthetic server pack shaped like a large modpack (a few hundred
+multi-megabyte jars among thousands of small configs and library files, 20k
+entries by default) and extracts it with ``fs_ops.extract_zip`` at 1, 2, 4,
+... workers up to the machine's core count. ``extractall`` is timed too as
+the single-threaded baseline.
+
+Usage: python benchmarks/bench_extract.py [--entries N] [--repeat N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mcserver.fs_ops import extract_zip  # noqa: E402
+
+
+def _corpus(rng: random.Random, size: int) -> bytes:
+    # Text-like content with some noise, so deflate has real work to do.
+    words = [b"minecraft", b"forge", b"config", b"true", b"false", b"0.25", b"\n"]
+    out = bytearray()
+    while len(out) < size:
+        out += rng.choice(words) + b" "
+        if rng.random() < 0.05:
+            out += rng.randbytes(16)
+    return bytes(out)
+
+
+def _make_pack(path: Path, entries: int, seed: int = 0) -> int:
+    rng = random.Random(seed)
+    corpus = _corpus(rng, 8 * 1024 * 1024)
+    total = 0
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for i in range(entries):
+            if i % 50 == 0:
+                name, size = f"Pack-Server/mods/mod{i}.jar", rng.randint(128, 1024) * 1024
+            elif i % 3 == 0:
+                name, size = f"Pack-Server/libraries/lib{i % 97}/part{i}.class", rng.randint(1, 32) * 1024
+            else:
+                name, size = f"Pack-Server/config/mod{i % 211}/cfg{i}.toml", rng.randint(100, 4096)
+            start = rng.randrange(len(corpus) - size)
+            zf.writestr(name, corpus[start : start + size])
+            total += size
+    return total
+
+
+def _time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 <= cores:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != cores:
+        counts.append(cores)
+
+    with tempfile.TemporaryDirectory(prefix="mcserver_bench_") as tmp:
+        tmp_path = Path(tmp)
+        zip_path = tmp_path / "serverpack.zip"
+        raw = _make_pack(zip_path, args.entries)
+        print(
+            f"{args.entries} entries, {raw / 1e6:.0f} MB uncompressed, "
+            f"{zip_path.stat().st_size / 1e6:.0f} MB zipped, {cores} core(s)"
+        )
+
+        def run(extract) -> float:
+            out = tmp_path / "out"
+
+            def once() -> None:
+                shutil.rmtree(out, ignore_errors=True)
+                extract(out)
+
+            return _time(once, args.repeat)
+
+        def extractall(out: Path) -> None:
+            with zipfile.ZipFile(zip_path) as zf:
+                zf.extractall(out)
+
+        baseline = run(extractall)
+        print(f"{'extractall':12s} {baseline:7.2f}s")
+        for n in counts:
+            elapsed = run(lambda out: extract_zip(zip_path, out, workers=n))
+            print(f"{'workers=' + str(n):12s} {elapsed:7.2f}s  x{baseline / elapsed:.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
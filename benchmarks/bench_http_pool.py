@@ -0,0 +1,164 @@
+"""Compare per-call urlopen against the pooled keep-alive transport.
+
+Starts a local HTTPS stand-in for the CurseForge API (self-signed cert made
+with the ``openssl`` CLI) and replays a short burst of API calls like one
+``mcserver`` command makes: a search, file listing and download-url.
+
+Usage: python benchmarks/bench_http_pool.py [--commands N] [--pool-size N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.request import Request, urlopen
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mcserver.curseforge import CurseForgeClient  # noqa: E402
+from mcserver.http_client import ConnectionPool  # noqa: E402
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self) -> None:
+        path = self.path.split("?", 1)[0]
+        if path.endswith("/download-url"):
+            payload = {"data": "https://localhost/files/serverpack.zip"}
+        elif path.endswith("/files"):
+            payload = {
+                "data": [
+                    {
+                        "id": 1000 + i,
+                        "displayName": f"Pack {i}",
+                        "fileDate": f"2024-01-{i + 1:02d}T00:00:00Z",
+                        "isServerPack": i % 2 == 1,
+                    }
+                    for i in range(20)
+                ]
+            }
+        else:
+            payload = {"data": [{"id": 1, "name": "Bench Pack"}]}
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+class _CountingServer(ThreadingHTTPServer):
+    daemon_threads = True
+    handshakes = 0
+
+    def get_request(self):  # type: ignore[override]
+        sock, addr = super().get_request()
+        self.handshakes += 1
+        return sock, addr
+
+
+def _make_cert(tmp: Path) -> tuple:
+    cert, key = tmp / "cert.pem", tmp / "key.pem"
+    subprocess.run(
+        [
+            "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes",
+            "-keyout", str(key), "-out", str(cert), "-days", "1",
+            "-subj", "/CN=localhost",
+        ],
+        check=True,
+        capture_output=True,
+    )
+    return cert, key
+
+
+def _one_command_urlopen(base: str, ctx: ssl.SSLContext) -> None:
+    headers = {"Accept": "application/json", "x-api-key": "bench"}
+    for path in (
+        "/v1/mods/search?gameId=432&pageSize=1&searchFilter=a",
+        "/v1/mods/1/files",
+        "/v1/mods/1/files/1001/download-url",
+    ):
+        with urlopen(Request(base + path, headers=headers), context=ctx) as resp:
+            json.loads(resp.read())
+
+
+def _one_command_pooled(base: str, pool: ConnectionPool) -> None:
+    cf = CurseForgeClient(api_key="bench", pool=pool)
+    cf.BASE_URL = base
+    cf.search_modpacks(query="a", page_size=1)
+    cf.resolve_server_pack_download(1)
+
+
+def _measure(server: _CountingServer, fn, commands: int) -> dict:
+    server.handshakes = 0
+    start = time.perf_counter()
+    for _ in range(commands):
+        fn()
+    elapsed = time.perf_counter() - start
+    return {
+        "handshakes_per_command": server.handshakes / commands,
+        "ms_per_command": elapsed * 1000 / commands,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--commands", type=int, default=50)
+    parser.add_argument("--pool-size", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="mcserver_bench_") as tmp:
+        cert, key = _make_cert(Path(tmp))
+        server_ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        server_ctx.load_cert_chain(cert, key)
+        server = _CountingServer(("127.0.0.1", 0), _Handler)
+        server.socket = server_ctx.wrap_socket(server.socket, server_side=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        base = f"https://localhost:{server.server_address[1]}"
+        client_ctx = ssl.create_default_context(cafile=str(cert))
+
+        results = {
+            # Each CLI invocation is a fresh process: a new pool per command.
+            "urlopen": _measure(
+                server, lambda: _one_command_urlopen(base, client_ctx), args.commands
+            ),
+            "pooled_per_command": _measure(
+                server,
+                lambda: _one_command_pooled(
+                    base,
+                    ConnectionPool(max_per_host=args.pool_size, ssl_context=client_ctx),
+                ),
+                args.commands,
+            ),
+        }
+        shared = ConnectionPool(max_per_host=args.pool_size, ssl_context=client_ctx)
+        results["pooled_shared"] = _measure(
+            server, lambda: _one_command_pooled(base, shared), args.commands
+        )
+        shared.close()
+        server.shutdown()
+
+    for name, row in results.items():
+        print(
+            f"{name:20s} handshakes/cmd={row['handshakes_per_command']:.2f}"
+            f"  ms/cmd={row['ms_per_command']:.2f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,386 @@
+"""Reproducible install/update benchmarks with JSON results.
+
+Serves two versions of a synthetic server pack from fake_curseforge.py and
+times, each ``--repeat`` times:
+
+- ``install_cold``: ``mcserver install`` into an empty dir with empty pack
+  and API response caches (lookups, segmented download, extraction);
+- ``install_cached``: the same with the server pack already in the pack cache;
+- ``update``: ``mcserver update`` of a v1 server to v2, pack cached;
+- ``extract_zip``, ``apply_update`` (the delta update), ``move_tree_contents``
+  and ``copy_tree[<mode>]`` (a pack tree copied with each ``Copier`` mode,
+  as when moving across filesystems) called directly.
+
+The commands run as fresh processes, like real invocations, with
+``--trace-json`` so each result carries its per-phase times. Results are
+written as JSON (``--output``); ``--compare`` prints them against an earlier
+file, e.g. one saved on the base commit. The page cache is not dropped
+between runs, so compare results from the same machine.
+
+Usage: python benchmarks/bench_suite.py [--entries N] [--size-mb N]
+           [--repeat N] [--only NAME,...] [--output FILE] [--compare FILE]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_curseforge import PACK_ROOT, FakeCurseForge, make_server_pack  # noqa: E402
+from mcserver.fs_ops import (  # noqa: E402
+    COPY_MODES,
+    Copier,
+    apply_update,
+    extract_zip,
+    move_tree_contents,
+    record_installed,
+)
+from mcserver.manifest import Manifest  # noqa: E402
+
+
+RESULTS_VERSION = 1
+PACK_ID = 100
+V1_FILE_ID, V2_FILE_ID = 1010, 1020
+
+# Points the CLI at the fake API, then runs it like the console script does.
+_BOOTSTRAP = (
+    "import sys\n"
+    "from mcserver.curseforge import CurseForgeClient\n"
+    "CurseForgeClient.BASE_URL = sys.argv[1]\n"
+    "from mcserver.cli import main\n"
+    "raise SystemExit(main(sys.argv[2:]))\n"
+)
+
+
+class Bench:
+    def __init__(self, work: Path, base_url: str, zips: Dict[int, Path]):
+        self.work = work
+        self.base_url = base_url
+        self.zips = zips
+        self.config_home = work / "config"
+        self.cache_home = work / "cache"
+        (self.config_home / "mcserver").mkdir(parents=True)
+        # No rate limit: the benchmark measures the tool, not the API budget.
+        (self.config_home / "mcserver" / "config.json").write_text(
+            json.dumps({"curseforgeApiKey": "bench", "apiRateLimit": 0}), encoding="utf-8"
+        )
+
+    def fresh(self, name: str) -> Path:
+        path = self.work / name
+        shutil.rmtree(path, ignore_errors=True)
+        path.mkdir(parents=True)
+        return path
+
+    def mcserver(self, *args: str, trace: Optional[Path] = None) -> None:
+        env = dict(os.environ)
+        env.update(
+            XDG_CONFIG_HOME=str(self.config_home),
+            XDG_CACHE_HOME=str(self.cache_home),
+            PYTHONPATH=str(ROOT),
+        )
+        argv = (["--trace-json", str(trace)] if trace else []) + list(args)
+        proc = subprocess.run(
+            [sys.executable, "-c", _BOOTSTRAP, self.base_url, *argv],
+            env=env,
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+            text=True,
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(
+                f"mcserver {' '.join(args)} exited {proc.returncode}:\n"
+                f"{proc.stdout}{proc.stderr}"
+            )
+
+    def install(self, server_dir: Path, file_id: int, trace: Optional[Path] = None) -> None:
+        self.mcserver(
+            "install",
+            str(PACK_ID),
+            "--file-id",
+            str(file_id),
+            "--dir",
+            str(server_dir),
+            "--no-prompt",
+            "--accept-eula",
+            trace=trace,
+        )
+
+
+def _phases(trace_path: Path) -> Dict[str, float]:
+    """Seconds per phase directly under the command's root span."""
+    spans = json.loads(trace_path.read_text(encoding="utf-8"))["spans"]
+    roots = {s["id"] for s in spans if s["parent"] is None}
+    phases: Dict[str, float] = {}
+    for s in spans:
+        if s["parent"] in roots and s["duration"] is not None:
+            phases[s["name"]] = round(phases.get(s["name"], 0.0) + s["duration"], 6)
+    return phases
+
+
+def _measure(
+    repeat: int,
+    setup: Callable[[], None],
+    run: Callable[[], object],
+    *,
+    trace: Optional[Path] = None,
+) -> dict:
+    """Time ``run`` after an untimed ``setup``, ``repeat`` times.
+
+    If ``run`` writes a ``trace`` file, the median run's phases are kept.
+    """
+    runs: List[float] = []
+    traces: List[Optional[Dict[str, float]]] = []
+    for _ in range(repeat):
+        setup()
+        start = time.perf_counter()
+        run()
+        runs.append(time.perf_counter() - start)
+        traces.append(_phases(trace) if trace else None)
+    result = {
+        "runs": [round(r, 6) for r in runs],
+        "best_s": round(min(runs), 6),
+        "median_s": round(statistics.median(runs), 6),
+    }
+    median_index = sorted(range(len(runs)), key=runs.__getitem__)[len(runs) // 2]
+    if traces[median_index]:
+        result["phases"] = traces[median_index]
+    return result
+
+
+def _end_to_end(bench: Bench, repeat: int) -> Dict[str, Callable[[], dict]]:
+    trace_path = bench.work / "trace.json"
+    server = bench.work / "server"
+
+    def clear_caches() -> None:
+        shutil.rmtree(bench.cache_home, ignore_errors=True)
+        shutil.rmtree(bench.config_home / "mcserver" / "cache", ignore_errors=True)
+
+    def install_cold() -> dict:
+        def setup() -> None:
+            clear_caches()
+            bench.fresh("server")
+
+        def run() -> None:
+            bench.install(server, V2_FILE_ID, trace_path)
+
+        return _measure(repeat, setup, run, trace=trace_path)
+
+    def install_cached() -> dict:
+        bench.install(bench.fresh("warmup"), V2_FILE_ID)
+
+        def run() -> None:
+            bench.install(server, V2_FILE_ID, trace_path)
+
+        return _measure(repeat, lambda: bench.fresh("server"), run, trace=trace_path)
+
+    def update() -> dict:
+        bench.install(bench.fresh("warmup"), V2_FILE_ID)
+
+        def setup() -> None:
+            bench.install(bench.fresh("server"), V1_FILE_ID)
+            # Written by the server's first start; marks the dir as installed.
+            (server / "server.properties").write_text("motd=bench\n", encoding="utf-8")
+
+        def run() -> None:
+            bench.mcserver(
+                "update", "--dir", str(server), "--use-saved", "--no-prompt", trace=trace_path
+            )
+
+        return _measure(repeat, setup, run, trace=trace_path)
+
+    return {
+        "install_cold": install_cold,
+        "install_cached": install_cached,
+        "update": update,
+    }
+
+
+def _micro(bench: Bench, repeat: int) -> Dict[str, Callable[[], dict]]:
+    v1, v2 = bench.zips[1], bench.zips[2]
+    prefix = PACK_ROOT
+
+    def extract() -> dict:
+        out = bench.work / "extract"
+        return _measure(
+            repeat,
+            lambda: shutil.rmtree(out, ignore_errors=True),
+            lambda: extract_zip(v1, out),
+        )
+
+    def delta_update() -> dict:
+        server = bench.work / "server"
+        state: Dict[str, Manifest] = {}
+
+        def setup() -> None:
+            bench.fresh("server")
+            staging = bench.fresh("staging")
+            extract_zip(v1, staging)
+            move_tree_contents(staging / prefix, server)
+            manifest = Manifest()
+            record_installed(v1, prefix, server, manifest)
+            state["manifest"] = manifest
+            bench.fresh("staging")
+            shutil.rmtree(bench.work / "previous", ignore_errors=True)
+
+        def run() -> None:
+            apply_update(
+                v2,
+                prefix,
+                server,
+                bench.work / "staging",
+                state["manifest"],
+                bench.work / "previous",
+            )
+
+        return _measure(repeat, setup, run)
+
+    def move() -> dict:
+        def setup() -> None:
+            bench.fresh("server")
+            extract_zip(v1, bench.fresh("staging"))
+
+        return _measure(
+            repeat,
+            setup,
+            lambda: move_tree_contents(bench.work / "staging" / prefix, bench.work / "server"),
+        )
+
+    def copy_tree(mode: str) -> Callable[[], dict]:
+        def measure() -> dict:
+            src = bench.work / "tree"
+            if not src.exists():
+                extract_zip(v1, src)
+            dest = bench.work / "copy"
+            copier = Copier(mode)
+            result = _measure(
+                repeat,
+                lambda: shutil.rmtree(dest, ignore_errors=True),
+                lambda: shutil.copytree(src / prefix, dest, copy_function=copier),
+            )
+            # What the filesystem actually allowed; unsupported modes fall back.
+            result["methods"] = {m: n // repeat for m, n in sorted(copier.counts.items())}
+            return result
+
+        return measure
+
+    micro = {
+        "extract_zip": extract,
+        "apply_update": delta_update,
+        "move_tree_contents": move,
+    }
+    for mode in COPY_MODES:
+        micro[f"copy_tree[{mode}]"] = copy_tree(mode)
+    return micro
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        proc = subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+        )
+    except OSError:
+        return None
+    return proc.stdout.strip() or None
+
+
+def _compare(results: dict, baseline_path: Path) -> None:
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    print(f"\nvs {baseline_path} ({baseline.get('commit') or 'unknown commit'}):")
+    for name, row in results["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if not before:
+            print(f"  {name:24s} (new)")
+            continue
+        ratio = row["median_s"] / before["median_s"] if before["median_s"] else float("inf")
+        print(
+            f"  {name:24s} {before['median_s']:8.3f}s -> {row['median_s']:8.3f}s"
+            f"  x{ratio:.2f}"
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=2000)
+    parser.add_argument("--size-mb", type=float, default=64)
+    parser.add_argument(
+        "--changed", type=float, default=0.05, help="Fraction of files v2 changes"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", default=None, help="Comma-separated benchmark names")
+    parser.add_argument("--output", default=None, help="Write results JSON here")
+    parser.add_argument("--compare", default=None, help="Earlier results JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="mcserver_bench_") as tmp, FakeCurseForge() as fake:
+        work = Path(tmp)
+        zips: Dict[int, Path] = {}
+        for version in (1, 2):
+            zips[version] = work / f"pack-v{version}.zip"
+            stats = make_server_pack(
+                zips[version],
+                entries=args.entries,
+                size_bytes=int(args.size_mb * 1024 * 1024),
+                version=version,
+                changed=args.changed,
+            )
+        fake.add_release(PACK_ID, V1_FILE_ID, zips[1], display_name="Bench v1")
+        fake.add_release(PACK_ID, V2_FILE_ID, zips[2], display_name="Bench v2")
+        print(
+            f"Pack: {stats['entries']} entries, {stats['bytes'] / 1e6:.0f} MB, "
+            f"{zips[2].stat().st_size / 1e6:.0f} MB zipped, "
+            f"{stats['changed']} changed in v2"
+        )
+
+        bench = Bench(work / "run", fake.base_url, zips)
+        benchmarks = {**_end_to_end(bench, args.repeat), **_micro(bench, args.repeat)}
+        selected = args.only.split(",") if args.only else list(benchmarks)
+        unknown = [name for name in selected if name not in benchmarks]
+        if unknown:
+            parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+        results = {
+            "version": RESULTS_VERSION,
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "params": {
+                "entries": args.entries,
+                "size_mb": args.size_mb,
+                "changed": args.changed,
+                "repeat": args.repeat,
+            },
+            "results": {},
+        }
+        for name in selected:
+            row = benchmarks[name]()
+            results["results"][name] = row
+            print(f"{name:24s} median {row['median_s']:8.3f}s  best {row['best_s']:8.3f}s")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+        print(f"Wrote {args.output}")
+    if args.compare:
+        _compare(results, Path(args.compare))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
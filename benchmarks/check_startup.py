@@ -0,0 +1,53 @@
+"""Print the startup numbers tests/test_startup.py enforces.
+
+The checks themselves run with the test suite; this prints the import time
+of each local-only command, and exits 1 if any is over budget or imports a
+module it shouldn't:
+
+Usage: python benchmarks/check_startup.py [--budget-ms N] [--repeat N] [--json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tests"))
+
+from startup_budget import BUDGET_MS, REPEAT, local_commands, measure  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS)
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = {}
+    failed = False
+    with tempfile.TemporaryDirectory(prefix="mcserver_startup_") as tmp:
+        commands, env = local_commands(Path(tmp))
+        for name, argv in commands.items():
+            ms, heavy = measure(argv, env, repeat=args.repeat)
+            ok = ms <= args.budget_ms and not heavy
+            failed = failed or not ok
+            results[name] = {"import_ms": round(ms, 3), "heavy_modules": heavy, "ok": ok}
+
+    if args.json:
+        print(json.dumps({"budget_ms": args.budget_ms, "results": results}, indent=2))
+    else:
+        for name, row in results.items():
+            line = f"{name:12s} {row['import_ms']:7.1f}ms  {'ok' if row['ok'] else 'FAIL'}"
+            if row["heavy_modules"]:
+                line += f"  imports {', '.join(row['heavy_modules'])}"
+            print(line)
+        print(f"budget {args.budget_ms:g}ms of imports over a bare interpreter")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
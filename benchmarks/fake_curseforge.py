@@ -0,0 +1,330 @@
+"""Local stand-in for the CurseForge API and CDN, plus synthetic server packs.
+
+``FakeCurseForge`` serves the endpoints ``mcserver`` uses over plain HTTP on
+127.0.0.1: ``/v1/mods/search``, ``/v1/mods/{id}/files`` (paginated, newest
+first, server packs listed only through ``serverPackFileId`` as on the real
+API), ``/v1/mods/{id}/files/{fileId}``, ``.../download-url`` and the bulk
+``POST /v1/mods`` and ``/v1/mods/files``. ``/cdn/<fileId>/<name>`` serves the
+ZIPs with Range, If-Range and ETag support, so segmented and resumed
+downloads take the same paths they do against the real CDN.
+
+The synthetic packs it serves come from ``make_server_pack`` in
+tests/server_packs.py, shared with the test suite.
+
+Used by bench_suite.py; can also be run on its own to poke at by hand:
+
+    python benchmarks/fake_curseforge.py [--entries N] [--size-mb N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import re
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tests"))
+
+from server_packs import PACK_ROOT, make_server_pack  # noqa: E402,F401
+
+
+@dataclass
+class _File:
+    meta: Dict[str, Any]
+    path: Optional[Path] = None
+
+
+@dataclass
+class _State:
+    # pack id -> file ids in release order; file id -> file
+    packs: Dict[int, List[int]] = field(default_factory=dict)
+    files: Dict[int, _File] = field(default_factory=dict)
+    requests: Dict[str, int] = field(default_factory=dict)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: "_Server"
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+    def _count(self, endpoint: str) -> None:
+        with self.server.lock:
+            requests = self.server.state.requests
+            requests[endpoint] = requests.get(endpoint, 0) + 1
+
+    def _json(self, payload: Any, status: int = 200) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        state = self.server.state
+        if url.path.startswith("/cdn/"):
+            return self._cdn(head=False)
+        if url.path == "/v1/mods/search":
+            self._count("search")
+            needle = query.get("searchFilter", "").lower()
+            return self._json(
+                {
+                    "data": [
+                        {"id": pack_id, "name": f"Bench Pack {pack_id}"}
+                        for pack_id in state.packs
+                        if needle in f"bench pack {pack_id}"
+                    ]
+                }
+            )
+        m = re.fullmatch(r"/v1/mods/(\d+)/files/(\d+)/download-url", url.path)
+        if m:
+            self._count("download-url")
+            f = state.files.get(int(m.group(2)))
+            if f is None or f.path is None:
+                return self._json({"error": "not found"}, 404)
+            return self._json({"data": f.meta["downloadUrl"]})
+        m = re.fullmatch(r"/v1/mods/(\d+)/files/(\d+)", url.path)
+        if m:
+            self._count("file")
+            f = state.files.get(int(m.group(2)))
+            if f is None:
+                return self._json({"error": "not found"}, 404)
+            return self._json({"data": f.meta})
+        m = re.fullmatch(r"/v1/mods/(\d+)/files", url.path)
+        if m:
+            self._count("files")
+            listed = [
+                state.files[i].meta
+                for i in reversed(state.packs.get(int(m.group(1)), []))
+                if not state.files[i].meta["isServerPack"]
+            ]
+            index = int(query.get("index", 0))
+            page_size = min(50, int(query.get("pageSize", 50)))
+            return self._json(
+                {
+                    "data": listed[index : index + page_size],
+                    "pagination": {
+                        "index": index,
+                        "pageSize": page_size,
+                        "resultCount": len(listed[index : index + page_size]),
+                        "totalCount": len(listed),
+                    },
+                }
+            )
+        self._json({"error": "not found"}, 404)
+
+    def do_POST(self) -> None:
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)))
+        state = self.server.state
+        if self.path == "/v1/mods":
+            self._count("mods")
+            data = []
+            for pack_id in body.get("modIds", []):
+                if pack_id in state.packs:
+                    latest = [
+                        state.files[i].meta
+                        for i in state.packs[pack_id]
+                        if not state.files[i].meta["isServerPack"]
+                    ][-3:]
+                    data.append(
+                        {
+                            "id": pack_id,
+                            "name": f"Bench Pack {pack_id}",
+                            "classId": 4471,
+                            "latestFiles": latest,
+                        }
+                    )
+            return self._json({"data": data})
+        if self.path == "/v1/mods/files":
+            self._count("mods-files")
+            return self._json(
+                {
+                    "data": [
+                        state.files[i].meta
+                        for i in body.get("fileIds", [])
+                        if i in state.files
+                    ]
+                }
+            )
+        self._json({"error": "not found"}, 404)
+
+    def do_HEAD(self) -> None:
+        self._cdn(head=True)
+
+    def _cdn(self, *, head: bool) -> None:
+        m = re.fullmatch(r"/cdn/(\d+)/[^/]+", urlsplit(self.path).path)
+        f = self.server.state.files.get(int(m.group(1))) if m else None
+        if f is None or f.path is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self._count("cdn")
+        size = f.path.stat().st_size
+        etag = f'"{f.meta["id"]}-{size}"'
+        start, end, status = 0, size - 1, 200
+        m = re.fullmatch(r"bytes=(\d+)-(\d*)", self.headers.get("Range") or "")
+        if_range = self.headers.get("If-Range")
+        if m and (if_range is None or if_range == etag):
+            start = int(m.group(1))
+            end = min(size - 1, int(m.group(2) or size - 1))
+            status = 206
+        self.send_response(status)
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", etag)
+        self.send_header("Content-Type", "application/zip")
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        if head:
+            return
+        with open(f.path, "rb") as fh:
+            fh.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = fh.read(min(remaining, 1024 * 1024))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.state = _State()
+        self.lock = threading.Lock()
+
+
+class FakeCurseForge:
+    """CurseForge API and CDN on a local port; ``with`` starts and stops it."""
+
+    def __init__(self) -> None:
+        self._server = _Server()
+        self.base_url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "FakeCurseForge":
+        self.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    @property
+    def requests(self) -> Dict[str, int]:
+        """Requests served so far, by endpoint."""
+        with self._server.lock:
+            return dict(self._server.state.requests)
+
+    def reset_counts(self) -> None:
+        with self._server.lock:
+            self._server.state.requests.clear()
+
+    def add_release(
+        self, pack_id: int, file_id: int, server_zip: Path, *, display_name: str
+    ) -> int:
+        """Publish a release: a client file ``file_id`` whose server pack is
+        ``server_zip``, served as file ``file_id + 1``. Returns the latter.
+
+        Releases are ordered by when they were added; the last is the latest.
+        """
+        state = self._server.state
+        order = len(state.packs.get(pack_id, []))
+        date = time.strftime(
+            "%Y-%m-%dT%H:%M:%SZ", time.gmtime(1_700_000_000 + order * 86400)
+        )
+        sha1, md5 = hashlib.sha1(), hashlib.md5()
+        with open(server_zip, "rb") as fh:
+            for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+                sha1.update(chunk)
+                md5.update(chunk)
+        server_id = file_id + 1
+        name = f"{display_name.replace(' ', '-')}-server.zip"
+        server_meta = {
+            "id": server_id,
+            "modId": pack_id,
+            "displayName": f"{display_name} Server",
+            "fileName": name,
+            "fileDate": date,
+            "fileLength": server_zip.stat().st_size,
+            "isServerPack": True,
+            "serverPackFileId": None,
+            "downloadUrl": f"{self.base_url}/cdn/{server_id}/{name}",
+            "hashes": [
+                {"value": sha1.hexdigest(), "algo": 1},
+                {"value": md5.hexdigest(), "algo": 2},
+            ],
+        }
+        client_meta = {
+            "id": file_id,
+            "modId": pack_id,
+            "displayName": display_name,
+            "fileName": f"{display_name.replace(' ', '-')}.zip",
+            "fileDate": date,
+            "isServerPack": False,
+            "serverPackFileId": server_id,
+            "downloadUrl": None,
+            "hashes": [],
+        }
+        with self._server.lock:
+            state.files[server_id] = _File(server_meta, Path(server_zip))
+            state.files[file_id] = _File(client_meta)
+            state.packs.setdefault(pack_id, []).extend([server_id, file_id])
+        return server_id
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=2000)
+    parser.add_argument("--size-mb", type=float, default=64)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="mcserver_fake_") as tmp:
+        with FakeCurseForge() as fake:
+            for version in (1, 2):
+                zip_path = Path(tmp) / f"v{version}.zip"
+                make_server_pack(
+                    zip_path,
+                    entries=args.entries,
+                    size_bytes=int(args.size_mb * 1024 * 1024),
+                    version=version,
+                )
+                fake.add_release(
+                    100, 1000 + 10 * version, zip_path, display_name=f"Bench v{version}"
+                )
+            print(f"Serving pack 100 (files 1010, 1020) at {fake.base_url}; Ctrl-C to stop")
+            try:
+                threading.Event().wait()
+            except KeyboardInterrupt:
+                pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
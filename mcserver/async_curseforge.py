@@ -0,0 +1,369 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, AsyncIterator, BinaryIO, Dict, Iterable, List, Optional, Tuple
+
+from .async_http import AsyncConnectionPool, http_request
+from .config import AppConfig
+from .curseforge import (
+    FILES_PAGE_SIZE,
+    CurseForgeClient,
+    ModFile,
+    _batches,
+    api_error,
+    is_last_page,
+    pick_server_pack,
+    search_params,
+)
+from .download import partial_paths, verify_hashes
+from .errors import (
+    ChecksumMismatchError,
+    MissingApiKeyError,
+    NoServerPackError,
+    NotFoundError,
+    UserFacingError,
+)
+from .http_client import HttpStatusError, RequestScheduler
+
+
+DEFAULT_CONCURRENCY = 8
+
+
+class AsyncCurseForgeClient:
+    """asyncio counterpart of CurseForgeClient, for use inside an event loop.
+
+    The lookups mirror the blocking client's but run on AsyncConnectionPool,
+    so hundreds of them can be gathered from one loop. At most
+    ``max_concurrency`` requests are in flight at once, however many tasks
+    call in. Cancelling a task closes the connection it was using and, for
+    a download, deletes the partial file. There is no response cache and
+    no key prompting.
+
+    Use ``async with AsyncCurseForgeClient() as cf:`` or call ``aclose()``.
+    """
+
+    BASE_URL = CurseForgeClient.BASE_URL
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        *,
+        max_concurrency: int = DEFAULT_CONCURRENCY,
+        pool: Optional[AsyncConnectionPool] = None,
+        scheduler: Optional[RequestScheduler] = None,
+    ):
+        self.api_key = api_key or AppConfig.load().curseforge_api_key
+        if not self.api_key:
+            raise MissingApiKeyError(
+                "Missing CurseForge API key. Run: mcserver config set-api-key"
+            )
+        self.max_concurrency = max(1, int(max_concurrency))
+        self._owns_pool = pool is None
+        self.pool = pool or AsyncConnectionPool(max_per_host=self.max_concurrency)
+        # None means the process-wide rate limit shared with blocking clients.
+        self.scheduler = scheduler
+        # Created on first use, inside the loop it will belong to.
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self) -> "AsyncCurseForgeClient":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        if self._owns_pool:
+            self.pool.close()
+
+    def _limit(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def _headers(self) -> Dict[str, str]:
+        return {"Accept": "application/json", "x-api-key": self.api_key}
+
+    async def _request_json(
+        self,
+        method: str,
+        path: str,
+        *,
+        params: Optional[Dict[str, Any]] = None,
+        payload: Any = None,
+    ) -> Any:
+        headers = self._headers()
+        body = None
+        if payload is not None:
+            headers["Content-Type"] = "application/json"
+            body = json.dumps(payload).encode("utf-8")
+        async with self._limit():
+            try:
+                resp = await http_request(
+                    method,
+                    f"{self.BASE_URL}{path}",
+                    headers=headers,
+                    params=params,
+                    body=body,
+                    pool=self.pool,
+                    scheduler=self.scheduler,
+                )
+            except HttpStatusError as e:
+                raise api_error(e)
+        return resp.json()
+
+    async def search_modpacks(
+        self,
+        *,
+        query: str,
+        game_version: Optional[str] = None,
+        index: int = 0,
+        page_size: int = 10,
+        sort_field: int = 2,
+        sort_order: str = "desc",
+    ) -> List[Dict[str, Any]]:
+        params = search_params(
+            query=query,
+            game_version=game_version,
+            index=index,
+            page_size=page_size,
+            sort_field=sort_field,
+            sort_order=sort_order,
+        )
+        payload = await self._request_json("GET", "/v1/mods/search", params=params)
+        return payload.get("data", [])
+
+    async def iter_file_pages(
+        self, pack_id: int, *, page_size: int = FILES_PAGE_SIZE
+    ) -> AsyncIterator[List[ModFile]]:
+        """Yields the pack's files one API page at a time, newest first."""
+        index = 0
+        while True:
+            payload = await self._request_json(
+                "GET",
+                f"/v1/mods/{pack_id}/files",
+                params={"index": index, "pageSize": page_size},
+            )
+            items = payload.get("data", [])
+            yield [ModFile.from_api(item) for item in items]
+
+            index += len(items)
+            if is_last_page(payload, index, page_size):
+                return
+
+    async def list_files(
+        self, pack_id: int, *, limit: Optional[int] = None
+    ) -> List[ModFile]:
+        page_size = min(FILES_PAGE_SIZE, limit) if limit else FILES_PAGE_SIZE
+        files: List[ModFile] = []
+        async for page in self.iter_file_pages(pack_id, page_size=page_size):
+            files.extend(page)
+            if limit and len(files) >= limit:
+                return files[:limit]
+        return files
+
+    async def get_file(self, pack_id: int, file_id: int) -> ModFile:
+        try:
+            payload = await self._request_json(
+                "GET", f"/v1/mods/{pack_id}/files/{file_id}"
+            )
+        except NotFoundError:
+            raise UserFacingError(f"File id {file_id} not found for pack {pack_id}.")
+        data = payload.get("data")
+        if not data:
+            raise UserFacingError(f"File id {file_id} not found for pack {pack_id}.")
+        return ModFile.from_api(data)
+
+    async def get_mods(self, pack_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """Fetches mod/modpack objects in bulk, keyed by id; batches run concurrently."""
+        payloads = await asyncio.gather(
+            *(
+                self._request_json("POST", "/v1/mods", payload={"modIds": batch})
+                for batch in _batches(pack_ids)
+            )
+        )
+        return {
+            int(item["id"]): item
+            for payload in payloads
+            for item in payload.get("data", [])
+        }
+
+    async def get_download_url(self, pack_id: int, file_id: int) -> str:
+        payload = await self._request_json(
+            "GET", f"/v1/mods/{pack_id}/files/{file_id}/download-url"
+        )
+        data = payload.get("data")
+        if not data:
+            raise UserFacingError("Could not resolve download URL from CurseForge API.")
+        return str(data)
+
+    async def choose_latest_server_pack(self, pack_id: int) -> Tuple[int, str, str]:
+        """Returns (server_pack_file_id, display_name, file_date).
+
+        Only the first page is fetched, like the blocking client.
+        """
+        page: List[ModFile] = []
+        pages = self.iter_file_pages(pack_id)
+        try:
+            async for page in pages:
+                break
+        finally:
+            await pages.aclose()
+        choice = pick_server_pack(page)
+        if choice is None:
+            raise UserFacingError("No files found for this modpack.")
+        return choice
+
+    async def choose_latest_server_packs(
+        self, pack_ids: Iterable[int]
+    ) -> Dict[int, Tuple[int, str, str]]:
+        """Batch form of choose_latest_server_pack, keyed by pack id.
+
+        Bulk /v1/mods lookups first; packs their latestFiles don't settle are
+        listed concurrently. Packs whose newest release has no server pack are
+        left out.
+        """
+        pack_ids = list(dict.fromkeys(int(p) for p in pack_ids))
+        mods = await self.get_mods(pack_ids)
+        chosen: Dict[int, Tuple[int, str, str]] = {}
+        fallback: List[int] = []
+        for pack_id in pack_ids:
+            latest = (mods.get(pack_id) or {}).get("latestFiles") or []
+            try:
+                choice = pick_server_pack(ModFile.from_api(item) for item in latest)
+            except NoServerPackError:
+                # latestFiles leaves out server pack files that the listing
+                # has; let the listing decide, as choose_latest_server_pack does.
+                choice = None
+            if choice is None:
+                fallback.append(pack_id)
+            else:
+                chosen[pack_id] = choice
+
+        async def scan(pack_id: int) -> Optional[Tuple[int, str, str]]:
+            try:
+                return await self.choose_latest_server_pack(pack_id)
+            except NoServerPackError:
+                return None  # network and API errors propagate
+
+        scanned = await asyncio.gather(*(scan(p) for p in fallback))
+        for pack_id, choice in zip(fallback, scanned):
+            if choice is not None:
+                chosen[pack_id] = choice
+        return {p: chosen[p] for p in pack_ids if p in chosen}
+
+    async def get_server_pack_file(
+        self, pack_id: int, *, file_id: Optional[int] = None
+    ) -> Tuple[ModFile, str]:
+        """Returns (server pack file metadata, display_name of the release)."""
+        if file_id is None:
+            server_file_id, display_name, _date = await self.choose_latest_server_pack(
+                pack_id
+            )
+            return await self.get_file(pack_id, server_file_id), display_name
+
+        match = await self.get_file(pack_id, file_id)
+        if match.is_server_pack:
+            return match, match.display_name
+        if match.server_pack_file_id:
+            server_file = await self.get_file(pack_id, int(match.server_pack_file_id))
+            return server_file, match.display_name
+        raise NoServerPackError("Selected file does not have an associated server pack.")
+
+    async def server_pack_url(self, pack_id: int, server_file: ModFile) -> str:
+        if server_file.download_url:
+            return server_file.download_url
+        return await self.get_download_url(pack_id, server_file.id)
+
+    async def resolve_server_pack_download(
+        self, pack_id: int, *, file_id: Optional[int] = None
+    ) -> Tuple[str, int, str]:
+        """Returns (download_url, server_pack_file_id, display_name)."""
+        server_file, display_name = await self.get_server_pack_file(
+            pack_id, file_id=file_id
+        )
+        url = await self.server_pack_url(pack_id, server_file)
+        return url, int(server_file.id), str(display_name)
+
+    async def download_to(
+        self,
+        url: str,
+        dest: Path,
+        *,
+        chunk_size: int = 1024 * 256,
+        expected_hashes: Optional[Dict[str, str]] = None,
+        expected_size: Optional[int] = None,
+    ) -> Dict[str, str]:
+        """Stream ``url`` to ``dest`` and return hex digests of what was written.
+
+        One connection, hashed as it streams; the data goes to ``dest.part``
+        and is renamed to ``dest`` once size and hashes check out, as in
+        download.download_to. Counts against ``max_concurrency``.
+
+        Writing and hashing run on a thread of this download's own, one
+        chunk behind the socket, so neither blocks the event loop.
+        """
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        target, _sidecar = partial_paths(dest)
+        hashes = {algo: hashlib.new(algo) for algo in tuple(expected_hashes or ()) or ("sha1",)}
+        loop = asyncio.get_running_loop()
+        # A single worker keeps the writes in order.
+        writer = ThreadPoolExecutor(max_workers=1)
+
+        def write(f: BinaryIO, chunk: bytes) -> None:
+            f.write(chunk)
+            for h in hashes.values():
+                h.update(chunk)
+
+        written = 0
+        try:
+            async with self._limit():
+                async with await self.pool.request("GET", url) as resp:
+                    if resp.status >= 400:
+                        raise UserFacingError(
+                            f"Download of {dest.name} failed: HTTP {resp.status} {resp.reason}"
+                        )
+                    opening = loop.run_in_executor(writer, open, target, "wb")
+                    try:
+                        f = await asyncio.shield(opening)
+                    except asyncio.CancelledError:
+                        # The worker opens the file regardless: wait for it, so
+                        # the handle is closed and the .part removed below.
+                        try:
+                            (await opening).close()
+                        except OSError:
+                            pass
+                        raise
+                    try:
+                        pending: Optional[asyncio.Future] = None
+                        async for chunk in resp.iter_chunks(chunk_size):
+                            if pending is not None:
+                                await pending
+                            pending = loop.run_in_executor(writer, write, f, chunk)
+                            written += len(chunk)
+                        if pending is not None:
+                            await pending
+                    finally:
+                        # Queued behind any write still running.
+                        await loop.run_in_executor(writer, f.close)
+            digests = {algo: h.hexdigest() for algo, h in hashes.items()}
+            if expected_size and written != expected_size:
+                raise ChecksumMismatchError(
+                    f"{dest.name}: received {written} bytes, expected {expected_size}."
+                )
+            verify_hashes(expected_hashes or {}, digests, what=f"Download of {dest.name}")
+        except BaseException:
+            # Not resumable: a cancelled or corrupt download leaves nothing behind.
+            try:
+                os.unlink(target)
+            except OSError:
+                pass
+            raise
+        finally:
+            writer.shutdown(wait=False)
+        os.replace(target, dest)
+        return digests
@@ -0,0 +1,396 @@
+from __future__ import annotations
+
+import asyncio
+import http.client
+import ssl
+from email.parser import Parser
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urljoin, urlsplit
+
+from . import trace
+from .http_client import (
+    DEFAULT_POOL_SIZE,
+    MAX_REDIRECTS,
+    REDIRECT_STATUSES,
+    HttpResponse,
+    HttpStatusError,
+    RequestScheduler,
+    default_scheduler,
+)
+
+
+_HostKey = Tuple[str, str, int]
+
+# Errors that mean a kept-alive connection was closed by the server while idle.
+_STALE_CONNECTION_ERRORS = (ConnectionError, asyncio.IncompleteReadError)
+
+
+class _Connection:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+def _host_key(url: str) -> _HostKey:
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    if scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError(f"Unsupported URL: {url}")
+    port = parts.port or (443 if scheme == "https" else 80)
+    return scheme, parts.hostname, port
+
+
+class AsyncResponse:
+    """Streaming response whose connection goes back to the pool once drained."""
+
+    def __init__(
+        self,
+        pool: "AsyncConnectionPool",
+        key: _HostKey,
+        conn: _Connection,
+        url: str,
+        status: int,
+        reason: str,
+        headers: http.client.HTTPMessage,
+        *,
+        length: Optional[int],
+        chunked: bool,
+        will_close: bool,
+        timeout_s: Optional[float],
+    ):
+        self._pool = pool
+        self._key = key
+        self._conn: Optional[_Connection] = conn
+        self.url = url
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self._chunked = chunked
+        # Body bytes still to come; None means "until the server closes".
+        self._remaining = length
+        self._chunk_left = 0
+        self._will_close = will_close
+        self._timeout_s = timeout_s
+        self._eof = length == 0 and not chunked
+        if self._eof:
+            self._finish()
+
+    async def _read_line(self) -> bytes:
+        assert self._conn is not None
+        line = await asyncio.wait_for(self._conn.reader.readline(), self._timeout_s)
+        if not line.endswith(b"\n"):
+            raise http.client.IncompleteRead(line)
+        return line
+
+    async def _read_data(self, n: int) -> bytes:
+        assert self._conn is not None
+        return await asyncio.wait_for(self._conn.reader.read(n), self._timeout_s)
+
+    async def _read_some(self, amt: int) -> bytes:
+        if self._chunked:
+            if self._chunk_left == 0:
+                size = int((await self._read_line()).split(b";", 1)[0].strip(), 16)
+                if size == 0:
+                    while (await self._read_line()).strip():
+                        pass  # trailers
+                    self._eof = True
+                    return b""
+                self._chunk_left = size
+            data = await self._read_data(min(amt, self._chunk_left))
+            if not data:
+                raise http.client.IncompleteRead(b"", self._chunk_left)
+            self._chunk_left -= len(data)
+            if self._chunk_left == 0:
+                await self._read_line()
+            return data
+        if self._remaining is None:
+            data = await self._read_data(amt)
+            self._eof = not data
+            return data
+        data = await self._read_data(min(amt, self._remaining))
+        if not data:
+            raise http.client.IncompleteRead(b"", self._remaining)
+        self._remaining -= len(data)
+        self._eof = self._remaining == 0
+        return data
+
+    async def read(self, amt: Optional[int] = None) -> bytes:
+        """Up to ``amt`` bytes of body (all of it if None); b"" at the end."""
+        if self._conn is None:
+            return b""
+        try:
+            if amt is not None:
+                data = await self._read_some(amt)
+            else:
+                parts: List[bytes] = []
+                while not self._eof:
+                    parts.append(await self._read_some(1024 * 1024))
+                data = b"".join(parts)
+        except BaseException:
+            # Includes cancellation: a half-read connection cannot be reused.
+            self.close()
+            raise
+        if self._eof:
+            self._finish()
+        return data
+
+    async def iter_chunks(self, chunk_size: int = 1024 * 256) -> AsyncIterator[bytes]:
+        while True:
+            chunk = await self.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def _finish(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        if self._will_close:
+            conn.close()
+        else:
+            self._pool._release(self._key, conn)
+
+    def close(self) -> None:
+        if self._eof:
+            self._finish()
+            return
+        # Unread body: the connection cannot be reused safely.
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            conn.close()
+
+    async def __aenter__(self) -> "AsyncResponse":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        self.close()
+
+
+class AsyncConnectionPool:
+    """asyncio counterpart of http_client.ConnectionPool.
+
+    HTTP/1.1 keep-alive connections over asyncio streams, up to
+    ``max_per_host`` idle ones kept per (scheme, host, port). Connections
+    belong to the event loop that opened them, so a pool must only be used
+    from one loop. Proxies are not supported.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_per_host: int = DEFAULT_POOL_SIZE,
+        timeout_s: float = 60,
+        ssl_context: Optional[ssl.SSLContext] = None,
+    ):
+        self.max_per_host = max(1, int(max_per_host))
+        self.timeout_s = timeout_s
+        self.ssl_context = ssl_context or ssl.create_default_context()
+        self._idle: Dict[_HostKey, List[_Connection]] = {}
+        self.connections_opened = 0
+        self.requests_sent = 0
+
+    async def _new_connection(self, key: _HostKey, timeout_s: float) -> _Connection:
+        scheme, host, port = key
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(
+                host, port, ssl=self.ssl_context if scheme == "https" else None
+            ),
+            timeout_s,
+        )
+        self.connections_opened += 1
+        return _Connection(reader, writer)
+
+    def _release(self, key: _HostKey, conn: _Connection) -> None:
+        idle = self._idle.setdefault(key, [])
+        if len(idle) < self.max_per_host and not conn.reader.at_eof():
+            idle.append(conn)
+        else:
+            conn.close()
+
+    def close(self) -> None:
+        idle_lists = list(self._idle.values())
+        self._idle.clear()
+        for idle in idle_lists:
+            for conn in idle:
+                conn.close()
+
+    async def _send(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        body: Optional[bytes],
+        timeout_s: Optional[float],
+    ) -> AsyncResponse:
+        key = _host_key(url)
+        scheme, host, port = key
+        parts = urlsplit(url)
+        target = parts.path or "/"
+        if parts.query:
+            target += "?" + parts.query
+        default_port = 443 if scheme == "https" else 80
+        req_headers = {
+            "Host": host if port == default_port else f"{host}:{port}",
+            "Accept-Encoding": "identity",
+        }
+        req_headers.update(headers)
+        if body is not None:
+            req_headers["Content-Length"] = str(len(body))
+        head = f"{method} {target} HTTP/1.1\r\n" + "".join(
+            f"{k}: {v}\r\n" for k, v in req_headers.items()
+        )
+        payload = head.encode("iso-8859-1") + b"\r\n" + (body or b"")
+        timeout = timeout_s if timeout_s is not None else self.timeout_s
+
+        while True:
+            idle = self._idle.get(key)
+            reused = bool(idle)
+            conn = idle.pop() if idle else await self._new_connection(key, timeout)
+            try:
+                conn.writer.write(payload)
+                await conn.writer.drain()
+                status_line = await asyncio.wait_for(conn.reader.readline(), timeout)
+                if not status_line:
+                    raise ConnectionResetError("Connection closed before response")
+                header_lines: List[bytes] = []
+                while True:
+                    line = await asyncio.wait_for(conn.reader.readline(), timeout)
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    header_lines.append(line)
+            except _STALE_CONNECTION_ERRORS:
+                conn.close()
+                if reused:
+                    # The server dropped an idle connection; retry on a fresh one.
+                    continue
+                raise
+            except BaseException:
+                conn.close()
+                raise
+            self.requests_sent += 1
+            trace.count(requests=1)
+            return self._response(
+                key, conn, url, method, status_line, header_lines, timeout
+            )
+
+    def _response(
+        self,
+        key: _HostKey,
+        conn: _Connection,
+        url: str,
+        method: str,
+        status_line: bytes,
+        header_lines: List[bytes],
+        timeout_s: float,
+    ) -> AsyncResponse:
+        version, _sep, rest = status_line.decode("iso-8859-1").strip().partition(" ")
+        code, _sep, reason = rest.partition(" ")
+        try:
+            status = int(code)
+        except ValueError:
+            conn.close()
+            raise http.client.BadStatusLine(status_line.decode("iso-8859-1"))
+        headers = Parser(_class=http.client.HTTPMessage).parsestr(
+            b"".join(header_lines).decode("iso-8859-1")
+        )
+        connection = (headers.get("Connection") or "").lower()
+        chunked = "chunked" in (headers.get("Transfer-Encoding") or "").lower()
+        length: Optional[int] = None
+        if method == "HEAD" or status in (204, 304) or 100 <= status < 200:
+            length = 0
+        elif not chunked and headers.get("Content-Length"):
+            length = int(headers["Content-Length"])
+        will_close = (
+            "close" in connection
+            or (version == "HTTP/1.0" and "keep-alive" not in connection)
+            or (length is None and not chunked)
+        )
+        return AsyncResponse(
+            self,
+            key,
+            conn,
+            url,
+            status,
+            reason,
+            headers,
+            length=length,
+            chunked=chunked and length is None,
+            will_close=will_close,
+            timeout_s=timeout_s,
+        )
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        headers: Optional[Dict[str, str]] = None,
+        body: Optional[bytes] = None,
+        timeout_s: Optional[float] = None,
+        follow_redirects: bool = True,
+    ) -> AsyncResponse:
+        """Send a request and return the (unread) response.
+
+        Redirects are followed for GET/HEAD requests. The caller must read the
+        body to the end or close the response.
+        """
+        req_headers = dict(headers or {})
+        for _ in range(MAX_REDIRECTS + 1):
+            resp = await self._send(method, url, req_headers, body, timeout_s)
+            location = resp.headers.get("Location")
+            if (
+                not follow_redirects
+                or resp.status not in REDIRECT_STATUSES
+                or not location
+                or method not in ("GET", "HEAD")
+            ):
+                return resp
+            await resp.read()
+            url = urljoin(url, location)
+        raise HttpStatusError(url, resp.status, "Too many redirects", resp.headers)
+
+
+async def http_request(
+    method: str,
+    url: str,
+    *,
+    headers: Dict[str, str],
+    pool: AsyncConnectionPool,
+    params: Optional[Dict[str, Any]] = None,
+    body: Optional[bytes] = None,
+    timeout_s: float = 60,
+    scheduler: Optional[RequestScheduler] = None,
+) -> HttpResponse:
+    """Send a request and return the whole response; see http_client.http_request.
+
+    The scheduler is the same one blocking requests use; only the waiting
+    is done with asyncio.sleep.
+    """
+    if params:
+        url = url + "?" + urlencode(params)
+    scheduler = scheduler or default_scheduler()
+
+    attempt = 0
+    while True:
+        attempt += 1
+        delay = scheduler.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        try:
+            async with await pool.request(
+                method, url, headers=headers, body=body, timeout_s=timeout_s
+            ) as resp:
+                content = await resp.read()
+            if resp.status >= 400:
+                raise HttpStatusError(url, resp.status, resp.reason, resp.headers)
+            return HttpResponse(
+                status=resp.status, headers=resp.headers, content=content
+            )
+        except Exception as exc:
+            retry_in = scheduler.retry_delay(attempt, exc)
+            if retry_in is None:
+                raise
+            await asyncio.sleep(retry_in)
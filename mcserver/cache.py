@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional
+from urllib.parse import urlencode
+
+from .config import response_cache_dir
+
+
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+# Seconds a cached response is served without contacting the API at all.
+# Past that, it is revalidated with If-None-Match/If-Modified-Since when the
+# API sent a validator, or refetched otherwise.
+DEFAULT_TTLS_S: Dict[str, float] = {
+    "search": 60 * 60,
+    "files": 5 * 60,
+    "download-url": 24 * 60 * 60,
+}
+
+
+@dataclass
+class CachedResponse:
+    url: str
+    stored_at: float
+    payload: Any
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+class ResponseCache:
+    """On-disk cache of CurseForge API JSON responses.
+
+    One JSON file per (URL, params); least recently used entries are evicted
+    once the directory grows past ``max_bytes``. With ``refresh=True`` every
+    entry is treated as stale, so it is revalidated (or refetched) but the
+    fresh result is still stored.
+    """
+
+    def __init__(
+        self,
+        root: Optional[Path] = None,
+        *,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        ttls: Optional[Dict[str, float]] = None,
+        refresh: bool = False,
+    ):
+        self.root = root or response_cache_dir()
+        self.max_bytes = max_bytes
+        self.ttls = dict(DEFAULT_TTLS_S)
+        if ttls:
+            self.ttls.update(ttls)
+        self.refresh = refresh
+
+    @staticmethod
+    def key(url: str, params: Optional[Dict[str, Any]] = None) -> str:
+        if params:
+            url = url + "?" + urlencode(sorted(params.items()))
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}.json"
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        path = self._path(key)
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            os.utime(path)  # LRU bookkeeping
+        except (OSError, ValueError):
+            return None
+        return CachedResponse(
+            url=str(data.get("url", "")),
+            stored_at=float(data.get("storedAt", 0)),
+            payload=data.get("payload"),
+            etag=data.get("etag"),
+            last_modified=data.get("lastModified"),
+        )
+
+    def is_fresh(self, entry: CachedResponse, endpoint: str) -> bool:
+        if self.refresh:
+            return False
+        ttl = self.ttls.get(endpoint, 0)
+        return time.time() - entry.stored_at < ttl
+
+    def put(self, key: str, entry: CachedResponse) -> None:
+        payload = {
+            "url": entry.url,
+            "storedAt": entry.stored_at,
+            "etag": entry.etag,
+            "lastModified": entry.last_modified,
+            "payload": entry.payload,
+        }
+        path = self._path(key)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            tmp.write_text(json.dumps(payload), encoding="utf-8")
+            os.replace(tmp, path)
+            self._evict()
+        except OSError:
+            # The cache is an optimisation; never fail a command over it.
+            try:
+                tmp.unlink()
+            except OSError:
+                pass
+
+    def _evict(self) -> None:
+        entries = []
+        total = 0
+        for path in self.root.glob("*.json"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        for _mtime, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
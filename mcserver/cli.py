@@ -1,23 +1,33 @@
 from __future__ import annotations
 
 import argparse
-import getpass
+import json
 import sys
-import tempfile
 from pathlib import Path
-from typing import Optional, Tuple
-
-from .curseforge import CurseForgeClient
-from .config import AppConfig, config_path, mask_secret
-from .errors import InvalidApiKeyError, MissingApiKeyError, UserFacingError
-from .download import download_to
-from .fs_ops import (
-    detect_pack_root,
-    extract_zip,
-    copy_tree_contents,
-    update_from_pack_root,
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+from .config import AppConfig, config_path, mask_secret, object_store_dir
+from .defaults import (
+    COPY_MODES,
+    DEFAULT_BURST,
+    DEFAULT_FLEET_JOBS,
+    DEFAULT_MOD_JOBS,
+    DEFAULT_RATE,
+    DEFAULT_SEGMENTS,
 )
-from .state import ServerState, utc_now_iso
+from .errors import MissingApiKeyError, NoServerPackError, UserFacingError
+from .state import ServerState, utc_iso, utc_now_iso
+
+# Everything else is imported by the commands that use it: local commands
+# like ``status`` or ``config path`` should not pay for the HTTP, download
+# and extraction stack at startup.
+if TYPE_CHECKING:
+    from .cache import ResponseCache
+    from .curseforge import CurseForgeClient, ModFile
+    from .fleet import FleetResult, FleetServer
+    from .fs_ops import Copier
+    from .store import ObjectStore
+    from .trace import Tracer
 
 
 def _looks_like_url(value: str) -> bool:
@@ -28,40 +38,75 @@ def _looks_like_pack_id(value: str) -> bool:
     return value.isdigit()
 
 
-def _is_server_dir(server_dir: Path) -> bool:
-    return (server_dir / "server.properties").exists()
+def _response_cache(args: argparse.Namespace) -> Optional[ResponseCache]:
+    from .cache import ResponseCache
+
+    if getattr(args, "no_cache", False):
+        return None
+    return ResponseCache(refresh=getattr(args, "refresh", False))
+
+
+def _prompt_and_save_key() -> str:
+    import getpass
+
+    api_key = getpass.getpass("CurseForge API key (will be saved): ").strip()
+    if not api_key:
+        raise UserFacingError("API key cannot be empty.")
+    cfg = AppConfig.load()
+    cfg.curseforge_api_key = api_key
+    cfg.save()
+    print(f"Saved API key to {config_path()}")
+    return api_key
+
+
+def _remember_verified_key(api_key: str) -> None:
+    cfg = AppConfig.load()
+    if cfg.curseforge_api_key != api_key:
+        return
+    cfg.mark_api_key_verified(utc_now_iso())
+    cfg.save()
+
+
+def _configure_rate_limit(cfg: AppConfig) -> None:
+    from .http_client import configure_default_scheduler
+
+    settings = {}
+    if cfg.api_rate_limit is not None:
+        settings["rate"] = cfg.api_rate_limit
+    if cfg.api_burst is not None:
+        settings["burst"] = cfg.api_burst
+    if settings:
+        configure_default_scheduler(**settings)
 
 
-def _get_cf_client(*, allow_prompt: bool) -> CurseForgeClient:
-    def prompt_and_save_key() -> None:
-        api_key = getpass.getpass("CurseForge API key (will be saved): ").strip()
-        if not api_key:
-            raise UserFacingError("API key cannot be empty.")
-        cfg = AppConfig.load()
-        cfg.curseforge_api_key = api_key
-        cfg.save()
-        print(f"Saved API key to {config_path()}")
+def _get_cf_client(
+    *, allow_prompt: bool, cache: Optional[ResponseCache] = None
+) -> CurseForgeClient:
+    from .curseforge import CurseForgeClient
+
+    can_prompt = allow_prompt and sys.stdin.isatty()
+    _configure_rate_limit(AppConfig.load())
 
     # Try once with existing config.
     try:
-        cf = CurseForgeClient()
+        cf = CurseForgeClient(cache=cache)
     except MissingApiKeyError:
-        if not allow_prompt or not sys.stdin.isatty():
+        if not can_prompt:
             raise
-        prompt_and_save_key()
-        cf = CurseForgeClient()
+        _prompt_and_save_key()
+        cf = CurseForgeClient(cache=cache)
 
-    # Validate key early so we can reprompt before doing work.
-    try:
-        cf.search_modpacks(query="a", page_size=1)
-    except InvalidApiKeyError:
-        if not allow_prompt or not sys.stdin.isatty():
-            raise
-        print("Saved API key appears invalid; please re-enter it.")
-        prompt_and_save_key()
-        cf = CurseForgeClient()
-        cf.search_modpacks(query="a", page_size=1)
+    # No validation round trip: a 403 on the first real request triggers the
+    # reprompt, and the first success is remembered in the config.
+    cf.key_verified = AppConfig.load().api_key_verified()
+    cf.on_key_verified = _remember_verified_key
+    if can_prompt:
 
+        def reprompt() -> str:
+            print("Saved API key appears invalid; please re-enter it.")
+            return _prompt_and_save_key()
+
+        cf.on_invalid_key = reprompt
     return cf
 
 
@@ -122,14 +167,14 @@ def _resolve_pack_id(
 
 
 def cmd_cf_resolve(args: argparse.Namespace) -> int:
-    cf = _get_cf_client(allow_prompt=True)
+    cf = _get_cf_client(allow_prompt=True, cache=_response_cache(args))
     pack_id = cf.resolve_pack_id_from_url(args.url)
     print(pack_id)
     return 0
 
 
 def cmd_cf_search(args: argparse.Namespace) -> int:
-    cf = _get_cf_client(allow_prompt=True)
+    cf = _get_cf_client(allow_prompt=True, cache=_response_cache(args))
     results = cf.search_modpacks(
         query=args.query, game_version=args.game_version, page_size=args.limit
     )
@@ -139,9 +184,8 @@ def cmd_cf_search(args: argparse.Namespace) -> int:
 
 
 def cmd_cf_files(args: argparse.Namespace) -> int:
-    cf = _get_cf_client(allow_prompt=True)
-    files = cf.list_files(int(args.pack_id))
-    for f in files[: args.limit]:
+    cf = _get_cf_client(allow_prompt=True, cache=_response_cache(args))
+    for f in cf.list_files(int(args.pack_id), limit=args.limit):
         if args.server_only and not (f.is_server_pack or f.server_pack_file_id):
             continue
         print(
@@ -150,8 +194,23 @@ def cmd_cf_files(args: argparse.Namespace) -> int:
     return 0
 
 
+def cmd_cf_latest(args: argparse.Namespace) -> int:
+    cf = _get_cf_client(allow_prompt=True, cache=_response_cache(args))
+    pack_ids = args.pack_ids
+    chosen = cf.choose_latest_server_packs(pack_ids)
+    missing = 0
+    for pack_id in pack_ids:
+        if pack_id not in chosen:
+            print(f"{pack_id}\t(no server pack)")
+            missing += 1
+            continue
+        server_file_id, display_name, file_date = chosen[pack_id]
+        print(f"{pack_id}\t{server_file_id}\t{file_date}\t{display_name}")
+    return 1 if missing else 0
+
+
 def cmd_cf_download_url(args: argparse.Namespace) -> int:
-    cf = _get_cf_client(allow_prompt=True)
+    cf = _get_cf_client(allow_prompt=True, cache=_response_cache(args))
     url, server_file_id, display_name = cf.resolve_server_pack_download(
         int(args.pack_id), file_id=args.file_id
     )
@@ -171,8 +230,18 @@ def _install_or_update(
     use_arg: bool,
     no_prompt: bool,
     check_only: bool,
+    cache: Optional[ResponseCache] = None,
+    connections: int = DEFAULT_SEGMENTS,
+    copy_mode: str = "auto",
+    mod_jobs: int = DEFAULT_MOD_JOBS,
 ) -> int:
-    cf = _get_cf_client(allow_prompt=True)
+    from . import trace
+    from .client_pack import build_server_pack
+    from .fs_ops import Copier
+    from .installer import apply_server_pack, fetch_server_pack, is_server_dir
+    from .pack_cache import PackCache
+
+    cf = _get_cf_client(allow_prompt=True, cache=cache)
     pack_id, saved_state = _resolve_pack_id(
         cf,
         source=source,
@@ -182,17 +251,22 @@ def _install_or_update(
         no_prompt=no_prompt,
     )
 
-    mode_update = _is_server_dir(server_dir)
-
-    mode_update = _is_server_dir(server_dir)
+    mode_update = is_server_dir(server_dir)
     mode = "update" if mode_update else "install"
     print(f"Target directory: {server_dir}")
     print(f"Mode: {mode}")
     print(f"Resolving server pack for packId={pack_id}...")
 
-    url, server_file_id, display_name = cf.resolve_server_pack_download(
-        pack_id, file_id=file_id
-    )
+    client_file: Optional[ModFile] = None
+    with trace.span("resolve", pack_id=pack_id):
+        try:
+            server_file, display_name = cf.get_server_pack_file(pack_id, file_id=file_id)
+        except NoServerPackError:
+            # Many packs only publish the client ZIP; build the server from its manifest.
+            client_file = cf.get_client_pack_file(pack_id, file_id=file_id)
+            server_file, display_name = client_file, client_file.display_name
+            print("No server pack published; building one from the client pack.")
+    server_file_id = server_file.id
 
     if check_only and mode_update:
         installed = saved_state.installed_file_id if saved_state else None
@@ -202,43 +276,41 @@ def _install_or_update(
         print(f"Update available: installed={installed} latest={server_file_id}")
         return 0
 
-    with tempfile.TemporaryDirectory(prefix="mcserver_") as tmp:
-        tmp_path = Path(tmp)
-        zip_path = tmp_path / "serverpack.zip"
-        extracted = tmp_path / "extracted"
-        extracted.mkdir(parents=True, exist_ok=True)
-
-        print(f"Server pack: {display_name} (fileId={server_file_id})")
-        download_to(url, zip_path, label="Downloading server pack")
-        print("Extracting...")
-        extract_zip(zip_path, extracted)
-        pack_root = detect_pack_root(extracted)
-        print(f"Detected pack root: {pack_root}")
-
-        if mode_update:
-            # Safety check already implied by mode_update
-            print(
-                "Applying update (replacing modpack folders, preserving world/server config)..."
-            )
-            update_from_pack_root(pack_root, server_dir)
-            print("Update complete.")
-        else:
-            print("Installing into target directory...")
-            copy_tree_contents(pack_root, server_dir)
-            print("Install complete.")
-
-    if accept_eula:
-        print("Writing eula.txt (eula=true)...")
-        (server_dir / "eula.txt").write_text("eula=true\n", encoding="utf-8")
-
-    new_state = saved_state or ServerState()
-    new_state.pack_id = pack_id
-    new_state.installed_file_id = server_file_id
-    new_state.installed_display_name = display_name
-    new_state.last_updated_at = utc_now_iso()
-    new_state.save(server_dir)
-    print("Saved .mcserver/state.json")
-
+    print(f"Server pack: {display_name} (fileId={server_file_id})")
+    pack_cache = PackCache(max_bytes=AppConfig.load().pack_cache_max_bytes)
+    if client_file is not None:
+        zip_path = build_server_pack(
+            cf,
+            pack_id,
+            client_file,
+            display_name,
+            pack_cache=pack_cache,
+            jobs=mod_jobs,
+            connections=connections,
+        )
+    else:
+        zip_path = fetch_server_pack(
+            cf,
+            pack_id,
+            server_file,
+            display_name,
+            pack_cache=pack_cache,
+            connections=connections,
+        )
+    copier = Copier(copy_mode)
+    apply_server_pack(
+        server_dir,
+        zip_path,
+        pack_id=pack_id,
+        server_file_id=server_file_id,
+        display_name=display_name,
+        saved_state=saved_state,
+        accept_eula=accept_eula,
+        copier=copier,
+        store=_object_store(copier),
+        pack_sha1=pack_cache.sha1(server_file_id),
+        snapshot_retention=_snapshot_retention(),
+    )
     return 0
 
 
@@ -253,6 +325,10 @@ def cmd_install(args: argparse.Namespace) -> int:
         use_arg=args.use_arg,
         no_prompt=args.no_prompt,
         check_only=False,
+        cache=_response_cache(args),
+        connections=args.connections,
+        copy_mode=args.copy_mode,
+        mod_jobs=args.mod_jobs,
     )
 
 
@@ -268,6 +344,10 @@ def cmd_update(args: argparse.Namespace) -> int:
         use_arg=args.use_arg,
         no_prompt=args.no_prompt,
         check_only=args.check_only,
+        cache=_response_cache(args),
+        connections=args.connections,
+        copy_mode=args.copy_mode,
+        mod_jobs=args.mod_jobs,
     )
 
 
@@ -283,6 +363,267 @@ def cmd_status(args: argparse.Namespace) -> int:
     return 0
 
 
+def _store_root(cfg: AppConfig) -> Optional[Path]:
+    return Path(cfg.object_store_path) if cfg.object_store_path else None
+
+
+def _object_store(copier: Optional[Copier] = None) -> Optional[ObjectStore]:
+    from .store import ObjectStore
+
+    cfg = AppConfig.load()
+    if not cfg.object_store_enabled:
+        return None
+    return ObjectStore(_store_root(cfg), copier=copier)
+
+
+def _snapshot_retention() -> int:
+    from .snapshots import DEFAULT_RETAIN
+
+    retain = AppConfig.load().snapshot_retention
+    return DEFAULT_RETAIN if retain is None else retain
+
+
+def cmd_rollback(args: argparse.Namespace) -> int:
+    from .fs_ops import staging_dir
+    from .snapshots import SnapshotStore
+
+    server_dir = Path(args.dir).resolve()
+    store = SnapshotStore(server_dir)
+    snapshots = store.list()
+    if args.list:
+        for snap in snapshots:
+            print(
+                f"{snap.seq}\tfileId={snap.file_id}\ttaken={snap.created_at}\t"
+                f"{snap.display_name}"
+            )
+        return 0
+    if not snapshots:
+        raise UserFacingError("No update snapshots to roll back to in this folder.")
+    snap = snapshots[0]
+    current = ServerState.load(server_dir)
+    print(
+        f"Rolling back {current.installed_display_name if current else '(unknown)'} "
+        f"to {snap.display_name} (fileId={snap.file_id})..."
+    )
+    with staging_dir(server_dir) as staging:
+        store.restore(snap, staging)
+    print(f"Rollback complete. {len(snapshots) - 1} older snapshot(s) remain.")
+    return 0
+
+
+def cmd_store_status(args: argparse.Namespace) -> int:
+    from .download import format_bytes
+    from .store import ObjectStore
+
+    cfg = AppConfig.load()
+    store = ObjectStore(_store_root(cfg))
+    objects = store.objects()
+    unused = [o for o in objects if o.stat().st_nlink <= 1]
+    print(f"enabled={cfg.object_store_enabled}")
+    print(f"path={store.root}")
+    print(f"objects={len(objects)} ({format_bytes(sum(o.stat().st_size for o in objects))})")
+    print(f"unused={len(unused)} ({format_bytes(sum(o.stat().st_size for o in unused))})")
+    for server_dir in store.refs():
+        print(f"server={server_dir}{'' if server_dir.is_dir() else ' (missing)'}")
+    return 0
+
+
+def cmd_store_gc(args: argparse.Namespace) -> int:
+    from .download import format_bytes
+    from .store import ObjectStore
+
+    store = ObjectStore(_store_root(AppConfig.load()))
+    result = store.gc()
+    print(
+        f"Removed {result.objects_removed} unused object(s), freed "
+        f"{format_bytes(result.bytes_freed)}; dropped {result.refs_removed} "
+        "missing server(s)"
+    )
+    return 0
+
+
+def cmd_store_detach(args: argparse.Namespace) -> int:
+    from .store import STORE_DIRS, detach
+
+    server_dir = Path(args.dir).resolve()
+    paths = [Path(p) for p in args.paths] or [server_dir / d for d in STORE_DIRS]
+    detached = 0
+    for path in paths:
+        if path.is_dir():
+            files = [p for p in path.rglob("*") if p.is_file() and not p.is_symlink()]
+        else:
+            files = [path]
+        for f in files:
+            detached += detach(f)
+    print(f"Gave {detached} file(s) a private copy; safe to edit in place.")
+    return 0
+
+
+def _fleet_servers(args: argparse.Namespace) -> List[FleetServer]:
+    from .fleet import discover_servers, read_fleet_file
+
+    paths = [Path(d) for d in args.dirs]
+    if args.file:
+        paths += read_fleet_file(Path(args.file))
+    if not paths:
+        raise UserFacingError("Give server directories, a folder of them, or --file.")
+    return discover_servers(paths)
+
+
+def _print_fleet_results(results: List[FleetResult]) -> int:
+    for r in results:
+        versions = f"{r.installed_file_id} -> {r.latest_file_id}"
+        line = f"{r.status}\tpackId={r.pack_id}\t{versions}\t{r.server_dir}"
+        print(f"{line}\t{r.message}" if r.message else line)
+    failed = sum(1 for r in results if not r.ok)
+    print(f"{len(results)} server(s), {failed} failed")
+    return 1 if failed else 0
+
+
+def cmd_fleet_check(args: argparse.Namespace) -> int:
+    from .fleet import check_fleet
+
+    servers = _fleet_servers(args)
+    cf = _get_cf_client(allow_prompt=True, cache=_response_cache(args))
+    results = check_fleet(cf, servers, jobs=args.jobs)
+    if args.json:
+        rows = [
+            {
+                "dir": str(r.server_dir),
+                "packId": r.pack_id,
+                "installedFileId": r.installed_file_id,
+                "latestFileId": r.latest_file_id,
+                "latestDisplayName": r.latest_display_name,
+                "status": r.status,
+                "message": r.message or None,
+            }
+            for r in results
+        ]
+        print(json.dumps(rows, indent=2))
+        return 1 if any(not r.ok for r in results) else 0
+    return _print_fleet_results(results)
+
+
+def cmd_fleet_update(args: argparse.Namespace) -> int:
+    from .fleet import update_fleet
+    from .pack_cache import PackCache
+
+    servers = _fleet_servers(args)
+    cf = _get_cf_client(allow_prompt=True, cache=_response_cache(args))
+    results = update_fleet(
+        cf,
+        servers,
+        pack_cache=PackCache(max_bytes=AppConfig.load().pack_cache_max_bytes),
+        jobs=args.jobs,
+        connections=args.connections,
+        copy_mode=args.copy_mode,
+        store_factory=_object_store,
+        snapshot_retention=_snapshot_retention(),
+        force=args.force,
+    )
+    return _print_fleet_results(results)
+
+
+def _parse_size(value: str) -> int:
+    units = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+    text = value.strip().upper().rstrip("B")
+    suffix = text[-1:] if text[-1:] in units else ""
+    number = text[: len(text) - len(suffix)]
+    try:
+        return int(float(number) * units[suffix])
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size: {value!r} (e.g. 500M, 4G)")
+
+
+def cmd_cache_list(args: argparse.Namespace) -> int:
+    from .download import format_bytes
+    from .pack_cache import PackCache
+
+    cache = PackCache(max_bytes=AppConfig.load().pack_cache_max_bytes)
+    entries = cache.entries()
+    for e in entries:
+        print(
+            f"{e.file_id}\tpackId={e.pack_id}\t{format_bytes(e.size)}\t"
+            f"lastUsed={utc_iso(e.last_used_at)}\t{e.display_name}"
+        )
+    total = sum(e.size for e in entries)
+    print(
+        f"{len(entries)} pack(s), {format_bytes(total)} of "
+        f"{format_bytes(cache.max_bytes)} in {cache.root}"
+    )
+    return 0
+
+
+def cmd_cache_prune(args: argparse.Namespace) -> int:
+    from .download import format_bytes
+    from .pack_cache import PackCache
+
+    cache = PackCache(max_bytes=AppConfig.load().pack_cache_max_bytes)
+    max_bytes = 0 if args.all else args.max_size
+    removed = cache.prune(max_bytes)
+    for e in removed:
+        print(f"Removed {e.file_id} ({format_bytes(e.size)}) {e.display_name}")
+    print(f"Freed {format_bytes(sum(e.size for e in removed))}")
+    return 0
+
+
+def cmd_config_set_pack_cache_size(args: argparse.Namespace) -> int:
+    from .download import format_bytes
+
+    cfg = AppConfig.load()
+    cfg.pack_cache_max_bytes = args.size
+    cfg.save()
+    print(f"Server pack cache limit set to {format_bytes(args.size)}")
+    return 0
+
+
+def cmd_config_set_snapshot_retention(args: argparse.Namespace) -> int:
+    if args.count < 0:
+        raise UserFacingError("Snapshot retention cannot be negative.")
+    cfg = AppConfig.load()
+    cfg.snapshot_retention = args.count
+    cfg.save()
+    print(f"Keeping {args.count} update snapshot(s) per server for rollback")
+    return 0
+
+
+def cmd_config_set_rate_limit(args: argparse.Namespace) -> int:
+    if args.rate < 0:
+        raise UserFacingError("Rate limit cannot be negative.")
+    if args.burst is not None and args.burst < 1:
+        raise UserFacingError("Burst must be at least 1.")
+    cfg = AppConfig.load()
+    cfg.api_rate_limit = args.rate
+    cfg.api_burst = args.burst
+    cfg.save()
+    if args.rate:
+        burst = args.burst or DEFAULT_BURST
+        print(f"CurseForge API limited to {args.rate:g} request(s)/s, bursts of {burst}")
+    else:
+        print("CurseForge API requests are no longer rate limited")
+    return 0
+
+
+def cmd_config_set_object_store(args: argparse.Namespace) -> int:
+    cfg = AppConfig.load()
+    cfg.object_store_enabled = True
+    if args.path:
+        cfg.object_store_path = str(Path(args.path).resolve())
+    cfg.save()
+    root = cfg.object_store_path or object_store_dir()
+    print(f"Object store enabled at {root}")
+    print("Keep it on the same filesystem as your servers so files can be hardlinked.")
+    return 0
+
+
+def cmd_config_unset_object_store(args: argparse.Namespace) -> int:
+    cfg = AppConfig.load()
+    cfg.object_store_enabled = False
+    cfg.save()
+    print("Object store disabled; servers keep their existing files.")
+    return 0
+
+
 def cmd_config_set_api_key(args: argparse.Namespace) -> int:
     api_key = args.api_key
     if not api_key:
@@ -290,6 +631,8 @@ def cmd_config_set_api_key(args: argparse.Namespace) -> int:
             raise UserFacingError(
                 "No API key provided. Pass it as an argument or run interactively."
             )
+        import getpass
+
         api_key = getpass.getpass("CurseForge API key: ").strip()
     if not api_key:
         raise UserFacingError("API key cannot be empty.")
@@ -305,6 +648,16 @@ def cmd_config_show(args: argparse.Namespace) -> int:
     cfg = AppConfig.load()
     print(f"configPath={config_path()}")
     print(f"curseforgeApiKey={mask_secret(cfg.curseforge_api_key)}")
+    verified_at = cfg.api_key_verified_at if cfg.api_key_verified() else None
+    print(f"apiKeyVerifiedAt={verified_at or '(never)'}")
+    print(f"packCacheMaxBytes={cfg.pack_cache_max_bytes or '(default)'}")
+    retain = cfg.snapshot_retention
+    print(f"snapshotRetention={'(default)' if retain is None else retain}")
+    print(f"objectStoreEnabled={cfg.object_store_enabled}")
+    print(f"objectStorePath={cfg.object_store_path or '(default)'}")
+    rate = cfg.api_rate_limit
+    print(f"apiRateLimit={'(default)' if rate is None else f'{rate:g}'}")
+    print(f"apiBurst={cfg.api_burst or '(default)'}")
     return 0
 
 
@@ -323,9 +676,57 @@ def cmd_config_path(args: argparse.Namespace) -> int:
 
 def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(prog="mcserver")
+    parser.add_argument(
+        "--timings",
+        action="store_true",
+        help="Print how long each phase took (and bytes, files, requests) to stderr",
+    )
+    parser.add_argument(
+        "--trace-json",
+        metavar="FILE",
+        default=None,
+        help="Write the per-phase timings as JSON to FILE",
+    )
     sub = parser.add_subparsers(dest="cmd", required=True)
 
-    p_install = sub.add_parser("install", help="Smart install/update in a directory")
+    # Shared by every command that talks to the CurseForge API.
+    api_opts = argparse.ArgumentParser(add_help=False)
+    api_cache = api_opts.add_mutually_exclusive_group()
+    api_cache.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Neither read nor write the API response cache",
+    )
+    api_cache.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Revalidate cached API responses instead of trusting them",
+    )
+
+    # Shared by install and update: how a pack is fetched and applied.
+    apply_opts = argparse.ArgumentParser(add_help=False)
+    apply_opts.add_argument(
+        "--connections",
+        type=int,
+        default=DEFAULT_SEGMENTS,
+        help="Parallel range requests for the server pack download",
+    )
+    apply_opts.add_argument(
+        "--copy-mode",
+        choices=COPY_MODES,
+        default="auto",
+        help="How unchanged files are carried over (default: best the filesystem supports)",
+    )
+    apply_opts.add_argument(
+        "--mod-jobs",
+        type=int,
+        default=DEFAULT_MOD_JOBS,
+        help="Parallel mod downloads when building from a client pack",
+    )
+
+    p_install = sub.add_parser(
+        "install", parents=[api_opts, apply_opts], help="Smart install/update in a directory"
+    )
     p_install.add_argument(
         "source", nargs="?", help="Modpack ID (digits) or CurseForge modpack URL"
     )
@@ -337,7 +738,9 @@ def build_parser() -> argparse.ArgumentParser:
     p_install.add_argument("--no-prompt", action="store_true")
     p_install.set_defaults(func=cmd_install)
 
-    p_update = sub.add_parser("update", help="Alias of install (interchangeable)")
+    p_update = sub.add_parser(
+        "update", parents=[api_opts, apply_opts], help="Alias of install (interchangeable)"
+    )
     p_update.add_argument(
         "source", nargs="?", help="Modpack ID (digits) or CurseForge modpack URL"
     )
@@ -354,33 +757,144 @@ def build_parser() -> argparse.ArgumentParser:
     p_status.add_argument("--dir", default=".")
     p_status.set_defaults(func=cmd_status)
 
+    p_rollback = sub.add_parser(
+        "rollback", help="Restore the pack version before the last update"
+    )
+    p_rollback.add_argument("--dir", default=".")
+    p_rollback.add_argument(
+        "--list", action="store_true", help="List the snapshots kept for rollback"
+    )
+    p_rollback.set_defaults(func=cmd_rollback)
+
+    p_fleet = sub.add_parser("fleet", help="Operate on many server directories at once")
+    fleet_sub = p_fleet.add_subparsers(dest="fleet_cmd", required=True)
+
+    # Shared by fleet commands: which servers to operate on.
+    fleet_opts = argparse.ArgumentParser(add_help=False)
+    fleet_opts.add_argument(
+        "dirs", nargs="*", help="Server directories, or folders containing them"
+    )
+    fleet_opts.add_argument(
+        "--file", default=None, help="File listing server directories, one per line"
+    )
+    fleet_opts.add_argument(
+        "--jobs",
+        type=int,
+        default=DEFAULT_FLEET_JOBS,
+        help="Servers processed (and API batches requested) in parallel",
+    )
+
+    p_fleet_check = fleet_sub.add_parser(
+        "check",
+        parents=[api_opts, fleet_opts],
+        help="Compare installed and latest server packs; downloads nothing",
+    )
+    p_fleet_check.add_argument("--json", action="store_true", help="Print JSON")
+    p_fleet_check.set_defaults(func=cmd_fleet_check)
+
+    p_fleet_update = fleet_sub.add_parser(
+        "update",
+        parents=[api_opts, fleet_opts],
+        help="Update servers to their pack's latest version, one download per pack",
+    )
+    p_fleet_update.add_argument(
+        "--connections",
+        type=int,
+        default=DEFAULT_SEGMENTS,
+        help="Parallel range requests per server pack download",
+    )
+    p_fleet_update.add_argument("--copy-mode", choices=COPY_MODES, default="auto")
+    p_fleet_update.add_argument(
+        "--force", action="store_true", help="Reapply even to up-to-date servers"
+    )
+    p_fleet_update.set_defaults(func=cmd_fleet_update)
+
     p_cf = sub.add_parser("cf", help="CurseForge helper commands")
     cf_sub = p_cf.add_subparsers(dest="cf_cmd", required=True)
 
-    p_cf_resolve = cf_sub.add_parser("resolve", help="Resolve modpack URL to pack ID")
+    p_cf_resolve = cf_sub.add_parser(
+        "resolve", parents=[api_opts], help="Resolve modpack URL to pack ID"
+    )
     p_cf_resolve.add_argument("url")
     p_cf_resolve.set_defaults(func=cmd_cf_resolve)
 
-    p_cf_search = cf_sub.add_parser("search", help="Search modpacks")
+    p_cf_search = cf_sub.add_parser(
+        "search", parents=[api_opts], help="Search modpacks"
+    )
     p_cf_search.add_argument("query")
     p_cf_search.add_argument("--game-version", default=None)
     p_cf_search.add_argument("--limit", type=int, default=10)
     p_cf_search.set_defaults(func=cmd_cf_search)
 
-    p_cf_files = cf_sub.add_parser("files", help="List modpack files")
+    p_cf_files = cf_sub.add_parser(
+        "files", parents=[api_opts], help="List modpack files"
+    )
     p_cf_files.add_argument("pack_id")
     p_cf_files.add_argument("--server-only", action="store_true")
     p_cf_files.add_argument("--limit", type=int, default=20)
     p_cf_files.set_defaults(func=cmd_cf_files)
 
+    p_cf_latest = cf_sub.add_parser(
+        "latest",
+        parents=[api_opts],
+        help="Show the latest server pack of one or more modpacks (batched)",
+    )
+    p_cf_latest.add_argument("pack_ids", nargs="+", type=int)
+    p_cf_latest.set_defaults(func=cmd_cf_latest)
+
     p_cf_dl = cf_sub.add_parser(
-        "download-url", help="Resolve direct download URL for server pack"
+        "download-url",
+        parents=[api_opts],
+        help="Resolve direct download URL for server pack",
     )
     p_cf_dl.add_argument("pack_id")
     p_cf_dl.add_argument("--file-id", type=int, default=None)
     p_cf_dl.add_argument("--verbose", action="store_true")
     p_cf_dl.set_defaults(func=cmd_cf_download_url)
 
+    p_cache = sub.add_parser("cache", help="Manage the shared server pack cache")
+    cache_sub = p_cache.add_subparsers(dest="cache_cmd", required=True)
+
+    p_cache_list = cache_sub.add_parser("list", help="List cached server packs")
+    p_cache_list.set_defaults(func=cmd_cache_list)
+
+    p_cache_prune = cache_sub.add_parser(
+        "prune", help="Evict least recently used packs down to a size limit"
+    )
+    p_cache_prune.add_argument(
+        "--max-size",
+        type=_parse_size,
+        default=None,
+        help="Target size, e.g. 2G (default: the configured limit)",
+    )
+    p_cache_prune.add_argument(
+        "--all", action="store_true", help="Remove every cached pack"
+    )
+    p_cache_prune.set_defaults(func=cmd_cache_prune)
+
+    p_store = sub.add_parser(
+        "store", help="Manage the shared object store for mods/ and libraries/"
+    )
+    store_sub = p_store.add_subparsers(dest="store_cmd", required=True)
+
+    p_store_status = store_sub.add_parser("status", help="Show object store usage")
+    p_store_status.set_defaults(func=cmd_store_status)
+
+    p_store_gc = store_sub.add_parser(
+        "gc", help="Delete objects no server links to any more"
+    )
+    p_store_gc.set_defaults(func=cmd_store_gc)
+
+    p_store_detach = store_sub.add_parser(
+        "detach",
+        help="Replace shared files with private copies before editing them in place",
+    )
+    p_store_detach.add_argument("--dir", default=".")
+    p_store_detach.add_argument(
+        "paths", nargs="*", help="Files or folders (default: mods/ and libraries/)"
+    )
+    p_store_detach.set_defaults(func=cmd_store_detach)
+
     p_config = sub.add_parser(
         "config", help="Persist and inspect local mcserver config"
     )
@@ -394,6 +908,48 @@ def build_parser() -> argparse.ArgumentParser:
     )
     p_cfg_set.set_defaults(func=cmd_config_set_api_key)
 
+    p_cfg_cache = cfg_sub.add_parser(
+        "set-pack-cache-size", help="Set the server pack cache size limit"
+    )
+    p_cfg_cache.add_argument("size", type=_parse_size, help="e.g. 500M, 4G")
+    p_cfg_cache.set_defaults(func=cmd_config_set_pack_cache_size)
+
+    p_cfg_snap = cfg_sub.add_parser(
+        "set-snapshot-retention",
+        help="Set how many update snapshots each server keeps for rollback",
+    )
+    p_cfg_snap.add_argument("count", type=int, help="0 disables rollback snapshots")
+    p_cfg_snap.set_defaults(func=cmd_config_set_snapshot_retention)
+
+    p_cfg_rate = cfg_sub.add_parser(
+        "set-rate-limit",
+        help="Set the CurseForge API request budget shared by a run",
+    )
+    p_cfg_rate.add_argument(
+        "rate", type=float, help=f"Requests per second; 0 disables (default {DEFAULT_RATE:g})"
+    )
+    p_cfg_rate.add_argument(
+        "--burst",
+        type=int,
+        default=None,
+        help=f"Requests allowed at once before the rate applies (default {DEFAULT_BURST})",
+    )
+    p_cfg_rate.set_defaults(func=cmd_config_set_rate_limit)
+
+    p_cfg_store = cfg_sub.add_parser(
+        "set-object-store",
+        help="Share mods/ and libraries/ between servers through an object store",
+    )
+    p_cfg_store.add_argument(
+        "path", nargs="?", help="Store location (default: in the cache dir)"
+    )
+    p_cfg_store.set_defaults(func=cmd_config_set_object_store)
+
+    p_cfg_unstore = cfg_sub.add_parser(
+        "unset-object-store", help="Stop using the object store for new installs"
+    )
+    p_cfg_unstore.set_defaults(func=cmd_config_unset_object_store)
+
     p_cfg_path = cfg_sub.add_parser("path", help="Print the config file path")
     p_cfg_path.set_defaults(func=cmd_config_path)
 
@@ -408,14 +964,37 @@ def build_parser() -> argparse.ArgumentParser:
     return parser
 
 
+def _report_trace(tracer: Tracer, *, timings: bool, json_path: Optional[str]) -> None:
+    from . import trace
+
+    trace.disable()
+    if timings:
+        print("Timings:", file=sys.stderr)
+        for line in tracer.summary():
+            print(f"  {line}", file=sys.stderr)
+    if json_path:
+        try:
+            tracer.write_json(Path(json_path))
+        except OSError as e:
+            print(f"Could not write trace to {json_path}: {e}", file=sys.stderr)
+
+
 def main(argv: Optional[list[str]] = None) -> int:
     argv = argv if argv is not None else sys.argv[1:]
 
     parser = build_parser()
     args = parser.parse_args(argv)
 
+    tracer: Optional[Tracer] = None
+    if args.timings or args.trace_json:
+        from . import trace
+
+        tracer = trace.enable()
     try:
-        return int(args.func(args))
+        if tracer is None:
+            return int(args.func(args))
+        with tracer.span(f"mcserver {args.cmd}"):
+            return int(args.func(args))
     except MissingApiKeyError as e:
         print(str(e), file=sys.stderr)
         return 2
@@ -425,6 +1004,9 @@ def main(argv: Optional[list[str]] = None) -> int:
     except KeyboardInterrupt:
         print("Interrupted", file=sys.stderr)
         return 130
+    finally:
+        if tracer is not None:
+            _report_trace(tracer, timings=args.timings, json_path=args.trace_json)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,300 @@
+from __future__ import annotations
+
+import dataclasses
+import json
+import os
+import shutil
+import sys
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, List, Optional, Set, Tuple
+
+from . import trace
+from .config import download_staging_dir, jar_cache_dir
+from .curseforge import CurseForgeClient, ModFile
+from .defaults import DEFAULT_MOD_JOBS
+from .download import DEFAULT_SEGMENTS, download_to, format_bytes
+from .errors import UserFacingError
+from .http_client import ConnectionPool
+from .pack_cache import PackCache
+
+
+CLIENT_MANIFEST = "manifest.json"
+# CurseForge classId of Minecraft mods; resource packs, shaders etc. differ.
+MODS_CLASS_ID = 6
+
+
+@dataclass
+class ManifestFile:
+    project_id: int
+    file_id: int
+    required: bool = True
+
+
+@dataclass
+class ClientManifest:
+    """The ``manifest.json`` of a CurseForge client pack export."""
+
+    name: str
+    minecraft_version: str
+    mod_loaders: List[str]
+    files: List[ManifestFile]
+    overrides: str = "overrides"
+
+    @staticmethod
+    def from_zip(zip_path: Path) -> "ClientManifest":
+        try:
+            with zipfile.ZipFile(zip_path) as zf:
+                data = json.loads(zf.read(CLIENT_MANIFEST))
+            minecraft = data.get("minecraft") or {}
+            return ClientManifest(
+                name=str(data.get("name", "")),
+                minecraft_version=str(minecraft.get("version", "")),
+                mod_loaders=[str(l["id"]) for l in minecraft.get("modLoaders") or []],
+                files=[
+                    ManifestFile(
+                        project_id=int(f["projectID"]),
+                        file_id=int(f["fileID"]),
+                        required=bool(f.get("required", True)),
+                    )
+                    for f in data.get("files") or []
+                ],
+                overrides=str(data.get("overrides") or "overrides").strip("/"),
+            )
+        except KeyError:
+            raise UserFacingError(
+                f"The client pack has no usable {CLIENT_MANIFEST}; cannot build a server from it."
+            )
+        except (zipfile.BadZipFile, ValueError, TypeError) as e:
+            raise UserFacingError(f"Could not read the client pack's {CLIENT_MANIFEST}: {e}")
+
+
+@dataclass
+class PackMod:
+    project_id: int
+    name: str
+    file: ModFile
+
+
+@dataclass
+class ResolvedMods:
+    mods: List[PackMod] = field(default_factory=list)
+    # (name, reason) of manifest entries left out of the server.
+    skipped: List[Tuple[str, str]] = field(default_factory=list)
+
+
+def is_client_only(f: ModFile) -> bool:
+    """Whether the file is tagged for the Client environment and not the Server."""
+    return "Client" in f.game_versions and "Server" not in f.game_versions
+
+
+def resolve_mods(
+    cf: CurseForgeClient, manifest: ClientManifest, *, jobs: int = DEFAULT_MOD_JOBS
+) -> ResolvedMods:
+    """Metadata of every manifest entry, split into server mods and skipped ones.
+
+    Two bulk lookups (files, then projects) cover the whole manifest; only
+    files the bulk endpoint leaves out are fetched one by one.
+    """
+    wanted = [f for f in manifest.files if f.required]
+    files = cf.get_files((f.file_id for f in wanted), jobs=jobs)
+    projects = cf.get_mods((f.project_id for f in manifest.files), jobs=jobs)
+    resolved = ResolvedMods()
+    for entry in manifest.files:
+        project = projects.get(entry.project_id) or {}
+        name = str(project.get("name") or f"project {entry.project_id}")
+        if not entry.required:
+            resolved.skipped.append((name, "optional"))
+            continue
+        mod_file = files.get(entry.file_id) or cf.get_file(entry.project_id, entry.file_id)
+        class_id = project.get("classId")
+        if class_id is not None and int(class_id) != MODS_CLASS_ID:
+            resolved.skipped.append((name, "not a mod"))
+        elif is_client_only(mod_file):
+            resolved.skipped.append((name, "client-only"))
+        else:
+            resolved.mods.append(PackMod(entry.project_id, name, mod_file))
+    return resolved
+
+
+class JarCache:
+    """Mod jars shared by every assembled server pack, by CurseForge file id.
+
+    ``<fileId>/<fileName>`` only appears once its download has been verified
+    against the published size and hashes, so any jar present is complete.
+    """
+
+    def __init__(self, root: Optional[Path] = None):
+        self.root = root or jar_cache_dir()
+
+    def path(self, f: ModFile) -> Path:
+        name = Path(f.file_name).name
+        if not name or name.startswith("."):
+            name = f"{f.id}.jar"
+        return self.root / str(f.id) / name
+
+    def get(self, f: ModFile) -> Optional[Path]:
+        path = self.path(f)
+        try:
+            size = path.stat().st_size
+        except OSError:
+            return None
+        if f.file_length and size != f.file_length:
+            return None
+        return path
+
+    def fetch(self, url: str, f: ModFile, *, pool: Optional[ConnectionPool] = None) -> Path:
+        dest = self.path(f)
+        tmp = dest.with_name(f".{dest.name}.{threading.get_ident()}.part")
+        # Jars are small: one stream each, no range probe, no progress line.
+        download_to(
+            url,
+            tmp,
+            label=None,
+            pool=pool,
+            segments=1,
+            expected_hashes=f.hashes,
+            expected_size=f.file_length,
+        )
+        os.replace(tmp, dest)
+        return dest
+
+
+def fetch_mod_jars(
+    cf: CurseForgeClient,
+    mods: List[PackMod],
+    *,
+    jar_cache: JarCache,
+    jobs: int = DEFAULT_MOD_JOBS,
+) -> List[Path]:
+    """Jar paths for ``mods`` in order, downloading the uncached ones on ``jobs`` threads.
+
+    Every mod is attempted; failures are reported together afterwards.
+    """
+    paths: List[Optional[Path]] = [jar_cache.get(m.file) for m in mods]
+    missing = [i for i, p in enumerate(paths) if p is None]
+    if not missing:
+        return [p for p in paths if p is not None]
+
+    # One keep-alive connection per worker, reused from jar to jar.
+    pool = ConnectionPool(max_per_host=jobs)
+    done = 0
+    failures: List[str] = []
+
+    def fetch(mod: PackMod) -> Path:
+        url = mod.file.download_url or cf.get_download_url(mod.project_id, mod.file.id)
+        return jar_cache.fetch(url, mod.file, pool=pool)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+            futures = {executor.submit(trace.bind(fetch), mods[i]): i for i in missing}
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    paths[i] = future.result()
+                except Exception as e:
+                    failures.append(f"{mods[i].name} ({mods[i].file.file_name}): {e}")
+                done += 1
+                sys.stderr.write(f"\rDownloading mods: {done}/{len(missing)}")
+                sys.stderr.flush()
+        sys.stderr.write("\n")
+    finally:
+        pool.close()
+    if failures:
+        raise UserFacingError(
+            f"{len(failures)} mod(s) could not be downloaded:\n  " + "\n  ".join(failures)
+        )
+    return [p for p in paths if p is not None]
+
+
+def build_server_zip(
+    client_zip: Path, manifest: ClientManifest, jars: List[Path], dest: Path
+) -> None:
+    """Write a server-pack-shaped ZIP: the client overrides plus ``mods/<jar>``.
+
+    Members are stored uncompressed: jars are compressed already and the ZIP
+    is only extracted locally.
+    """
+    prefix = manifest.overrides + "/"
+    written: Set[str] = set()
+    with zipfile.ZipFile(client_zip) as src, zipfile.ZipFile(
+        dest, "w", zipfile.ZIP_STORED
+    ) as out:
+        for info in src.infolist():
+            name = info.filename.replace("\\", "/")
+            if not name.startswith(prefix) or name.endswith("/"):
+                continue
+            rel = name[len(prefix) :]
+            target = zipfile.ZipInfo(rel, date_time=info.date_time)
+            target.external_attr = info.external_attr
+            target.file_size = info.file_size
+            with src.open(info) as r, out.open(target, "w") as w:
+                shutil.copyfileobj(r, w, 1024 * 1024)
+            written.add(rel)
+        for jar in jars:
+            rel = f"mods/{jar.name}"
+            if rel not in written:  # a jar shipped in overrides wins
+                out.write(jar, rel)
+                written.add(rel)
+
+
+def build_server_pack(
+    cf: CurseForgeClient,
+    pack_id: int,
+    client_file: ModFile,
+    display_name: str,
+    *,
+    pack_cache: PackCache,
+    jobs: int = DEFAULT_MOD_JOBS,
+    connections: int = DEFAULT_SEGMENTS,
+    log: Callable[[str], None] = print,
+) -> Path:
+    """Server pack ZIP assembled from a client pack, cached under its fileId.
+
+    For packs that publish no server pack: the client ZIP's manifest lists
+    the mods, which are resolved in bulk and downloaded in parallel into a
+    shared jar cache; client-only mods and non-mod projects are left out.
+    """
+    # The assembled ZIP has none of the client file's hashes or length.
+    key = dataclasses.replace(client_file, hashes={}, file_length=None)
+    zip_path = pack_cache.get(key)
+    if zip_path is not None:
+        log(f"Using cached server pack built from the client pack: {zip_path}")
+        return zip_path
+
+    staging = download_staging_dir()
+    client_zip = staging / f"clientpack-{client_file.id}.zip"
+    with trace.span("download", file_id=client_file.id):
+        download_to(
+            client_file.download_url or cf.get_download_url(pack_id, client_file.id),
+            client_zip,
+            label="Downloading client pack",
+            segments=connections,
+            resume=True,
+            expected_hashes=client_file.hashes,
+            expected_size=client_file.file_length,
+        )
+    manifest = ClientManifest.from_zip(client_zip)
+    with trace.span("resolve_mods"):
+        resolved = resolve_mods(cf, manifest, jobs=jobs)
+    for name, reason in resolved.skipped:
+        log(f"Skipping {name} ({reason})")
+    log(f"Fetching {len(resolved.mods)} mod(s) with {jobs} parallel downloads...")
+    with trace.span("fetch_mods"):
+        jars = fetch_mod_jars(cf, resolved.mods, jar_cache=JarCache(), jobs=jobs)
+    log(f"Mods ready: {format_bytes(sum(p.stat().st_size for p in jars))} in {len(jars)} jar(s)")
+
+    assembled = staging / f"assembled-{client_file.id}.zip"
+    with trace.span("assemble"):
+        build_server_zip(client_zip, manifest, jars, assembled)
+    client_zip.unlink()
+    if manifest.mod_loaders:
+        log(
+            f"Note: this pack runs on {', '.join(manifest.mod_loaders)} for Minecraft "
+            f"{manifest.minecraft_version}; with no server pack published, install "
+            "that loader's server files yourself."
+        )
+    return pack_cache.add(assembled, key, pack_id=pack_id, display_name=display_name)
@@ -14,13 +14,62 @@ def _config_dir() -> Path:
     return Path.home() / ".config" / "mcserver"
 
 
+def _cache_dir() -> Path:
+    xdg = os.environ.get("XDG_CACHE_HOME")
+    if xdg:
+        return Path(xdg) / "mcserver"
+    return Path.home() / ".cache" / "mcserver"
+
+
 def config_path() -> Path:
     return _config_dir() / "config.json"
 
 
+def download_staging_dir() -> Path:
+    return _cache_dir() / "downloads"
+
+
+def pack_cache_dir() -> Path:
+    return _cache_dir() / "packs"
+
+
+def object_store_dir() -> Path:
+    return _cache_dir() / "store"
+
+
+def jar_cache_dir() -> Path:
+    return _cache_dir() / "jars"
+
+
+def response_cache_dir() -> Path:
+    return _config_dir() / "cache"
+
+
+def key_fingerprint(api_key: str) -> str:
+    import hashlib  # only when a key is checked; it loads OpenSSL
+
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
 @dataclass
 class AppConfig:
     curseforge_api_key: Optional[str] = None
+    # Fingerprint of the key the API last accepted, and when. A new key has a
+    # different fingerprint, so the verdict never carries over.
+    api_key_fingerprint: Optional[str] = None
+    api_key_verified_at: Optional[str] = None
+    # Size limit of the server pack ZIP cache; None means the default.
+    pack_cache_max_bytes: Optional[int] = None
+    # Update snapshots kept per server dir for rollback; None means the default.
+    snapshot_retention: Optional[int] = None
+    # Opt-in shared object store for mods/ and libraries/. It must be on the
+    # same filesystem as the servers for files to be hardlinked.
+    object_store_enabled: bool = False
+    object_store_path: Optional[str] = None
+    # CurseForge API budget shared by every request of a run: sustained
+    # requests per second (0 for unlimited) and burst size. None: defaults.
+    api_rate_limit: Optional[float] = None
+    api_burst: Optional[int] = None
 
     @staticmethod
     def load() -> "AppConfig":
@@ -28,12 +77,45 @@ class AppConfig:
         if not path.exists():
             return AppConfig()
         data = json.loads(path.read_text(encoding="utf-8"))
-        return AppConfig(curseforge_api_key=data.get("curseforgeApiKey"))
+        return AppConfig(
+            curseforge_api_key=data.get("curseforgeApiKey"),
+            api_key_fingerprint=data.get("apiKeyFingerprint"),
+            api_key_verified_at=data.get("apiKeyVerifiedAt"),
+            pack_cache_max_bytes=data.get("packCacheMaxBytes"),
+            snapshot_retention=data.get("snapshotRetention"),
+            object_store_enabled=bool(data.get("objectStoreEnabled", False)),
+            object_store_path=data.get("objectStorePath"),
+            api_rate_limit=data.get("apiRateLimit"),
+            api_burst=data.get("apiBurst"),
+        )
+
+    def api_key_verified(self) -> bool:
+        return bool(self.curseforge_api_key) and self.api_key_fingerprint == (
+            key_fingerprint(self.curseforge_api_key or "")
+        )
+
+    def mark_api_key_verified(self, verified_at: str) -> None:
+        self.api_key_fingerprint = (
+            key_fingerprint(self.curseforge_api_key)
+            if self.curseforge_api_key
+            else None
+        )
+        self.api_key_verified_at = verified_at if self.curseforge_api_key else None
 
     def save(self) -> None:
         path = config_path()
         path.parent.mkdir(parents=True, exist_ok=True)
-        payload = {"curseforgeApiKey": self.curseforge_api_key}
+        payload = {
+            "curseforgeApiKey": self.curseforge_api_key,
+            "apiKeyFingerprint": self.api_key_fingerprint,
+            "apiKeyVerifiedAt": self.api_key_verified_at,
+            "packCacheMaxBytes": self.pack_cache_max_bytes,
+            "snapshotRetention": self.snapshot_retention,
+            "objectStoreEnabled": self.object_store_enabled,
+            "objectStorePath": self.object_store_path,
+            "apiRateLimit": self.api_rate_limit,
+            "apiBurst": self.api_burst,
+        }
         path.write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
         try:
             os.chmod(path, 0o600)
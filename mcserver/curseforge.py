@@ -1,13 +1,31 @@
 from __future__ import annotations
 
+import itertools
+import json
 import re
-from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Tuple
-from urllib.error import HTTPError
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
-from .errors import InvalidApiKeyError, MissingApiKeyError, UserFacingError
+from . import trace
+from .cache import CachedResponse, ResponseCache
+from .errors import (
+    InvalidApiKeyError,
+    MissingApiKeyError,
+    NoServerPackError,
+    NotFoundError,
+    UserFacingError,
+)
 from .config import AppConfig
-from .http_client import http_get_json
+from .http_client import (
+    ConnectionPool,
+    HttpResponse,
+    HttpStatusError,
+    RequestScheduler,
+    http_request,
+)
 
 
 @dataclass(frozen=True)
@@ -18,35 +36,250 @@ class ModFile:
     is_server_pack: bool
     server_pack_file_id: Optional[int]
     download_url: Optional[str]
+    # Lowercase hex digests keyed by "sha1"/"md5", as published by CurseForge.
+    hashes: Dict[str, str] = field(default_factory=dict, hash=False)
+    file_length: Optional[int] = None
+    file_name: str = ""
+    # Minecraft versions, loaders and "Client"/"Server" environment tags.
+    game_versions: Tuple[str, ...] = ()
+
+    @staticmethod
+    def from_api(item: Dict[str, Any]) -> "ModFile":
+        hashes: Dict[str, str] = {}
+        for h in item.get("hashes") or []:
+            algo = HASH_ALGOS.get(h.get("algo"))
+            if algo and h.get("value"):
+                hashes[algo] = str(h["value"]).lower()
+        length = item.get("fileLength")
+        return ModFile(
+            id=int(item.get("id")),
+            display_name=str(item.get("displayName", "")),
+            file_date=str(item.get("fileDate", "")),
+            is_server_pack=bool(item.get("isServerPack", False)),
+            server_pack_file_id=item.get("serverPackFileId"),
+            download_url=item.get("downloadUrl"),
+            hashes=hashes,
+            file_length=int(length) if length else None,
+            file_name=str(item.get("fileName", "")),
+            game_versions=tuple(str(v) for v in item.get("gameVersions") or ()),
+        )
+
+
+# CurseForge HashAlgo enum values.
+HASH_ALGOS = {1: "sha1", 2: "md5"}
+
+
+# The API caps pageSize at 50 for file listings.
+FILES_PAGE_SIZE = 50
+
+# Ids sent per request to the bulk POST endpoints (/v1/mods, /v1/mods/files).
+BULK_BATCH_SIZE = 100
+
+
+def pick_server_pack(files: Iterable[ModFile]) -> Optional[Tuple[int, str, str]]:
+    """Returns (server_pack_file_id, display_name, file_date), or None if no files.
+
+    Prefers explicit server packs; otherwise only the newest file counts. If
+    it has no serverPackFileId, raises NoServerPackError rather than falling
+    back to an older release's server pack.
+    """
+    files = sorted(files, key=lambda f: f.file_date, reverse=True)
+    if not files:
+        return None
+    for f in files:
+        if f.is_server_pack:
+            return f.id, f.display_name, f.file_date
+    newest = files[0]
+    if newest.server_pack_file_id:
+        return int(newest.server_pack_file_id), newest.display_name, newest.file_date
+    raise NoServerPackError("No server pack found for this modpack.")
+
+
+def api_error(e: HttpStatusError) -> UserFacingError:
+    """The UserFacingError to raise for a failed CurseForge API request."""
+    if e.code == 403:
+        return InvalidApiKeyError(
+            "CurseForge API returned 403 Forbidden (API key invalid). "
+            "Update it with: mcserver config set-api-key"
+        )
+    if e.code == 404:
+        return NotFoundError(f"CurseForge API request failed: HTTP {e.code} {e.reason}")
+    return UserFacingError(f"CurseForge API request failed: HTTP {e.code} {e.reason}")
+
+
+def search_params(
+    *,
+    query: str,
+    game_version: Optional[str],
+    index: int,
+    page_size: int,
+    sort_field: int,
+    sort_order: str,
+) -> Dict[str, Any]:
+    """Query parameters of a /v1/mods/search request for Minecraft modpacks."""
+    params: Dict[str, Any] = {
+        "gameId": 432,
+        "classId": 4471,
+        "index": index,
+        "pageSize": page_size,
+        "searchFilter": query,
+        "sortField": sort_field,
+        "sortOrder": sort_order,
+    }
+    if game_version:
+        params["gameVersion"] = game_version
+    return params
+
+
+def is_last_page(payload: Dict[str, Any], next_index: int, page_size: int) -> bool:
+    """Whether a file-listing page ends the listing; next_index counts files seen."""
+    items = payload.get("data", [])
+    total = (payload.get("pagination") or {}).get("totalCount")
+    if not items or (total is not None and next_index >= int(total)):
+        return True
+    return total is None and len(items) < page_size
 
 
 class CurseForgeClient:
     BASE_URL = "https://api.curseforge.com"
 
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        *,
+        pool: Optional[ConnectionPool] = None,
+        cache: Optional[ResponseCache] = None,
+        scheduler: Optional[RequestScheduler] = None,
+    ):
         cfg = AppConfig.load()
         self.api_key = api_key or cfg.curseforge_api_key
         if not self.api_key:
             raise MissingApiKeyError(
                 "Missing CurseForge API key. Run: mcserver config set-api-key"
             )
+        # None means the process-wide keep-alive pool from http_client.
+        self.pool = pool
+        self.cache = cache
+        # None means the process-wide rate limit and retry policy.
+        self.scheduler = scheduler
+        # The key is never probed up front: the first real request proves it.
+        # on_key_verified runs once after the first accepted request (unless
+        # key_verified is already set); on_invalid_key may return a replacement
+        # key after a 403, and the request is retried once with it. Both run
+        # under _key_lock: concurrent requests that hit the same 403 prompt
+        # once, and the others retry with whatever key that prompt gave.
+        self.key_verified = False
+        self.on_key_verified: Optional[Callable[[str], None]] = None
+        self.on_invalid_key: Optional[Callable[[], Optional[str]]] = None
+        self._key_lock = threading.Lock()
+        self._given_up_key: Optional[str] = None
 
     def _wrap_http_errors(self, fn, *args, **kwargs):
         try:
             return fn(*args, **kwargs)
-        except HTTPError as e:
-            if e.code == 403:
-                raise InvalidApiKeyError(
-                    "CurseForge API returned 403 Forbidden (API key invalid). "
-                    "Update it with: mcserver config set-api-key"
-                )
-            raise UserFacingError(
-                f"CurseForge API request failed: HTTP {e.code} {e.reason}"
-            )
+        except HttpStatusError as e:
+            raise api_error(e)
 
     def _headers(self) -> Dict[str, str]:
         return {"Accept": "application/json", "x-api-key": self.api_key}
 
+    def _fetch(
+        self,
+        url: str,
+        *,
+        method: str = "GET",
+        params: Optional[Dict[str, Any]] = None,
+        body: Optional[bytes] = None,
+        extra_headers: Optional[Dict[str, str]] = None,
+    ) -> HttpResponse:
+        reprompted = False
+        while True:
+            sent_key = self.api_key
+            headers = self._headers()
+            headers.update(extra_headers or {})
+            try:
+                with trace.span("api", method=method, path=url[len(self.BASE_URL) :]):
+                    resp = self._wrap_http_errors(
+                        http_request,
+                        method,
+                        url,
+                        headers=headers,
+                        params=params,
+                        body=body,
+                        pool=self.pool,
+                        scheduler=self.scheduler,
+                    )
+                    trace.count(bytes=len(resp.content))
+            except InvalidApiKeyError:
+                with self._key_lock:
+                    if reprompted:
+                        raise
+                    reprompted = True
+                    if self.api_key != sent_key:
+                        continue  # replaced by another request meanwhile
+                    self.key_verified = False
+                    if self.on_invalid_key is None or self._given_up_key == sent_key:
+                        raise
+                    new_key = self.on_invalid_key()
+                    if not new_key:
+                        self._given_up_key = sent_key
+                        raise
+                    self.api_key = new_key
+                continue
+            if not self.key_verified:
+                with self._key_lock:
+                    if not self.key_verified and self.api_key == sent_key:
+                        self.key_verified = True
+                        if self.on_key_verified is not None:
+                            self.on_key_verified(sent_key)
+            return resp
+
+    def _get_json(
+        self, path: str, *, endpoint: str, params: Optional[Dict[str, Any]] = None
+    ) -> Any:
+        url = f"{self.BASE_URL}{path}"
+        cache = self.cache
+        if cache is None:
+            return self._fetch(url, params=params).json()
+
+        key = cache.key(url, params)
+        entry = cache.get(key)
+        headers: Dict[str, str] = {}
+        if entry is not None:
+            if cache.is_fresh(entry, endpoint):
+                return entry.payload
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+
+        resp = self._fetch(url, params=params, extra_headers=headers)
+        if resp.status == 304 and entry is not None:
+            entry.stored_at = time.time()
+            cache.put(key, entry)
+            return entry.payload
+
+        payload = resp.json()
+        cache.put(
+            key,
+            CachedResponse(
+                url=url,
+                stored_at=time.time(),
+                payload=payload,
+                etag=resp.headers.get("ETag"),
+                last_modified=resp.headers.get("Last-Modified"),
+            ),
+        )
+        return payload
+
+    def _post_json(self, path: str, payload: Any) -> Any:
+        return self._fetch(
+            f"{self.BASE_URL}{path}",
+            method="POST",
+            body=json.dumps(payload).encode("utf-8"),
+            extra_headers={"Content-Type": "application/json"},
+        ).json()
+
     def search_modpacks(
         self,
         *,
@@ -57,23 +290,15 @@ class CurseForgeClient:
         sort_field: int = 2,
         sort_order: str = "desc",
     ) -> List[Dict[str, Any]]:
-        params: Dict[str, Any] = {
-            "gameId": 432,
-            "classId": 4471,
-            "index": index,
-            "pageSize": page_size,
-            "searchFilter": query,
-            "sortField": sort_field,
-            "sortOrder": sort_order,
-        }
-        if game_version:
-            params["gameVersion"] = game_version
-        payload = self._wrap_http_errors(
-            http_get_json,
-            f"{self.BASE_URL}/v1/mods/search",
-            headers=self._headers(),
-            params=params,
+        params = search_params(
+            query=query,
+            game_version=game_version,
+            index=index,
+            page_size=page_size,
+            sort_field=sort_field,
+            sort_order=sort_order,
         )
+        payload = self._get_json("/v1/mods/search", endpoint="search", params=params)
         return payload.get("data", [])
 
     def resolve_pack_id_from_url(self, url: str) -> int:
@@ -89,31 +314,86 @@ class CurseForgeClient:
             raise UserFacingError("No modpack found for the given URL.")
         return int(results[0]["id"])
 
-    def list_files(self, pack_id: int) -> List[ModFile]:
-        payload = self._wrap_http_errors(
-            http_get_json,
-            f"{self.BASE_URL}/v1/mods/{pack_id}/files",
-            headers=self._headers(),
+    def iter_file_pages(
+        self, pack_id: int, *, page_size: int = FILES_PAGE_SIZE
+    ) -> Iterator[List[ModFile]]:
+        """Yields the pack's files one API page at a time, newest first."""
+        index = 0
+        while True:
+            payload = self._get_json(
+                f"/v1/mods/{pack_id}/files",
+                endpoint="files",
+                params={"index": index, "pageSize": page_size},
+            )
+            items = payload.get("data", [])
+            yield [ModFile.from_api(item) for item in items]
+
+            index += len(items)
+            if is_last_page(payload, index, page_size):
+                return
+
+    def iter_files(
+        self, pack_id: int, *, page_size: int = FILES_PAGE_SIZE
+    ) -> Iterator[ModFile]:
+        """Lazily yields every file of the pack; later pages are fetched on demand."""
+        for page in self.iter_file_pages(pack_id, page_size=page_size):
+            yield from page
+
+    def list_files(self, pack_id: int, *, limit: Optional[int] = None) -> List[ModFile]:
+        page_size = min(FILES_PAGE_SIZE, limit) if limit else FILES_PAGE_SIZE
+        return list(
+            itertools.islice(self.iter_files(pack_id, page_size=page_size), limit)
         )
-        files: List[ModFile] = []
-        for item in payload.get("data", []):
-            files.append(
-                ModFile(
-                    id=int(item.get("id")),
-                    display_name=str(item.get("displayName", "")),
-                    file_date=str(item.get("fileDate", "")),
-                    is_server_pack=bool(item.get("isServerPack", False)),
-                    server_pack_file_id=item.get("serverPackFileId"),
-                    download_url=item.get("downloadUrl"),
-                )
+
+    def get_file(self, pack_id: int, file_id: int) -> ModFile:
+        try:
+            payload = self._get_json(
+                f"/v1/mods/{pack_id}/files/{file_id}", endpoint="files"
             )
+        except NotFoundError:
+            raise UserFacingError(f"File id {file_id} not found for pack {pack_id}.")
+        data = payload.get("data")
+        if not data:
+            raise UserFacingError(f"File id {file_id} not found for pack {pack_id}.")
+        return ModFile.from_api(data)
+
+    def get_mods(
+        self, pack_ids: Iterable[int], *, jobs: int = 1
+    ) -> Dict[int, Dict[str, Any]]:
+        """Fetches mod/modpack objects in bulk, keyed by id. Unknown ids are omitted.
+
+        With ``jobs`` > 1 the batches are requested concurrently.
+        """
+        mods: Dict[int, Dict[str, Any]] = {}
+        payloads = _map_concurrent(
+            lambda batch: self._post_json("/v1/mods", {"modIds": batch}),
+            _batches(pack_ids),
+            jobs,
+        )
+        for payload in payloads:
+            for item in payload.get("data", []):
+                mods[int(item["id"])] = item
+        return mods
+
+    def get_files(
+        self, file_ids: Iterable[int], *, jobs: int = 1
+    ) -> Dict[int, ModFile]:
+        """Fetches file metadata in bulk, keyed by file id. Unknown ids are omitted."""
+        files: Dict[int, ModFile] = {}
+        payloads = _map_concurrent(
+            lambda batch: self._post_json("/v1/mods/files", {"fileIds": batch}),
+            _batches(file_ids),
+            jobs,
+        )
+        for payload in payloads:
+            for item in payload.get("data", []):
+                f = ModFile.from_api(item)
+                files[f.id] = f
         return files
 
     def get_download_url(self, pack_id: int, file_id: int) -> str:
-        payload = self._wrap_http_errors(
-            http_get_json,
-            f"{self.BASE_URL}/v1/mods/{pack_id}/files/{file_id}/download-url",
-            headers=self._headers(),
+        payload = self._get_json(
+            f"/v1/mods/{pack_id}/files/{file_id}/download-url", endpoint="download-url"
         )
         data = payload.get("data")
         if not data:
@@ -121,57 +401,135 @@ class CurseForgeClient:
         return str(data)
 
     def choose_latest_server_pack(self, pack_id: int) -> Tuple[int, str, str]:
-        """Returns (server_pack_file_id, display_name, file_date)."""
-        files = self.list_files(pack_id)
-        if not files:
+        """Returns (server_pack_file_id, display_name, file_date).
+
+        Pages arrive newest first and the newest file settles it, so only the
+        first page is fetched instead of every file the pack ever published.
+        """
+        page = next(iter(self.iter_file_pages(pack_id)), [])
+        choice = pick_server_pack(page)
+        if choice is None:
             raise UserFacingError("No files found for this modpack.")
+        return choice
 
-        # Prefer explicit server packs; otherwise use newest file that points to serverPackFileId.
-        server_candidates = [f for f in files if f.is_server_pack]
-        if server_candidates:
-            server_candidates.sort(key=lambda f: f.file_date, reverse=True)
-            f = server_candidates[0]
-            return f.id, f.display_name, f.file_date
+    def choose_latest_server_packs(
+        self, pack_ids: Iterable[int], *, jobs: int = 1
+    ) -> Dict[int, Tuple[int, str, str]]:
+        """Batch form of choose_latest_server_pack, keyed by pack id.
 
-        # Fallback: newest file overall that has serverPackFileId
-        files.sort(key=lambda f: f.file_date, reverse=True)
-        newest = files[0]
-        if newest.server_pack_file_id:
-            return (
-                int(newest.server_pack_file_id),
-                newest.display_name,
-                newest.file_date,
-            )
+        One bulk /v1/mods request per BULK_BATCH_SIZE packs; a mod's
+        latestFiles usually settles it. Packs where they don't (none, or no
+        server pack for the newest) fall back to the first page of files, as
+        in choose_latest_server_pack. Packs whose newest release has no server
+        pack are left out of the result; any other failure raises. With ``jobs``
+        > 1 the bulk batches, and then the fallback scans, run concurrently.
+        """
+        pack_ids = list(dict.fromkeys(int(p) for p in pack_ids))
+        mods = self.get_mods(pack_ids, jobs=jobs)
+        chosen: Dict[int, Tuple[int, str, str]] = {}
+        fallback: List[int] = []
+        for pack_id in pack_ids:
+            latest = (mods.get(pack_id) or {}).get("latestFiles") or []
+            try:
+                choice = pick_server_pack(ModFile.from_api(item) for item in latest)
+            except NoServerPackError:
+                # latestFiles leaves out server pack files that the listing
+                # has; let the listing decide, as choose_latest_server_pack does.
+                choice = None
+            if choice is None:
+                fallback.append(pack_id)
+            else:
+                chosen[pack_id] = choice
 
-        raise UserFacingError("No server pack found for this modpack.")
+        def scan(pack_id: int) -> Optional[Tuple[int, str, str]]:
+            try:
+                return self.choose_latest_server_pack(pack_id)
+            except NoServerPackError:
+                return None  # network and API errors propagate
 
-    def resolve_server_pack_download(
+        for pack_id, choice in zip(fallback, _map_concurrent(scan, fallback, jobs)):
+            if choice is not None:
+                chosen[pack_id] = choice
+        return {p: chosen[p] for p in pack_ids if p in chosen}
+
+    def get_server_pack_file(
         self, pack_id: int, *, file_id: Optional[int] = None
-    ) -> Tuple[str, int, str]:
-        """Returns (download_url, server_pack_file_id, display_name)."""
+    ) -> Tuple[ModFile, str]:
+        """Returns (server pack file metadata, display_name of the release).
+
+        The metadata carries the server pack's hashes, length and (usually)
+        its download URL.
+        """
         if file_id is None:
             server_file_id, display_name, _file_date = self.choose_latest_server_pack(
                 pack_id
             )
-        else:
-            # User provided a file id. It might be a server pack or a normal file.
-            # We resolve it by scanning for an exact id match; if it's not a server pack
-            # but has serverPackFileId, use that.
-            files = self.list_files(pack_id)
-            match = next((f for f in files if f.id == file_id), None)
-            if not match:
-                raise UserFacingError(
-                    f"File id {file_id} not found for pack {pack_id}."
-                )
-            display_name = match.display_name
-            if match.is_server_pack:
-                server_file_id = match.id
-            elif match.server_pack_file_id:
-                server_file_id = int(match.server_pack_file_id)
-            else:
-                raise UserFacingError(
-                    "Selected file does not have an associated server pack."
-                )
+            return self.get_file(pack_id, server_file_id), display_name
+
+        # User provided a file id. It might be a server pack or a normal file;
+        # if it's not a server pack but has serverPackFileId, use that.
+        match = self.get_file(pack_id, file_id)
+        if match.is_server_pack:
+            return match, match.display_name
+        if match.server_pack_file_id:
+            server_file = self.get_file(pack_id, int(match.server_pack_file_id))
+            return server_file, match.display_name
+        raise NoServerPackError("Selected file does not have an associated server pack.")
+
+    def get_client_pack_file(
+        self, pack_id: int, *, file_id: Optional[int] = None
+    ) -> ModFile:
+        """The client pack ZIP (``file_id``, else the newest release) of the pack."""
+        if file_id is not None:
+            return self.get_file(pack_id, file_id)
+        for page in self.iter_file_pages(pack_id):
+            clients = [f for f in page if not f.is_server_pack]
+            if clients:
+                return max(clients, key=lambda f: f.file_date)
+        raise UserFacingError("No files found for this modpack.")
+
+    def get_server_pack_files(
+        self, pack_ids: Iterable[int], *, jobs: int = 1
+    ) -> Dict[int, Tuple[ModFile, str]]:
+        """Batch form of get_server_pack_file for the latest versions.
+
+        Packs with no server pack are left out of the result.
+        """
+        chosen = self.choose_latest_server_packs(pack_ids, jobs=jobs)
+        files = self.get_files(
+            (server_id for server_id, _n, _d in chosen.values()), jobs=jobs
+        )
+        resolved: Dict[int, Tuple[ModFile, str]] = {}
+        for pack_id, (server_file_id, display_name, _file_date) in chosen.items():
+            meta = files.get(server_file_id) or self.get_file(pack_id, server_file_id)
+            resolved[pack_id] = (meta, str(display_name))
+        return resolved
+
+    def server_pack_url(self, pack_id: int, server_file: ModFile) -> str:
+        return server_file.download_url or self.get_download_url(
+            pack_id, server_file.id
+        )
+
+    def resolve_server_pack_download(
+        self, pack_id: int, *, file_id: Optional[int] = None
+    ) -> Tuple[str, int, str]:
+        """Returns (download_url, server_pack_file_id, display_name)."""
+        server_file, display_name = self.get_server_pack_file(pack_id, file_id=file_id)
+        url = self.server_pack_url(pack_id, server_file)
+        return url, int(server_file.id), str(display_name)
+
+
+def _batches(ids: Iterable[int], size: int = BULK_BATCH_SIZE) -> Iterator[List[int]]:
+    unique = list(dict.fromkeys(int(i) for i in ids))
+    for start in range(0, len(unique), size):
+        yield unique[start : start + size]
+
 
-        url = self.get_download_url(pack_id, server_file_id)
-        return url, int(server_file_id), str(display_name)
+def _map_concurrent(fn: Callable[[Any], Any], items: Iterable[Any], jobs: int) -> List[Any]:
+    """``[fn(i) for i in items]``, on up to ``jobs`` threads when there are several."""
+    items = list(items)
+    if jobs <= 1 or len(items) <= 1:
+        return [fn(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(jobs, len(items))) as pool:
+        futures = [pool.submit(trace.bind(fn), item) for item in items]
+        return [future.result() for future in futures]
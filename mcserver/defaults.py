@@ -0,0 +1,19 @@
+"""Defaults and choices the CLI parser needs, in a module with no imports.
+
+The modules that use them import them from here, so building the parser
+for a local command (``status``, ``config path``) loads none of the HTTP,
+download or filesystem code.
+"""
+
+# Parallel range requests per server pack download.
+DEFAULT_SEGMENTS = 4
+# Parallel mod downloads when building a server from a client pack.
+DEFAULT_MOD_JOBS = 8
+# Servers updated at once by ``mcserver fleet``.
+DEFAULT_FLEET_JOBS = 4
+
+COPY_MODES = ("auto", "reflink", "hardlink", "copy-range", "copy")
+
+# Default API budget: bursts of DEFAULT_BURST, then DEFAULT_RATE requests/s.
+DEFAULT_RATE = 10.0
+DEFAULT_BURST = 20
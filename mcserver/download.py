@@ -1,11 +1,26 @@
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import hashlib
+import json
+import os
 from pathlib import Path
 import sys
-from urllib.request import urlopen
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
 
+from . import trace
+from .defaults import DEFAULT_SEGMENTS
+from .errors import ChecksumMismatchError
+from .http_client import ConnectionPool, HttpStatusError, default_pool
 
-def _format_bytes(n: int) -> str:
+
+# Below this many bytes per segment, extra connections cost more than they win.
+MIN_SEGMENT_BYTES = 4 * 1024 * 1024
+
+
+def format_bytes(n: int) -> str:
     value = float(n)
     for unit in ("B", "KB", "MB", "GB"):
         if value < 1024 or unit == "GB":
@@ -16,40 +31,500 @@ def _format_bytes(n: int) -> str:
     return f"{int(value)}B"
 
 
-def download_to(
+class _Progress:
+    """Single stderr progress line fed by any number of download threads.
+
+    With no ``label`` it only counts, for downloads run many at a time.
+    """
+
+    def __init__(self, label: Optional[str], total_bytes: Optional[int]):
+        self.label = label
+        self.total_bytes = total_bytes
+        self.downloaded = 0
+        self._last_pct = -1
+        self._last_bytes_print = 0
+        self._lock = threading.Lock()
+
+    def add(self, n: int) -> None:
+        trace.count(bytes=n)
+        with self._lock:
+            self.downloaded += n
+            downloaded = self.downloaded
+            if self.label is None:
+                return
+            if self.total_bytes:
+                pct = int(downloaded * 100 / self.total_bytes)
+                if pct != self._last_pct and (pct % 2 == 0 or pct == 100):
+                    sys.stderr.write(
+                        f"\r{self.label}: {pct:3d}% ({format_bytes(downloaded)} / {format_bytes(self.total_bytes)})"
+                    )
+                    sys.stderr.flush()
+                    self._last_pct = pct
+            else:
+                if downloaded - self._last_bytes_print >= 5 * 1024 * 1024:
+                    sys.stderr.write(f"\r{self.label}: {format_bytes(downloaded)}")
+                    sys.stderr.flush()
+                    self._last_bytes_print = downloaded
+
+
+def verify_hashes(
+    expected: Dict[str, str], actual: Dict[str, str], *, what: str
+) -> None:
+    """Raises ChecksumMismatchError if any algorithm both sides know disagrees."""
+    for algo, value in expected.items():
+        got = actual.get(algo)
+        if got is not None and got.lower() != value.lower():
+            raise ChecksumMismatchError(
+                f"{what} failed {algo} verification (expected {value}, got {got})."
+            )
+
+
+class _StreamHasher:
+    """Hashes a file in byte order while it is being written out of order.
+
+    Chunks that arrive at the hash cursor are hashed from memory as they
+    pass through. Chunks written further ahead (other ranges, or data left
+    by an interrupted run) are only noted, and read back with pread once
+    the cursor reaches them; they are still in the page cache by then.
+
+    One thread at a time owns the cursor and hashes outside the lock, so
+    the other writers only ever wait for the span bookkeeping.
+    """
+
+    def __init__(self, algos: Iterable[str], *, span_size: int):
+        self._hashes = {algo: hashlib.new(algo) for algo in algos}
+        self._span_size = span_size
+        self._spans: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._hashing = False
+        self.fd: Optional[int] = None
+        self.pos = 0
+
+    def _drain(self, data: Optional[bytes] = None) -> None:
+        """Hash ``data`` (at the cursor), then every span that lines up after it."""
+        try:
+            while True:
+                if data is not None:
+                    for h in self._hashes.values():
+                        h.update(data)
+                with self._lock:
+                    if data is not None:
+                        self.pos += len(data)
+                    end = self._spans.pop(self.pos, None)
+                    if end is None:
+                        self._hashing = False
+                        return
+                    start = self.pos
+                if self.fd is None:
+                    raise RuntimeError("out-of-order data without a file to read back")
+                data = os.pread(self.fd, end - start, start)
+                if len(data) != end - start:
+                    raise OSError(f"Short read while hashing at offset {start}")
+        except BaseException:
+            with self._lock:
+                self._hashing = False
+            raise
+
+    def feed(self, offset: int, chunk: bytes) -> None:
+        with self._lock:
+            if offset != self.pos or self._hashing:
+                self._spans[offset] = offset + len(chunk)
+                return
+            self._hashing = True
+        self._drain(chunk)
+
+    def mark_written(self, start: int, end: int) -> None:
+        """Bytes [start, end) are already on disk (e.g. from a resumed run)."""
+        with self._lock:
+            for offset in range(start, end, self._span_size):
+                self._spans[offset] = min(offset + self._span_size, end)
+            if self._hashing or self.pos not in self._spans:
+                return
+            self._hashing = True
+        self._drain()
+
+    def hexdigests(self) -> Dict[str, str]:
+        return {algo: h.hexdigest() for algo, h in self._hashes.items()}
+
+
+class _RangeNotHonoured(Exception):
+    """The server answered a Range request with the full body."""
+
+
+# How often (in bytes written) a resumable download persists its progress.
+SIDECAR_SAVE_INTERVAL = 8 * 1024 * 1024
+
+
+@dataclass
+class _Partial:
+    """Sidecar of a resumable download: what was being fetched and how far."""
+
+    url: str
+    size: int
+    validator: Optional[str]
+    # [start, end (inclusive), bytes written from start]
+    ranges: List[List[int]]
+
+    @staticmethod
+    def load(path: Path) -> "Optional[_Partial]":
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            return _Partial(
+                url=str(data["url"]),
+                size=int(data["size"]),
+                validator=data.get("validator"),
+                ranges=[[int(v) for v in r] for r in data["ranges"]],
+            )
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def save(self, path: Path) -> None:
+        payload = {
+            "url": self.url,
+            "size": self.size,
+            "validator": self.validator,
+            "ranges": self.ranges,
+        }
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(json.dumps(payload) + "\n", encoding="utf-8")
+        os.replace(tmp, path)
+
+    def matches(self, url: str, size: int, validator: Optional[str]) -> bool:
+        if self.size != size or self.validator != validator:
+            return False
+        # Without a validator the URL is the only identity we have.
+        return validator is not None or self.url == url
+
+    @property
+    def done(self) -> int:
+        return sum(r[2] for r in self.ranges)
+
+
+class _RangeLog:
+    """Thread-safe progress bookkeeping for a _Partial, saved to its sidecar."""
+
+    def __init__(self, partial: _Partial, sidecar: Optional[Path]):
+        self.partial = partial
+        self.sidecar = sidecar
+        self._unsaved = 0
+        self._lock = threading.Lock()
+
+    def advance(self, index: int, n: int) -> None:
+        with self._lock:
+            self.partial.ranges[index][2] += n
+            self._unsaved += n
+            if self.sidecar is not None and self._unsaved >= SIDECAR_SAVE_INTERVAL:
+                self.partial.save(self.sidecar)
+                self._unsaved = 0
+
+    def flush(self) -> None:
+        with self._lock:
+            if self.sidecar is not None:
+                self.partial.save(self.sidecar)
+                self._unsaved = 0
+
+
+def _probe(
+    url: str, pool: ConnectionPool
+) -> Tuple[str, Optional[int], bool, Optional[str]]:
+    """HEAD the URL.
+
+    Returns (final_url, content_length, accepts_byte_ranges, validator) where
+    validator is the ETag, else Last-Modified, if the server sent one.
+    """
+    try:
+        with pool.request("HEAD", url) as resp:
+            resp.read()
+    except (OSError, HttpStatusError):
+        return url, None, False, None
+    if resp.status >= 400:
+        return url, None, False, None
+    total = resp.headers.get("Content-Length")
+    total_bytes = int(total) if total and total.isdigit() else None
+    accepts = (resp.headers.get("Accept-Ranges") or "").lower() == "bytes"
+    validator = resp.headers.get("ETag") or resp.headers.get("Last-Modified")
+    return resp.url, total_bytes, accepts, validator
+
+
+def _split_ranges(total_bytes: int, segments: int) -> List[Tuple[int, int]]:
+    """Inclusive (start, end) byte ranges covering the whole file."""
+    size = -(-total_bytes // segments)
+    return [
+        (start, min(start + size, total_bytes) - 1)
+        for start in range(0, total_bytes, size)
+    ]
+
+
+def _fetch_range(
+    pool: ConnectionPool,
+    url: str,
+    fd: int,
+    index: int,
+    log: _RangeLog,
+    *,
+    chunk_size: int,
+    progress: _Progress,
+    hasher: _StreamHasher,
+    cancelled: threading.Event,
+) -> None:
+    start, end, done = log.partial.ranges[index]
+    offset = start + done
+    if offset > end:
+        return
+    headers = {"Range": f"bytes={offset}-{end}"}
+    if log.partial.validator:
+        # A changed file comes back as a full 200 instead of a stale range.
+        headers["If-Range"] = log.partial.validator
+    with pool.request("GET", url, headers=headers) as resp:
+        if resp.status == 200:
+            raise _RangeNotHonoured()
+        if resp.status != 206:
+            raise HttpStatusError(resp.url, resp.status, resp.reason, resp.headers)
+        while not cancelled.is_set():
+            chunk = resp.read(min(chunk_size, end + 1 - offset))
+            if not chunk:
+                break
+            os.pwrite(fd, chunk, offset)
+            hasher.feed(offset, chunk)
+            offset += len(chunk)
+            log.advance(index, len(chunk))
+            progress.add(len(chunk))
+            if offset > end:
+                break
+    if offset != end + 1 and not cancelled.is_set():
+        raise OSError(
+            f"Download truncated: got bytes {start}-{offset - 1} of range {start}-{end}"
+        )
+
+
+def _download_ranges(
+    pool: ConnectionPool,
+    url: str,
+    path: Path,
+    log: _RangeLog,
+    *,
+    fresh: bool,
+    chunk_size: int,
+    progress: _Progress,
+    hasher: _StreamHasher,
+) -> None:
+    partial = log.partial
+    cancelled = threading.Event()
+    with open(path, "w+b" if fresh else "r+b") as f:
+        fd = f.fileno()
+        hasher.fd = fd
+        if fresh:
+            try:
+                os.posix_fallocate(fd, 0, partial.size)
+            except (AttributeError, OSError):
+                f.truncate(partial.size)
+            log.flush()
+        else:
+            for start, _end, done in partial.ranges:
+                if done:
+                    hasher.mark_written(start, start + done)
+
+        pending = [i for i, r in enumerate(partial.ranges) if r[0] + r[2] <= r[1]]
+        try:
+            with ThreadPoolExecutor(
+                max_workers=max(1, len(pending)), thread_name_prefix="mcserver-dl"
+            ) as pool_exec:
+                futures = [
+                    pool_exec.submit(
+                        trace.bind(_fetch_range),
+                        pool,
+                        url,
+                        fd,
+                        index,
+                        log,
+                        chunk_size=chunk_size,
+                        progress=progress,
+                        hasher=hasher,
+                        cancelled=cancelled,
+                    )
+                    for index in pending
+                ]
+                try:
+                    for future in futures:
+                        future.result()
+                except BaseException:
+                    cancelled.set()
+                    raise
+        finally:
+            # Whatever happened, record how far each range got for the next run.
+            log.flush()
+
+
+def _download_single(
+    pool: ConnectionPool,
     url: str,
     dest: Path,
     *,
-    chunk_size: int = 1024 * 256,
-    label: str = "Downloading",
+    chunk_size: int,
+    progress: _Progress,
+    hasher: _StreamHasher,
+    expected_size: Optional[int],
 ) -> None:
-    dest.parent.mkdir(parents=True, exist_ok=True)
-    with urlopen(url) as resp, open(dest, "wb") as f:
+    with pool.request("GET", url) as resp, open(dest, "wb") as f:
+        if resp.status >= 400:
+            raise HttpStatusError(resp.url, resp.status, resp.reason, resp.headers)
         total = resp.headers.get("Content-Length")
         total_bytes = int(total) if total and total.isdigit() else None
-
-        downloaded = 0
-        last_pct = -1
-        last_bytes_print = 0
+        _check_size(expected_size, total_bytes, what=dest.name)
+        if progress.total_bytes is None:
+            progress.total_bytes = total_bytes
+        offset = 0
         while True:
             chunk = resp.read(chunk_size)
             if not chunk:
                 break
             f.write(chunk)
-            downloaded += len(chunk)
+            hasher.feed(offset, chunk)
+            offset += len(chunk)
+            progress.add(len(chunk))
+
+
+def partial_paths(dest: Path) -> Tuple[Path, Path]:
+    """(partial file, sidecar) used while a resumable download of dest runs."""
+    return dest.with_name(dest.name + ".part"), dest.with_name(dest.name + ".part.json")
+
 
-            if total_bytes:
-                pct = int(downloaded * 100 / total_bytes)
-                if pct != last_pct and (pct % 2 == 0 or pct == 100):
+def download_to(
+    url: str,
+    dest: Path,
+    *,
+    chunk_size: int = 1024 * 256,
+    label: Optional[str] = "Downloading",
+    pool: Optional[ConnectionPool] = None,
+    segments: int = DEFAULT_SEGMENTS,
+    resume: bool = False,
+    expected_hashes: Optional[Dict[str, str]] = None,
+    expected_size: Optional[int] = None,
+) -> Dict[str, str]:
+    """Download ``url`` to ``dest`` and return hex digests of what was written.
+
+    When the server advertises byte ranges and a length, the file is fetched
+    as up to ``segments`` concurrent ranges written in place with pwrite;
+    otherwise (or if the server ignores Range) it is streamed on one
+    connection.
+
+    With ``resume=True`` the data goes to ``dest.part`` with a JSON sidecar
+    recording the URL, size, validator and per-range progress. A later call
+    for the same dest continues where that one stopped, unless the server's
+    validator (ETag/Last-Modified) or size changed. ``dest`` only appears
+    once the download is complete.
+
+    The digests (the algorithms in ``expected_hashes``, else sha1) are
+    computed over the chunks as they are downloaded, with no second pass
+    over the file. A size or hash that disagrees with ``expected_size`` /
+    ``expected_hashes`` raises ChecksumMismatchError and deletes the data.
+
+    ``label=None`` prints no progress.
+    """
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    pool = pool or default_pool()
+    target, sidecar = partial_paths(dest) if resume else (dest, None)
+    algos = tuple(expected_hashes or ()) or ("sha1",)
+
+    total_bytes: Optional[int] = None
+    if (segments > 1 or resume) and hasattr(os, "pwrite"):
+        url, total_bytes, accepts_ranges, validator = _probe(url, pool)
+        _check_size(expected_size, total_bytes, what=dest.name)
+        if accepts_ranges and total_bytes:
+            partial = _Partial.load(sidecar) if sidecar else None
+            if (
+                partial is not None
+                and partial.matches(url, total_bytes, validator)
+                and target.exists()
+            ):
+                fresh = False
+            else:
+                fresh = True
+                count = max(1, min(segments, 1 + total_bytes // MIN_SEGMENT_BYTES))
+                partial = _Partial(
+                    url=url,
+                    size=total_bytes,
+                    validator=validator,
+                    ranges=[[a, b, 0] for a, b in _split_ranges(total_bytes, count)],
+                )
+            progress = _Progress(label, total_bytes)
+            if partial.done:
+                if label is not None:
                     sys.stderr.write(
-                        f"\r{label}: {pct:3d}% ({_format_bytes(downloaded)} / {_format_bytes(total_bytes)})"
+                        f"Resuming at {format_bytes(partial.done)} of {format_bytes(total_bytes)}\n"
                     )
-                    sys.stderr.flush()
-                    last_pct = pct
-            else:
-                if downloaded - last_bytes_print >= 5 * 1024 * 1024:
-                    sys.stderr.write(f"\r{label}: {_format_bytes(downloaded)}")
-                    sys.stderr.flush()
-                    last_bytes_print = downloaded
+                progress.downloaded = partial.done
+            hasher = _StreamHasher(algos, span_size=chunk_size)
+            try:
+                _download_ranges(
+                    pool,
+                    url,
+                    target,
+                    _RangeLog(partial, sidecar),
+                    fresh=fresh,
+                    chunk_size=chunk_size,
+                    progress=progress,
+                    hasher=hasher,
+                )
+                if label is not None:
+                    sys.stderr.write("\n")
+                return _complete(
+                    target, dest, sidecar, hasher, total_bytes, expected_hashes
+                )
+            except _RangeNotHonoured:
+                # Ranges unsupported after all, or the file changed under us.
+                if sidecar is not None:
+                    _unlink_quiet(sidecar)
+
+    hasher = _StreamHasher(algos, span_size=chunk_size)
+    _download_single(
+        pool,
+        url,
+        target,
+        chunk_size=chunk_size,
+        progress=_Progress(label, total_bytes),
+        hasher=hasher,
+        expected_size=expected_size,
+    )
+    if label is not None:
+        sys.stderr.write("\n")
+    return _complete(target, dest, sidecar, hasher, expected_size, expected_hashes)
+
+
+def _check_size(expected: Optional[int], actual: Optional[int], *, what: str) -> None:
+    if expected and actual is not None and expected != actual:
+        raise ChecksumMismatchError(
+            f"{what}: server reports {actual} bytes, expected {expected}."
+        )
+
+
+def _complete(
+    target: Path,
+    dest: Path,
+    sidecar: Optional[Path],
+    hasher: _StreamHasher,
+    expected_size: Optional[int],
+    expected_hashes: Optional[Dict[str, str]],
+) -> Dict[str, str]:
+    digests = hasher.hexdigests()
+    try:
+        _check_size(expected_size, hasher.pos, what=dest.name)
+        verify_hashes(expected_hashes or {}, digests, what=f"Download of {dest.name}")
+    except ChecksumMismatchError:
+        # Corrupt data must not be resumed or reused.
+        _unlink_quiet(target)
+        if sidecar is not None:
+            _unlink_quiet(sidecar)
+        raise
+    if target != dest:
+        os.replace(target, dest)
+    if sidecar is not None:
+        _unlink_quiet(sidecar)
+    return digests
+
 
-    sys.stderr.write("\n")
+def _unlink_quiet(path: Path) -> None:
+    try:
+        path.unlink()
+    except OSError:
+        pass
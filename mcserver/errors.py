@@ -12,3 +12,15 @@ class MissingApiKeyError(UserFacingError):
 
 class InvalidApiKeyError(UserFacingError):
     pass
+
+
+class NotFoundError(UserFacingError):
+    pass
+
+
+class ChecksumMismatchError(UserFacingError):
+    pass
+
+
+class NoServerPackError(UserFacingError):
+    """The pack (or the chosen file) has no server pack published."""
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from . import trace
+from .curseforge import CurseForgeClient, ModFile
+from .defaults import DEFAULT_FLEET_JOBS
+from .download import DEFAULT_SEGMENTS
+from .errors import UserFacingError
+from .fs_ops import Copier
+from .installer import apply_server_pack, fetch_server_pack
+from .pack_cache import PackCache
+from .snapshots import DEFAULT_RETAIN
+from .state import STATE_DIRNAME, STATE_FILENAME, ServerState
+from .store import ObjectStore
+
+
+DEFAULT_JOBS = DEFAULT_FLEET_JOBS
+
+
+@dataclass
+class FleetServer:
+    server_dir: Path
+    state: ServerState
+
+
+@dataclass
+class FleetResult:
+    server_dir: Path
+    pack_id: Optional[int]
+    installed_file_id: Optional[int]
+    latest_file_id: Optional[int] = None
+    latest_display_name: Optional[str] = None
+    # "updated", "up-to-date", "outdated" (check only) or "failed"
+    status: str = "failed"
+    message: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return self.status != "failed"
+
+
+def _has_state(path: Path) -> bool:
+    return (path / STATE_DIRNAME / STATE_FILENAME).is_file()
+
+
+def read_fleet_file(path: Path) -> List[Path]:
+    """Server dirs listed one per line; relative paths are relative to the file."""
+    try:
+        lines = path.read_text(encoding="utf-8").splitlines()
+    except OSError as e:
+        raise UserFacingError(f"Could not read fleet file {path}: {e}")
+    dirs: List[Path] = []
+    for line in lines:
+        line = line.split("#", 1)[0].strip()
+        if line:
+            dirs.append(path.parent / Path(line).expanduser())
+    return dirs
+
+
+def discover_servers(paths: Iterable[Path]) -> List[FleetServer]:
+    """Server dirs among ``paths``, each a server dir or a folder of them.
+
+    A server dir is one with a ``.mcserver/state.json`` naming its pack.
+    """
+    found: Dict[Path, FleetServer] = {}
+    for path in paths:
+        path = path.resolve()
+        candidates = [path] if _has_state(path) else []
+        if not candidates and path.is_dir():
+            candidates = sorted(c for c in path.iterdir() if c.is_dir() and _has_state(c))
+        if not candidates:
+            raise UserFacingError(f"No mcserver-managed server found at {path}.")
+        for server_dir in candidates:
+            state = ServerState.load(server_dir)
+            if state is None or not state.pack_id:
+                raise UserFacingError(f"{server_dir}: state.json has no packId.")
+            found.setdefault(server_dir, FleetServer(server_dir, state))
+    return list(found.values())
+
+
+def resolve_latest(
+    cf: CurseForgeClient, servers: List[FleetServer], *, jobs: int = DEFAULT_JOBS
+) -> Dict[int, Tuple[ModFile, str]]:
+    """Latest server pack of every distinct pack in the fleet, in bulk requests."""
+    return cf.get_server_pack_files((int(s.state.pack_id) for s in servers), jobs=jobs)
+
+
+def check_fleet(
+    cf: CurseForgeClient, servers: List[FleetServer], *, jobs: int = DEFAULT_JOBS
+) -> List[FleetResult]:
+    """Compare each server's installed file id with its pack's latest.
+
+    Only ids are compared, so this needs no file metadata and no download
+    URLs: each distinct pack is looked up once, in bulk /v1/mods requests.
+    """
+    latest = cf.choose_latest_server_packs(
+        (int(s.state.pack_id) for s in servers), jobs=jobs
+    )
+    results: List[FleetResult] = []
+    for s in servers:
+        result = FleetResult(s.server_dir, s.state.pack_id, s.state.installed_file_id)
+        choice = latest.get(int(s.state.pack_id))
+        if choice is None:
+            result.message = "no server pack available"
+        else:
+            result.latest_file_id, result.latest_display_name, _date = choice
+            current = s.state.installed_file_id == result.latest_file_id
+            result.status = "up-to-date" if current else "outdated"
+        results.append(result)
+    return results
+
+
+def update_fleet(
+    cf: CurseForgeClient,
+    servers: List[FleetServer],
+    *,
+    pack_cache: PackCache,
+    jobs: int = DEFAULT_JOBS,
+    connections: int = DEFAULT_SEGMENTS,
+    copy_mode: str = "auto",
+    store_factory: Callable[[Copier], Optional[ObjectStore]] = lambda _c: None,
+    snapshot_retention: int = DEFAULT_RETAIN,
+    force: bool = False,
+    log: Callable[[str], None] = print,
+) -> List[FleetResult]:
+    """Update every server to its pack's latest server pack.
+
+    Servers are grouped by (packId, fileId): each distinct server pack is
+    fetched once, then applied to its servers on ``jobs`` threads. One
+    server failing doesn't stop the others; see each result's status.
+    """
+    latest = resolve_latest(cf, servers, jobs=jobs)
+    results = {
+        s.server_dir: FleetResult(s.server_dir, s.state.pack_id, s.state.installed_file_id)
+        for s in servers
+    }
+
+    groups: Dict[Tuple[int, int], List[FleetServer]] = {}
+    for s in servers:
+        result = results[s.server_dir]
+        pack_id = int(s.state.pack_id)
+        if pack_id not in latest:
+            result.message = "no server pack available"
+            continue
+        server_file, name = latest[pack_id]
+        result.latest_file_id = server_file.id
+        result.latest_display_name = name
+        if s.state.installed_file_id == server_file.id and not force:
+            result.status = "up-to-date"
+            continue
+        groups.setdefault((pack_id, server_file.id), []).append(s)
+
+    lock = threading.Lock()
+
+    def locked_log(message: str) -> None:
+        with lock:
+            log(message)
+
+    def server_log(server_dir: Path) -> Callable[[str], None]:
+        return lambda message: locked_log(f"[{server_dir.name}] {message}")
+
+    def apply(s: FleetServer, zip_path: Path, server_file: ModFile, name: str) -> None:
+        result = results[s.server_dir]
+        copier = Copier(copy_mode)
+        try:
+            with trace.span("server", dir=str(s.server_dir)):
+                apply_server_pack(
+                    s.server_dir,
+                    zip_path,
+                    pack_id=int(s.state.pack_id),
+                    server_file_id=server_file.id,
+                    display_name=name,
+                    saved_state=s.state,
+                    copier=copier,
+                    store=store_factory(copier),
+                    pack_sha1=pack_cache.sha1(server_file.id),
+                    snapshot_retention=snapshot_retention,
+                    log=server_log(s.server_dir),
+                )
+        except Exception as e:  # reported per server; the rest carry on
+            result.message = str(e) or e.__class__.__name__
+            return
+        result.status = "updated"
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        futures = []
+        # Downloads run one at a time (each already uses parallel ranges);
+        # applying a pack starts as soon as its download is done.
+        for (pack_id, _file_id), members in groups.items():
+            server_file, name = latest[pack_id]
+            locked_log(
+                f"Server pack {name} (fileId={server_file.id}) "
+                f"for {len(members)} server(s)"
+            )
+            try:
+                zip_path = fetch_server_pack(
+                    cf,
+                    pack_id,
+                    server_file,
+                    name,
+                    pack_cache=pack_cache,
+                    connections=connections,
+                    log=locked_log,
+                )
+            except Exception as e:
+                for s in members:
+                    results[s.server_dir].message = f"download failed: {e}"
+                continue
+            # Fetching the next pack must not evict this one mid-apply.
+            pack_cache.pinned.add(server_file.id)
+            for s in members:
+                futures.append(pool.submit(trace.bind(apply), s, zip_path, server_file, name))
+        for future in futures:
+            future.result()
+
+    return [results[s.server_dir] for s in servers]
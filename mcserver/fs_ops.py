@@ -1,59 +1,502 @@
 from __future__ import annotations
 
+import errno
+import heapq
 import os
 import shutil
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from . import trace
+from .defaults import COPY_MODES
+from .errors import UserFacingError
+from .manifest import Manifest
+from .state import STATE_DIRNAME
+
+try:
+    import fcntl
+except ImportError:  # Windows: no ioctl, so no reflinks
+    fcntl = None  # type: ignore[assignment]
+
+if TYPE_CHECKING:
+    from .store import ObjectStore
 
 
 REPLACE_DIRS = ("mods", "config", "scripts", "kubejs", "libraries", "defaultconfigs")
 
+STAGING_DIRNAME = "staging"
 
-def detect_pack_root(extracted_dir: Path) -> Path:
-    # Look for a directory containing a 'mods' folder within depth 2.
-    for root, dirs, _files in os.walk(extracted_dir):
-        rel = Path(root).relative_to(extracted_dir)
-        if len(rel.parts) > 2:
-            continue
-        if "mods" in dirs:
-            return Path(root)
-    return extracted_dir
+
+def detect_pack_root(names: Iterable[str]) -> str:
+    """Prefix of the pack root among ZIP member ``names`` ("" for the top).
+
+    The root is the shallowest directory, at most two levels down, that has a
+    ``mods`` folder, so it is found from the central directory alone.
+    """
+    best: Optional[Tuple[str, ...]] = None
+    for name in names:
+        parts = tuple(name.replace("\\", "/").split("/"))
+        for depth, part in enumerate(parts[:3]):
+            if part == "mods" and depth < len(parts) - 1:
+                candidate = parts[:depth]
+                if best is None or (len(candidate), candidate) < (len(best), best):
+                    best = candidate
+                break
+    return "".join(p + "/" for p in best) if best else ""
+
+
+def _is_update_file(rel: str) -> bool:
+    if "/" in rel or rel == "user_jvm_args.txt":
+        return False
+    return rel.endswith(".jar") or rel.endswith(".sh") or rel.endswith(".bat")
+
+
+def update_members(pack_prefix: str) -> Callable[[str], bool]:
+    """Selects the ZIP members an update consumes, and no others."""
+
+    def wanted(name: str) -> bool:
+        if not name.startswith(pack_prefix):
+            return False
+        rel = name[len(pack_prefix) :]
+        top, sep, _rest = rel.partition("/")
+        return (bool(sep) and top in REPLACE_DIRS) or _is_update_file(rel)
+
+    return wanted
+
+
+def default_workers() -> int:
+    return min(8, os.cpu_count() or 1)
+
+
+def _member_target(dest_dir: Path, name: str) -> Path:
+    # Same rules as ZipFile.extractall, but an unsafe name is an error rather
+    # than being silently rewritten: a server pack has no business using one.
+    parts = name.replace("\\", "/").split("/")
+    if name.startswith(("/", "\\")) or ".." in parts or ":" in parts[0]:
+        raise UserFacingError(f"Refusing to extract unsafe path from ZIP: {name!r}")
+    return dest_dir.joinpath(*[p for p in parts if p not in ("", ".")])
+
+
+def _partition(members: List[zipfile.ZipInfo], n: int) -> List[List[zipfile.ZipInfo]]:
+    # Largest first onto the least loaded worker: keeps the longest-running
+    # worker close to the average even with a few big jars among many configs.
+    buckets: List[Tuple[int, int, List[zipfile.ZipInfo]]] = [(0, i, []) for i in range(n)]
+    for info in sorted(members, key=lambda m: m.compress_size, reverse=True):
+        load, i, bucket = heapq.heappop(buckets)
+        bucket.append(info)
+        heapq.heappush(buckets, (load + info.compress_size + 1, i, bucket))
+    return [b for _load, _i, b in sorted(buckets, key=lambda t: t[1]) if b]
 
 
-def extract_zip(zip_path: Path, dest_dir: Path) -> None:
+def _extract_members(
+    zip_path: Path,
+    members: List[Tuple[zipfile.ZipInfo, Path]],
+    store: Optional["ObjectStore"] = None,
+    store_select: Optional[Callable[[str], bool]] = None,
+) -> None:
+    # One ZipFile per worker: a shared handle would serialise on its file
+    # position, while zlib inflation releases the GIL.
     with zipfile.ZipFile(zip_path, "r") as zf:
-        zf.extractall(dest_dir)
+        for info, target in members:
+            if store is not None and store_select and store_select(info.filename):
+                store.materialize(zf, info, target)
+                continue
+            with zf.open(info) as src, open(target, "wb") as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+            mode = (info.external_attr >> 16) & 0o777
+            if info.create_system == 3 and mode:
+                os.chmod(target, mode)
+
+
+def extract_zip(
+    zip_path: Path,
+    dest_dir: Path,
+    *,
+    workers: Optional[int] = None,
+    select: Optional[Callable[[str], bool]] = None,
+    store: Optional["ObjectStore"] = None,
+    store_select: Optional[Callable[[str], bool]] = None,
+) -> None:
+    """Extract ``zip_path`` into ``dest_dir`` on ``workers`` threads.
+
+    Entries are spread across the workers by compressed size. Unix file
+    modes stored in the archive are restored. With ``select``, only members
+    whose name it accepts are written. Members ``store_select`` accepts are
+    hardlinked from ``store`` instead, entering it first if new.
+    """
+    with trace.span("extract"):
+        workers = workers or default_workers()
+        with zipfile.ZipFile(zip_path, "r") as zf:
+            infos = zf.infolist()
+        if select is not None:
+            infos = [info for info in infos if select(info.filename)]
+
+        # Keyed by target so a name repeated in the archive is written once
+        # (the last entry wins, as with extractall) rather than by two workers.
+        files: Dict[Path, zipfile.ZipInfo] = {}
+        dirs = set()
+        for info in infos:
+            target = _member_target(dest_dir, info.filename)
+            if info.is_dir():
+                dirs.add(target)
+            else:
+                files[target] = info
+                dirs.add(target.parent)
+        for d in sorted(dirs):
+            d.mkdir(parents=True, exist_ok=True)
+        trace.count(files=len(files), bytes=sum(i.file_size for i in files.values()))
+
+        targets = {id(info): target for target, info in files.items()}
+        buckets = _partition(list(files.values()), max(1, workers))
+        jobs = [[(info, targets[id(info)]) for info in b] for b in buckets]
+        if len(jobs) <= 1:
+            for job in jobs:
+                _extract_members(zip_path, job, store, store_select)
+            return
+        with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+            futures = [
+                pool.submit(trace.bind(_extract_members), zip_path, job, store, store_select)
+                for job in jobs
+            ]
+            for future in futures:
+                future.result()
+
+
+@contextmanager
+def staging_dir(server_dir: Path) -> Iterator[Path]:
+    """``.mcserver/staging`` inside ``server_dir``, emptied before and after.
+
+    Being on the same filesystem as the server, everything staged there can
+    be put in place with a rename instead of a second copy.
+    """
+    path = server_dir / STATE_DIRNAME / STAGING_DIRNAME
+    shutil.rmtree(path, ignore_errors=True)  # left over from a killed run
+    path.mkdir(parents=True)
+    try:
+        yield path
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def _remove(path: Path) -> None:
+    if path.is_dir() and not path.is_symlink():
+        shutil.rmtree(path)
+    elif path.exists() or path.is_symlink():
+        path.unlink()
+
+
+_FICLONE = 0x40049409  # linux/fs.h: _IOW(0x94, 9, int)
+
+# errnos meaning "this filesystem (pair) can't do that", as opposed to a
+# real I/O failure: the method is skipped for that filesystem from then on.
+_UNSUPPORTED = {
+    errno.EXDEV,
+    errno.EOPNOTSUPP,
+    errno.ENOTSUP,
+    errno.EINVAL,
+    errno.ENOSYS,
+    errno.ENOTTY,
+    errno.EPERM,
+    errno.EMLINK,
+}
+
+
+def _reflink(src: Path, dest: Path) -> None:
+    if fcntl is None:
+        raise OSError(errno.ENOTSUP, "reflinks need fcntl.ioctl")
+    with open(src, "rb") as s, open(dest, "wb") as d:
+        fcntl.ioctl(d.fileno(), _FICLONE, s.fileno())
+    shutil.copystat(src, dest)
+
+
+def _copy_range(src: Path, dest: Path) -> None:
+    with open(src, "rb") as s, open(dest, "wb") as d:
+        remaining = os.fstat(s.fileno()).st_size
+        while remaining > 0:
+            n = os.copy_file_range(s.fileno(), d.fileno(), remaining)
+            if n == 0:
+                break
+            remaining -= n
+    shutil.copystat(src, dest)
 
 
-def copy_tree_contents(src_dir: Path, dest_dir: Path) -> None:
+def _hardlink(src: Path, dest: Path) -> None:
+    os.link(src, dest)
+
+
+def _plain_copy(src: Path, dest: Path) -> None:
+    shutil.copy2(src, dest)
+
+
+_METHODS: Dict[str, Callable[[Path, Path], None]] = {
+    "reflink": _reflink,
+    "hardlink": _hardlink,
+    "copy-range": _copy_range,
+    "copy": _plain_copy,
+}
+
+
+class Copier:
+    """Copies files with the cheapest method the filesystem supports.
+
+    ``auto`` tries a FICLONE reflink (btrfs, xfs, ...), then a hardlink when
+    the caller says sharing the inode is acceptable, then copy_file_range,
+    then a plain copy. Any other mode uses that method and falls back to a
+    plain copy. A method that fails as unsupported is not tried again on the
+    same filesystem.
+    """
+
+    def __init__(self, mode: str = "auto"):
+        if mode not in COPY_MODES:
+            raise UserFacingError(f"Unknown copy mode {mode!r}.")
+        self.mode = mode
+        self.counts: Dict[str, int] = {}
+        self._unsupported: Set[Tuple[Optional[Tuple[int, int]], str]] = set()
+
+    def _chain(self, allow_link: bool) -> List[str]:
+        if self.mode != "auto":
+            return [self.mode] if self.mode == "copy" else [self.mode, "copy"]
+        chain = ["reflink"] if fcntl is not None else []
+        if allow_link:
+            chain.append("hardlink")
+        if hasattr(os, "copy_file_range"):
+            chain.append("copy-range")
+        chain.append("copy")
+        return chain
+
+    def copy(self, src: Path, dest: Path, *, allow_link: bool = False) -> str:
+        """Copy ``src`` to ``dest`` (which must not exist); returns the method."""
+        src, dest = Path(src), Path(dest)
+        try:
+            fs = (src.stat().st_dev, dest.parent.stat().st_dev)
+        except OSError:
+            fs = None
+        for method in self._chain(allow_link):
+            if method != "copy" and (fs, method) in self._unsupported:
+                continue
+            try:
+                _METHODS[method](src, dest)
+            except (OSError, AttributeError) as e:
+                if method == "copy":
+                    raise
+                if dest.exists() or dest.is_symlink():
+                    dest.unlink()
+                if isinstance(e, AttributeError) or e.errno in _UNSUPPORTED:
+                    self._unsupported.add((fs, method))
+                    continue
+                raise
+            self.counts[method] = self.counts.get(method, 0) + 1
+            trace.count(files=1)
+            return method
+        raise AssertionError("unreachable: plain copy either succeeds or raises")
+
+    def __call__(self, src: str, dest: str) -> str:
+        # shutil.copytree/move copy_function signature.
+        self.copy(Path(src), Path(dest))
+        return dest
+
+
+def _place(src: Path, dest: Path, copier: Optional[Copier] = None) -> None:
+    # Rename when src and dest share a filesystem; shutil.move copies otherwise.
+    if src.is_dir():
+        _remove(dest)
+    try:
+        os.replace(src, dest)
+    except OSError:
+        _remove(dest)
+        shutil.move(str(src), str(dest), copy_function=copier or Copier())
+
+
+def move_tree_contents(
+    src_dir: Path, dest_dir: Path, *, copier: Optional[Copier] = None
+) -> None:
     dest_dir.mkdir(parents=True, exist_ok=True)
-    for child in src_dir.iterdir():
-        target = dest_dir / child.name
-        if child.is_dir():
-            if target.exists():
-                shutil.rmtree(target)
-            shutil.copytree(child, target)
-        else:
-            shutil.copy2(child, target)
+    with trace.span("move"):
+        for child in list(src_dir.iterdir()):
+            _place(child, dest_dir / child.name, copier)
 
 
-def update_from_pack_root(pack_root: Path, server_dir: Path) -> None:
-    # Replace modpack-managed directories
-    for d in REPLACE_DIRS:
-        src = pack_root / d
-        if not src.exists() or not src.is_dir():
-            continue
-        dest = server_dir / d
-        if dest.exists():
-            shutil.rmtree(dest)
-        shutil.copytree(src, dest)
-
-    # Copy top-level executables (*.jar, *.sh, *.bat) except user_jvm_args.txt
-    for child in pack_root.iterdir():
-        if not child.is_file():
-            continue
-        name = child.name
-        if name == "user_jvm_args.txt":
+def _pack_members(
+    infos: List[zipfile.ZipInfo], pack_prefix: str, server_dir: Path
+) -> Tuple[Dict[str, Tuple[zipfile.ZipInfo, Path]], set]:
+    """Update-managed files (rel path -> member, target) and dirs of a pack."""
+    wanted = update_members(pack_prefix)
+    files: Dict[str, Tuple[zipfile.ZipInfo, Path]] = {}
+    dirs = set()
+    for info in infos:
+        if not wanted(info.filename):
             continue
-        if name.endswith(".jar") or name.endswith(".sh") or name.endswith(".bat"):
-            shutil.copy2(child, server_dir / name)
+        target = _member_target(server_dir, info.filename[len(pack_prefix) :])
+        rel = target.relative_to(server_dir).as_posix()
+        if info.is_dir():
+            dirs.add(rel)
+        else:
+            files[rel] = (info, target)
+        parent = Path(rel).parent
+        while parent != Path("."):
+            dirs.add(parent.as_posix())
+            parent = parent.parent
+    return files, dirs
+
+
+def record_installed(
+    zip_path: Path, pack_prefix: str, server_dir: Path, manifest: Manifest
+) -> None:
+    """Fill ``manifest`` with the update-managed files a fresh install wrote."""
+    with zipfile.ZipFile(zip_path, "r") as zf:
+        files, _dirs = _pack_members(zf.infolist(), pack_prefix, server_dir)
+    manifest.files = {}
+    for rel, (info, target) in files.items():
+        if target.is_file():
+            manifest.record(rel, target, size=info.file_size, crc=info.CRC)
+
+
+@dataclass
+class DeltaResult:
+    written: int = 0
+    removed: int = 0
+    unchanged: int = 0
+    # Top-level names swapped in, and those of them that had no old version.
+    swapped: List[str] = field(default_factory=list)
+    added: List[str] = field(default_factory=list)
+
+
+def swap_in(names: List[str], tree: Path, server_dir: Path, previous: Path) -> List[str]:
+    """Rename each staged ``tree/name`` over ``server_dir/name``.
+
+    The replaced entries end up in ``previous``; the names that had none are
+    returned. If any rename fails, those already done are undone in reverse,
+    leaving ``server_dir`` as it was.
+    """
+    done: List[Tuple[str, bool]] = []
+    try:
+        for name in names:
+            current = server_dir / name
+            had_old = current.exists() or current.is_symlink()
+            if had_old:
+                os.rename(current, previous / name)
+            done.append((name, had_old))
+            os.rename(tree / name, current)
+    except BaseException:
+        for name, had_old in reversed(done):
+            current = server_dir / name
+            if not (tree / name).exists() and (current.exists() or current.is_symlink()):
+                os.rename(current, tree / name)
+            if had_old:
+                os.rename(previous / name, current)
+        raise
+    return [name for name, had_old in done if not had_old]
+
+
+def apply_update(
+    zip_path: Path,
+    pack_prefix: str,
+    server_dir: Path,
+    staging: Path,
+    manifest: Manifest,
+    previous: Path,
+    *,
+    workers: Optional[int] = None,
+    copier: Optional[Copier] = None,
+    store: Optional["ObjectStore"] = None,
+    store_select: Optional[Callable[[str], bool]] = None,
+) -> DeltaResult:
+    """Bring the modpack-managed parts of ``server_dir`` in line with the pack.
+
+    Each of ``REPLACE_DIRS`` the pack ships, and its changed top-level
+    *.jar/*.sh/*.bat files, are built complete under ``staging`` first: files
+    whose size and CRC match ``manifest`` (updated in place) are carried
+    over from the server, only changed ones are extracted. They are then
+    swapped in with one rename each, and the trees they replace are moved to
+    ``previous``. Should a rename fail, the server is rolled back.
+    """
+    copier = copier or Copier()
+    result = DeltaResult()
+    changed: Dict[str, Tuple[zipfile.ZipInfo, Path]] = {}
+    with trace.span("compare"):
+        with zipfile.ZipFile(zip_path, "r") as zf:
+            files, dirs = _pack_members(zf.infolist(), pack_prefix, server_dir)
+        for rel, (info, target) in files.items():
+            if manifest.is_current(rel, target, size=info.file_size, crc=info.CRC):
+                result.unchanged += 1
+            else:
+                changed[rel] = (info, target)
+        trace.count(files=len(files))
+
+    extracted = staging / "extract"
+    names = {info.filename for info, _target in changed.values()}
+    extract_zip(
+        zip_path,
+        extracted,
+        workers=workers,
+        select=names.__contains__,
+        store=store,
+        store_select=store_select,
+    )
+
+    with trace.span("stage"):
+        # A directory is swapped only if something in it changes: a changed
+        # file, a file to delete, or a directory to add or drop.
+        dirty = {rel.split("/", 1)[0] for rel in changed}
+        for d in REPLACE_DIRS:
+            root = server_dir / d
+            if d not in dirs:
+                continue
+            if root.is_symlink() or not root.is_dir():
+                dirty.add(d)
+                continue
+            for dirpath, dirnames, filenames in os.walk(root):
+                base = Path(dirpath)
+                if base.relative_to(server_dir).as_posix() not in dirs:
+                    dirty.add(d)
+                for name in filenames + [n for n in dirnames if (base / n).is_symlink()]:
+                    if (base / name).relative_to(server_dir).as_posix() not in files:
+                        result.removed += 1
+                        dirty.add(d)
+            if any(not (server_dir / rel).is_dir() for rel in dirs if rel.split("/", 1)[0] == d):
+                dirty.add(d)
+        swap = [d for d in REPLACE_DIRS if d in dirty]
+        swap += sorted(rel for rel in changed if "/" not in rel)
+
+        tree = staging / "tree"
+        tree.mkdir()
+        for rel in sorted(dirs):
+            if rel.split("/", 1)[0] in dirty:
+                (tree / rel).mkdir(parents=True, exist_ok=True)
+        for rel, (info, target) in files.items():
+            staged = tree / rel
+            if rel in changed:
+                os.replace(_member_target(extracted, info.filename), staged)
+            elif rel.split("/", 1)[0] in dirty and "/" in rel:
+                if store is not None and store_select and store_select(info.filename):
+                    store.link(store.adopt(target, info), staged)
+                    continue
+                # The live file moves into the snapshot, so sharing its inode
+                # with the new tree costs no space; a later in-place edit would
+                # show in both, which only matters for a rollback.
+                copier.copy(target, staged, allow_link=True)
+
+    previous.mkdir(parents=True, exist_ok=True)
+    with trace.span("swap"):
+        result.added = swap_in(swap, tree, server_dir, previous)
+    result.swapped = swap
+
+    manifest.files = {}
+    for rel, (info, target) in files.items():
+        manifest.record(rel, target, size=info.file_size, crc=info.CRC)
+    result.written = len(changed)
+    return result
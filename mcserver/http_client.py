@@ -1,11 +1,170 @@
 from __future__ import annotations
 
+import concurrent.futures
+import email.utils
+import http.client
 import json
+import random
+import socket
+import ssl
+import threading
 import time
 from dataclasses import dataclass
-from typing import Any, Dict, Optional
-from urllib.parse import urlencode
-from urllib.request import Request, urlopen
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urljoin, urlsplit
+from urllib.request import getproxies, proxy_bypass
+
+from . import trace
+from .defaults import DEFAULT_BURST, DEFAULT_RATE
+
+
+DEFAULT_POOL_SIZE = 4
+MAX_REDIRECTS = 5
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+# Errors that mean a kept-alive connection was closed by the server while idle.
+_STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    ConnectionResetError,
+    BrokenPipeError,
+)
+
+_HostKey = Tuple[str, str, int]
+
+DEFAULT_ATTEMPTS = 4
+
+# Statuses that say "try again later" rather than "this request is wrong".
+RETRYABLE_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+# Transport failures (resets, timeouts, truncated responses) worth retrying.
+# Not OSError as a whole: a refused certificate (ssl.SSLCertVerificationError),
+# a full disk or a permission error fails the same way every time.
+_TRANSIENT_ERRORS = (
+    ConnectionError,
+    TimeoutError,
+    socket.timeout,
+    socket.gaierror,
+    ssl.SSLEOFError,
+    EOFError,
+    http.client.IncompleteRead,
+    http.client.BadStatusLine,
+    concurrent.futures.TimeoutError,
+)
+
+
+class HttpStatusError(Exception):
+    """Raised for HTTP responses with a 4xx/5xx status."""
+
+    def __init__(self, url: str, code: int, reason: str, headers: Any):
+        super().__init__(f"HTTP {code} {reason} for {url}")
+        self.url = url
+        self.code = code
+        self.reason = reason
+        self.headers = headers
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Whether a failed request may succeed if sent again unchanged."""
+    if isinstance(exc, HttpStatusError):
+        return exc.code in RETRYABLE_STATUSES
+    return isinstance(exc, _TRANSIENT_ERRORS)
+
+
+def retry_after_s(headers: Any) -> Optional[float]:
+    """Seconds a Retry-After header (delta-seconds or HTTP-date) asks to wait."""
+    value = headers.get("Retry-After") if headers is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class RequestScheduler:
+    """Request budget and retry policy shared by every API call in the process.
+
+    A token bucket lets ``burst`` requests through at once, then ``rate`` per
+    second (``rate`` None or 0 means unlimited). A 429 holds back every
+    caller until its Retry-After has passed, not just the thread that got
+    it, so a throttled API isn't hit again by the rest of a bulk operation.
+
+    Only transient failures (see is_retryable) are retried, up to
+    ``max_attempts`` in all, after an exponential backoff with full jitter,
+    or after Retry-After when the server sends a longer one. A Retry-After
+    beyond ``max_delay_s`` fails the request instead of stalling.
+
+    Both are timed with ``clock`` (time.monotonic unless a test passes its own).
+    """
+
+    def __init__(
+        self,
+        *,
+        rate: Optional[float] = DEFAULT_RATE,
+        burst: int = DEFAULT_BURST,
+        max_attempts: int = DEFAULT_ATTEMPTS,
+        base_delay_s: float = 0.5,
+        max_delay_s: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.rate = rate if rate and rate > 0 else None
+        self.burst = max(1, int(burst))
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay_s = base_delay_s
+        self.max_delay_s = max_delay_s
+        self.clock = clock
+        self._lock = threading.Lock()
+        # When the bucket would next be empty, as a clock() value.
+        self._drained_at = 0.0
+        self._paused_until = 0.0
+        self.throttled = 0
+        self.retries = 0
+
+    def reserve(self) -> float:
+        """Take a request slot; returns how many seconds to wait before sending."""
+        with self._lock:
+            now = self.clock()
+            send_at = max(now, self._paused_until)
+            if self.rate is not None:
+                interval = 1.0 / self.rate
+                send_at = max(send_at, self._drained_at - (self.burst - 1) * interval)
+                self._drained_at = max(self._drained_at, send_at) + interval
+            return send_at - now
+
+    def acquire(self) -> None:
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    def retry_delay(self, attempt: int, exc: BaseException) -> Optional[float]:
+        """Seconds to wait before retrying after failed ``attempt`` (1-based).
+
+        None means ``exc`` is final: not transient, or out of attempts.
+        """
+        if attempt >= self.max_attempts or not is_retryable(exc):
+            return None
+        cap = min(self.max_delay_s, self.base_delay_s * 2 ** (attempt - 1))
+        delay = random.uniform(0, cap)
+        if isinstance(exc, HttpStatusError):
+            after = retry_after_s(exc.headers)
+            if after is not None:
+                if after > self.max_delay_s:
+                    return None
+                delay = max(delay, after)
+            if exc.code == 429:
+                with self._lock:
+                    self.throttled += 1
+                    resume = self.clock() + delay
+                    self._paused_until = max(self._paused_until, resume)
+        with self._lock:
+            self.retries += 1
+        return delay
 
 
 @dataclass
@@ -29,35 +188,321 @@ class HttpResponse:
         return json.loads(self.content)
 
 
-def http_get_json(
+class PooledResponse:
+    """Streaming response whose connection goes back to the pool once drained."""
+
+    def __init__(
+        self,
+        pool: "ConnectionPool",
+        key: _HostKey,
+        conn: http.client.HTTPConnection,
+        resp: http.client.HTTPResponse,
+        url: str,
+    ):
+        self._pool = pool
+        self._key = key
+        self._conn: Optional[http.client.HTTPConnection] = conn
+        self._resp = resp
+        self.url = url
+        self.status = resp.status
+        self.reason = resp.reason
+        self.headers = resp.headers
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        data = self._resp.read() if amt is None else self._resp.read(amt)
+        if amt is None or not data:
+            self._finish()
+        return data
+
+    def _finish(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        if self._resp.isclosed() and not self._resp.will_close:
+            self._pool._release(self._key, conn)
+        else:
+            conn.close()
+
+    def close(self) -> None:
+        if self._conn is None:
+            return
+        if self._resp.isclosed():
+            self._finish()
+            return
+        # Unread body: the connection cannot be reused safely.
+        conn, self._conn = self._conn, None
+        self._resp.close()
+        conn.close()
+
+    def __enter__(self) -> "PooledResponse":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+class ConnectionPool:
+    """Thread-safe pool of HTTP/1.1 keep-alive connections, shared per host.
+
+    Up to ``max_per_host`` idle connections are retained for each
+    (scheme, host, port); any number may be in use concurrently, extra ones
+    are simply closed when released.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_per_host: int = DEFAULT_POOL_SIZE,
+        timeout_s: float = 60,
+        ssl_context: Optional[ssl.SSLContext] = None,
+    ):
+        self.max_per_host = max(1, int(max_per_host))
+        self.timeout_s = timeout_s
+        self.ssl_context = ssl_context or ssl.create_default_context()
+        self._idle: Dict[_HostKey, List[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+        self.requests_sent = 0
+
+    @staticmethod
+    def _host_key(url: str) -> _HostKey:
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"Unsupported URL: {url}")
+        port = parts.port or (443 if scheme == "https" else 80)
+        return scheme, parts.hostname, port
+
+    def _new_connection(self, key: _HostKey) -> http.client.HTTPConnection:
+        scheme, host, port = key
+        proxy = _proxy_for(scheme, host)
+        if scheme == "https":
+            if proxy:
+                conn = http.client.HTTPSConnection(
+                    proxy[0], proxy[1], timeout=self.timeout_s, context=self.ssl_context
+                )
+                conn.set_tunnel(host, port)
+            else:
+                conn = http.client.HTTPSConnection(
+                    host, port, timeout=self.timeout_s, context=self.ssl_context
+                )
+        else:
+            target = proxy or (host, port)
+            conn = http.client.HTTPConnection(
+                target[0], target[1], timeout=self.timeout_s
+            )
+        with self._lock:
+            self.connections_opened += 1
+        return conn
+
+    def _acquire(self, key: _HostKey) -> Tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop(), True
+        return self._new_connection(key), False
+
+    def _release(self, key: _HostKey, conn: http.client.HTTPConnection) -> None:
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_per_host:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def close(self) -> None:
+        with self._lock:
+            idle_lists = list(self._idle.values())
+            self._idle.clear()
+        for idle in idle_lists:
+            for conn in idle:
+                conn.close()
+
+    def _send(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        body: Optional[bytes],
+        timeout_s: Optional[float],
+    ) -> PooledResponse:
+        key = self._host_key(url)
+        parts = urlsplit(url)
+        target = parts.path or "/"
+        if parts.query:
+            target += "?" + parts.query
+        if key[0] == "http" and _proxy_for(key[0], key[1]):
+            target = url
+
+        while True:
+            conn, reused = self._acquire(key)
+            try:
+                if timeout_s is not None:
+                    conn.timeout = timeout_s
+                    if conn.sock is not None:
+                        conn.sock.settimeout(timeout_s)
+                conn.request(method, target, body=body, headers=headers)
+                resp = conn.getresponse()
+            except _STALE_CONNECTION_ERRORS:
+                conn.close()
+                if reused:
+                    # The server dropped an idle connection; retry on a fresh one.
+                    continue
+                raise
+            except BaseException:
+                conn.close()
+                raise
+            with self._lock:
+                self.requests_sent += 1
+            trace.count(requests=1)
+            return PooledResponse(self, key, conn, resp, url)
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        headers: Optional[Dict[str, str]] = None,
+        body: Optional[bytes] = None,
+        timeout_s: Optional[float] = None,
+        follow_redirects: bool = True,
+    ) -> PooledResponse:
+        """Send a request and return the (unread) response.
+
+        Redirects are followed for GET/HEAD requests. The caller must read the
+        body to the end or close the response.
+        """
+        req_headers = dict(headers or {})
+        for _ in range(MAX_REDIRECTS + 1):
+            resp = self._send(method, url, req_headers, body, timeout_s)
+            location = resp.headers.get("Location")
+            if (
+                not follow_redirects
+                or resp.status not in REDIRECT_STATUSES
+                or not location
+                or method not in ("GET", "HEAD")
+            ):
+                return resp
+            resp.read()
+            url = urljoin(url, location)
+        raise HttpStatusError(url, resp.status, "Too many redirects", resp.headers)
+
+
+def _proxy_for(scheme: str, host: str) -> Optional[Tuple[str, int]]:
+    proxy = getproxies().get(scheme)
+    if not proxy or proxy_bypass(host):
+        return None
+    parts = urlsplit(proxy if "://" in proxy else "http://" + proxy)
+    if not parts.hostname:
+        return None
+    return parts.hostname, parts.port or 80
+
+
+_default_pool: Optional[ConnectionPool] = None
+_default_pool_lock = threading.Lock()
+_default_scheduler: Optional[RequestScheduler] = None
+
+
+def default_pool() -> ConnectionPool:
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = ConnectionPool()
+        return _default_pool
+
+
+def configure_default_pool(
+    *, max_per_host: int = DEFAULT_POOL_SIZE, **kwargs: Any
+) -> ConnectionPool:
+    """Replace the process-wide pool (closing the old one) and return it."""
+    global _default_pool
+    with _default_pool_lock:
+        old, _default_pool = _default_pool, ConnectionPool(
+            max_per_host=max_per_host, **kwargs
+        )
+    if old is not None:
+        old.close()
+    return _default_pool
+
+
+def default_scheduler() -> RequestScheduler:
+    global _default_scheduler
+    with _default_pool_lock:
+        if _default_scheduler is None:
+            _default_scheduler = RequestScheduler()
+        return _default_scheduler
+
+
+def configure_default_scheduler(**kwargs: Any) -> RequestScheduler:
+    """Replace the process-wide RequestScheduler and return it."""
+    global _default_scheduler
+    with _default_pool_lock:
+        _default_scheduler = RequestScheduler(**kwargs)
+        return _default_scheduler
+
+
+def http_request(
+    method: str,
     url: str,
     *,
     headers: Dict[str, str],
     params: Optional[Dict[str, Any]] = None,
-    retries: int = 3,
-    retry_sleep_s: float = 0.5,
-    timeout_s: int = 60,
-) -> Any:
+    body: Optional[bytes] = None,
+    timeout_s: float = 60,
+    pool: Optional[ConnectionPool] = None,
+    scheduler: Optional[RequestScheduler] = None,
+) -> HttpResponse:
+    """Send a request and return the whole response.
+
+    4xx/5xx statuses raise HttpStatusError; other statuses (e.g. 304 Not
+    Modified for conditional requests) are returned to the caller. Every
+    attempt waits its turn in ``scheduler`` (the process-wide one by
+    default), which also decides whether and when a failure is retried.
+    """
     if params:
         url = url + "?" + urlencode(params)
+    pool = pool or default_pool()
+    scheduler = scheduler or default_scheduler()
 
-    request = Request(url, headers=headers, method="GET")
-
-    last_exc: Exception | None = None
-    for attempt in range(1, retries + 1):
+    attempt = 0
+    while True:
+        attempt += 1
+        scheduler.acquire()
         try:
-            with urlopen(request, timeout=timeout_s) as resp:
+            with pool.request(
+                method, url, headers=headers, body=body, timeout_s=timeout_s
+            ) as resp:
                 content = resp.read()
-                http_resp = HttpResponse(
-                    status=getattr(resp, "status", 200),
-                    headers=resp.headers,
-                    content=content,
-                )
-            return http_resp.json()
-        except Exception as exc:  # pragma: no cover
-            last_exc = exc
-            if attempt >= retries:
+            if resp.status >= 400:
+                raise HttpStatusError(url, resp.status, resp.reason, resp.headers)
+            return HttpResponse(
+                status=resp.status, headers=resp.headers, content=content
+            )
+        except Exception as exc:
+            delay = scheduler.retry_delay(attempt, exc)
+            if delay is None:
                 raise
-            time.sleep(retry_sleep_s)
+            time.sleep(delay)
+
 
-    raise last_exc  # type: ignore[misc]
+def http_get(url: str, *, headers: Dict[str, str], **kwargs: Any) -> HttpResponse:
+    return http_request("GET", url, headers=headers, **kwargs)
+
+
+def http_get_json(
+    url: str,
+    *,
+    headers: Dict[str, str],
+    params: Optional[Dict[str, Any]] = None,
+    timeout_s: int = 60,
+    pool: Optional[ConnectionPool] = None,
+    scheduler: Optional[RequestScheduler] = None,
+) -> Any:
+    return http_get(
+        url,
+        headers=headers,
+        params=params,
+        timeout_s=timeout_s,
+        pool=pool,
+        scheduler=scheduler,
+    ).json()
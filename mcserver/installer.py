@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import zipfile
+from pathlib import Path
+from typing import Callable, Optional
+
+from . import trace
+from .config import download_staging_dir
+from .curseforge import CurseForgeClient, ModFile
+from .download import DEFAULT_SEGMENTS, download_to
+from .fs_ops import (
+    Copier,
+    apply_update,
+    detect_pack_root,
+    extract_zip,
+    move_tree_contents,
+    record_installed,
+    staging_dir,
+)
+from .manifest import Manifest
+from .pack_cache import PackCache
+from .snapshots import DEFAULT_RETAIN, SnapshotStore
+from .state import ServerState, utc_now_iso
+from .store import ObjectStore, store_members
+
+
+Log = Callable[[str], None]
+
+
+def is_server_dir(server_dir: Path) -> bool:
+    return (server_dir / "server.properties").exists()
+
+
+def fetch_server_pack(
+    cf: CurseForgeClient,
+    pack_id: int,
+    server_file: ModFile,
+    display_name: str,
+    *,
+    pack_cache: PackCache,
+    connections: int = DEFAULT_SEGMENTS,
+    log: Log = print,
+) -> Path:
+    """Path of the verified server pack ZIP in the pack cache, downloading it if needed."""
+    zip_path = pack_cache.get(server_file)
+    if zip_path is not None:
+        log(f"Using cached server pack: {zip_path}")
+        return zip_path
+    # Downloaded outside any temp dir so an interrupted run can resume.
+    staged = download_staging_dir() / f"serverpack-{server_file.id}.zip"
+    # Verified against the published hashes while downloading, so a
+    # corrupt pack fails here, before anything is extracted.
+    with trace.span("download", file_id=server_file.id):
+        hashes = download_to(
+            cf.server_pack_url(pack_id, server_file),
+            staged,
+            label="Downloading server pack",
+            segments=connections,
+            resume=True,
+            expected_hashes=server_file.hashes,
+            expected_size=server_file.file_length,
+        )
+    return pack_cache.add(
+        staged,
+        server_file,
+        pack_id=pack_id,
+        display_name=display_name,
+        hashes=hashes,
+    )
+
+
+def apply_server_pack(
+    server_dir: Path,
+    zip_path: Path,
+    *,
+    pack_id: int,
+    server_file_id: int,
+    display_name: str,
+    saved_state: Optional[ServerState],
+    accept_eula: bool = False,
+    copier: Optional[Copier] = None,
+    store: Optional[ObjectStore] = None,
+    pack_sha1: Optional[str] = None,
+    snapshot_retention: int = DEFAULT_RETAIN,
+    log: Log = print,
+) -> None:
+    """Install or update ``server_dir`` from a server pack ZIP and save its state.
+
+    ``pack_sha1`` is the verified sha1 of ``zip_path`` (see PackCache.sha1);
+    the object store only reuses what it indexed for that exact ZIP.
+    """
+    mode_update = is_server_dir(server_dir)
+    copier = copier or Copier()
+    if store is not None:
+        store.pack_sha1 = pack_sha1
+    with trace.span("detect_pack_root"), zipfile.ZipFile(zip_path, "r") as zf:
+        pack_prefix = detect_pack_root(zf.namelist())
+    log(f"Detected pack root: {pack_prefix or '/'}")
+
+    # Extracted next to the server and moved into place by rename. An update
+    # only extracts the files that differ from what the manifest records.
+    manifest = Manifest.load(server_dir)
+    store_select = store_members(pack_prefix) if store else None
+    with staging_dir(server_dir) as staging:
+        if mode_update:
+            # Safety check already implied by mode_update
+            log(
+                "Applying update (replacing modpack folders, preserving world/server config)..."
+            )
+            snapshots = SnapshotStore(server_dir)
+            snapshot = snapshots.begin()
+            try:
+                with trace.span("update"):
+                    delta = apply_update(
+                        zip_path,
+                        pack_prefix,
+                        server_dir,
+                        staging,
+                        manifest,
+                        snapshot.tree,
+                        copier=copier,
+                        store=store,
+                        store_select=store_select,
+                    )
+            except BaseException:
+                snapshots.discard(snapshot)
+                raise
+            if delta.swapped:
+                snapshots.commit(snapshot, swapped=delta.swapped, added=delta.added)
+            else:
+                snapshots.discard(snapshot)
+            snapshots.prune(snapshot_retention)
+            log(
+                f"Update complete: {delta.written} written, {delta.removed} removed, "
+                f"{delta.unchanged} unchanged."
+            )
+            if copier.counts:
+                carried = ", ".join(f"{n} by {m}" for m, n in sorted(copier.counts.items()))
+                log(f"Unchanged files carried over: {carried}")
+        else:
+            with trace.span("install"):
+                log("Extracting...")
+                extract_zip(zip_path, staging, store=store, store_select=store_select)
+                log("Installing into target directory...")
+                move_tree_contents(staging / pack_prefix, server_dir, copier=copier)
+                with trace.span("manifest"):
+                    record_installed(zip_path, pack_prefix, server_dir, manifest)
+            log("Install complete.")
+    manifest.file_id = server_file_id
+    manifest.save(server_dir)
+    if store is not None:
+        store.add_ref(server_dir)
+        log(f"Object store: {store.linked} file(s) linked, {store.added} new object(s)")
+
+    if accept_eula:
+        log("Writing eula.txt (eula=true)...")
+        (server_dir / "eula.txt").write_text("eula=true\n", encoding="utf-8")
+
+    new_state = saved_state or ServerState()
+    new_state.pack_id = pack_id
+    new_state.installed_file_id = server_file_id
+    new_state.installed_display_name = display_name
+    new_state.last_updated_at = utc_now_iso()
+    new_state.save(server_dir)
+    log("Saved .mcserver/state.json")
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import json
+import os
+import stat
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Optional
+
+from .state import STATE_DIRNAME
+
+
+MANIFEST_FILENAME = "manifest.json"
+
+
+def file_crc(path: Path, *, chunk_size: int = 1024 * 1024) -> int:
+    crc = 0
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
+
+@dataclass
+class InstalledFile:
+    size: int
+    crc: int
+    mtime_ns: int
+
+
+@dataclass
+class Manifest:
+    """Pack-managed files in a server dir, as of the last install or update.
+
+    Paths are relative to the server dir, with ``/`` separators. Size and CRC
+    come from the pack's ZIP directory; ``mtime_ns`` is the file's on-disk
+    mtime once written, so a file edited since is noticed without reading it.
+    """
+
+    file_id: Optional[int] = None
+    files: Dict[str, InstalledFile] = field(default_factory=dict)
+
+    @staticmethod
+    def load(server_dir: Path) -> "Manifest":
+        path = server_dir / STATE_DIRNAME / MANIFEST_FILENAME
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return Manifest()
+        return Manifest(
+            file_id=data.get("fileId"),
+            files={
+                rel: InstalledFile(size=f["size"], crc=f["crc"], mtime_ns=f["mtimeNs"])
+                for rel, f in (data.get("files") or {}).items()
+            },
+        )
+
+    def save(self, server_dir: Path) -> None:
+        path = server_dir / STATE_DIRNAME / MANIFEST_FILENAME
+        path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "fileId": self.file_id,
+            "files": {
+                rel: {"size": f.size, "crc": f.crc, "mtimeNs": f.mtime_ns}
+                for rel, f in sorted(self.files.items())
+            },
+        }
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(json.dumps(payload) + "\n", encoding="utf-8")
+        os.replace(tmp, path)
+
+    def record(self, rel: str, path: Path, *, size: int, crc: int) -> None:
+        self.files[rel] = InstalledFile(size=size, crc=crc, mtime_ns=path.stat().st_mtime_ns)
+
+    def is_current(self, rel: str, path: Path, *, size: int, crc: int) -> bool:
+        """Whether ``path`` already holds a file with this size and CRC."""
+        try:
+            st = path.lstat()
+        except OSError:
+            return False
+        if not stat.S_ISREG(st.st_mode) or st.st_size != size:
+            return False
+        entry = self.files.get(rel)
+        if entry is not None and entry.size == size and entry.mtime_ns == st.st_mtime_ns:
+            # Untouched since we wrote it, so its CRC is the recorded one.
+            return entry.crc == crc
+        # Not ours, or modified since: only the contents can tell.
+        return file_crc(path) == crc
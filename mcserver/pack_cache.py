@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from .config import pack_cache_dir
+from .curseforge import ModFile
+from .download import verify_hashes
+from .errors import ChecksumMismatchError
+
+
+DEFAULT_MAX_BYTES = 4 * 1024 * 1024 * 1024
+
+
+@dataclass
+class CachedPack:
+    file_id: int
+    pack_id: Optional[int]
+    display_name: Optional[str]
+    size: int
+    hashes: Dict[str, str]
+    last_used_at: float
+    path: Path
+
+
+def file_hashes(path: Path, *, chunk_size: int = 1024 * 1024) -> Dict[str, str]:
+    sha1 = hashlib.sha1()
+    md5 = hashlib.md5()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            sha1.update(chunk)
+            md5.update(chunk)
+    return {"sha1": sha1.hexdigest(), "md5": md5.hexdigest()}
+
+
+class PackCache:
+    """Server pack ZIPs shared by every server dir, keyed by server pack fileId.
+
+    Each ``<fileId>.zip`` has a ``<fileId>.json`` beside it recording the
+    CurseForge hashes it was verified against and when it was last used;
+    the least recently used packs are pruned past ``max_bytes``.
+    """
+
+    def __init__(self, root: Optional[Path] = None, *, max_bytes: Optional[int] = None):
+        self.root = root or pack_cache_dir()
+        self.max_bytes = DEFAULT_MAX_BYTES if max_bytes is None else max_bytes
+        # File ids still in use by this process, never evicted by add().
+        self.pinned: Set[int] = set()
+
+    def _zip_path(self, file_id: int) -> Path:
+        return self.root / f"{file_id}.zip"
+
+    def _meta_path(self, file_id: int) -> Path:
+        return self.root / f"{file_id}.json"
+
+    def _load(self, file_id: int) -> Optional[CachedPack]:
+        path = self._zip_path(file_id)
+        try:
+            data = json.loads(self._meta_path(file_id).read_text(encoding="utf-8"))
+            size = path.stat().st_size
+        except (OSError, ValueError):
+            return None
+        return CachedPack(
+            file_id=file_id,
+            pack_id=data.get("packId"),
+            display_name=data.get("displayName"),
+            size=size,
+            hashes=dict(data.get("hashes") or {}),
+            last_used_at=float(data.get("lastUsedAt", 0)),
+            path=path,
+        )
+
+    def _save_meta(self, entry: CachedPack) -> None:
+        payload = {
+            "fileId": entry.file_id,
+            "packId": entry.pack_id,
+            "displayName": entry.display_name,
+            "hashes": entry.hashes,
+            "lastUsedAt": entry.last_used_at,
+        }
+        meta = self._meta_path(entry.file_id)
+        tmp = meta.with_name(meta.name + ".tmp")
+        tmp.write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
+        os.replace(tmp, meta)
+
+    def entries(self) -> List[CachedPack]:
+        found: List[CachedPack] = []
+        if not self.root.is_dir():
+            return found
+        for meta in self.root.glob("*.json"):
+            if not meta.stem.isdigit():
+                continue
+            entry = self._load(int(meta.stem))
+            if entry is not None:
+                found.append(entry)
+        found.sort(key=lambda e: e.last_used_at, reverse=True)
+        return found
+
+    def get(self, server_file: ModFile) -> Optional[Path]:
+        """Path of the cached ZIP for this server pack file, if it is intact."""
+        entry = self._load(server_file.id)
+        if entry is None:
+            return None
+        if server_file.file_length and entry.size != server_file.file_length:
+            self.remove(server_file.id)
+            return None
+        shared = set(server_file.hashes) & set(entry.hashes)
+        if any(server_file.hashes[a] != entry.hashes[a] for a in shared):
+            self.remove(server_file.id)
+            return None
+        entry.last_used_at = time.time()
+        self._save_meta(entry)
+        return entry.path
+
+    def sha1(self, file_id: int) -> Optional[str]:
+        """sha1 of the cached ZIP as verified when it entered the cache, if known."""
+        entry = self._load(file_id)
+        return entry.hashes.get("sha1") if entry else None
+
+    def add(
+        self,
+        src: Path,
+        server_file: ModFile,
+        *,
+        pack_id: Optional[int] = None,
+        display_name: Optional[str] = None,
+        hashes: Optional[Dict[str, str]] = None,
+    ) -> Path:
+        """Verify ``src`` against the file's published hashes and move it in.
+
+        ``hashes`` are digests already computed while downloading; only when
+        they are missing is the file read again to hash it.
+        """
+        what = f"Server pack {server_file.id}"
+        size = src.stat().st_size
+        if server_file.file_length and size != server_file.file_length:
+            raise ChecksumMismatchError(
+                f"{what} has {size} bytes, expected {server_file.file_length}."
+            )
+        if not hashes:
+            hashes = file_hashes(src)
+        verify_hashes(server_file.hashes, hashes, what=what)
+        self.root.mkdir(parents=True, exist_ok=True)
+        dest = self._zip_path(server_file.id)
+        os.replace(src, dest)
+        self._save_meta(
+            CachedPack(
+                file_id=server_file.id,
+                pack_id=pack_id,
+                display_name=display_name,
+                size=size,
+                hashes=hashes,
+                last_used_at=time.time(),
+                path=dest,
+            )
+        )
+        self.prune(keep={server_file.id} | self.pinned)
+        return dest
+
+    def remove(self, file_id: int) -> None:
+        for path in (self._zip_path(file_id), self._meta_path(file_id)):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def prune(
+        self, max_bytes: Optional[int] = None, *, keep: Iterable[int] = ()
+    ) -> List[CachedPack]:
+        """Evict least recently used packs until the cache fits; returns them."""
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        keep = set(keep)
+        entries = self.entries()
+        total = sum(e.size for e in entries)
+        removed: List[CachedPack] = []
+        for entry in reversed(entries):
+            if total <= limit:
+                break
+            if entry.file_id in keep:
+                continue
+            self.remove(entry.file_id)
+            total -= entry.size
+            removed.append(entry)
+        return removed
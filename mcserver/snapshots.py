@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional
+
+from .errors import UserFacingError
+from .fs_ops import swap_in
+from .manifest import MANIFEST_FILENAME
+from .state import STATE_DIRNAME, STATE_FILENAME, ServerState, utc_now_iso
+
+
+SNAPSHOTS_DIRNAME = "snapshots"
+SNAPSHOT_FILENAME = "snapshot.json"
+DEFAULT_RETAIN = 3
+
+
+@dataclass
+class Snapshot:
+    """What one update replaced, so it can be put back without the network.
+
+    ``tree`` holds the directories and top-level files the update swapped
+    out, beside copies of the state.json and manifest.json that described
+    them. ``added`` are the swapped-in names that had no previous version.
+    """
+
+    path: Path
+    seq: int
+    created_at: Optional[str] = None
+    file_id: Optional[int] = None
+    display_name: Optional[str] = None
+    swapped: List[str] = field(default_factory=list)
+    added: List[str] = field(default_factory=list)
+
+    @property
+    def tree(self) -> Path:
+        return self.path / "tree"
+
+
+class SnapshotStore:
+    """Snapshots in ``.mcserver/snapshots/<seq>``, newest seq last taken."""
+
+    def __init__(self, server_dir: Path):
+        self.server_dir = server_dir
+        self.root = server_dir / STATE_DIRNAME / SNAPSHOTS_DIRNAME
+
+    def _load(self, path: Path) -> Optional[Snapshot]:
+        try:
+            data = json.loads((path / SNAPSHOT_FILENAME).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        return Snapshot(
+            path=path,
+            seq=int(path.name),
+            created_at=data.get("createdAt"),
+            file_id=data.get("fileId"),
+            display_name=data.get("displayName"),
+            swapped=list(data.get("swapped") or []),
+            added=list(data.get("added") or []),
+        )
+
+    def list(self) -> List[Snapshot]:
+        """Committed snapshots, newest first."""
+        found: List[Snapshot] = []
+        if not self.root.is_dir():
+            return found
+        for path in self.root.iterdir():
+            if path.name.isdigit():
+                snap = self._load(path)
+                if snap is not None:
+                    found.append(snap)
+        found.sort(key=lambda s: s.seq, reverse=True)
+        return found
+
+    def begin(self) -> Snapshot:
+        """Start a snapshot of the current version, before an update swaps."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        seqs = [int(p.name) for p in self.root.iterdir() if p.name.isdigit()]
+        path = self.root / str(max(seqs, default=0) + 1)
+        state = ServerState.load(self.server_dir)
+        snap = Snapshot(
+            path=path,
+            seq=int(path.name),
+            file_id=state.installed_file_id if state else None,
+            display_name=state.installed_display_name if state else None,
+        )
+        snap.tree.mkdir(parents=True)
+        for name in (STATE_FILENAME, MANIFEST_FILENAME):
+            src = self.server_dir / STATE_DIRNAME / name
+            if src.exists():
+                shutil.copy2(src, path / name)
+        return snap
+
+    def commit(self, snap: Snapshot, *, swapped: List[str], added: List[str]) -> None:
+        snap.created_at = utc_now_iso()
+        snap.swapped = list(swapped)
+        snap.added = list(added)
+        payload = {
+            "createdAt": snap.created_at,
+            "fileId": snap.file_id,
+            "displayName": snap.display_name,
+            "swapped": snap.swapped,
+            "added": snap.added,
+        }
+        (snap.path / SNAPSHOT_FILENAME).write_text(
+            json.dumps(payload, indent=2) + "\n", encoding="utf-8"
+        )
+
+    def discard(self, snap: Snapshot) -> None:
+        """Drop an uncommitted snapshot, unless it still holds swapped-out data."""
+        if snap.tree.is_dir() and any(snap.tree.iterdir()):
+            return
+        shutil.rmtree(snap.path, ignore_errors=True)
+
+    def prune(self, retain: int) -> List[Snapshot]:
+        """Delete all but the newest ``retain`` snapshots; returns the deleted."""
+        removed = self.list()[max(retain, 0) :]
+        for snap in removed:
+            shutil.rmtree(snap.path, ignore_errors=True)
+        return removed
+
+    def restore(self, snap: Snapshot, staging: Path) -> None:
+        """Swap ``snap`` back in and restore its state.json and manifest.json.
+
+        The snapshot is consumed: the current files it replaces are deleted,
+        so rolling back twice steps back two versions.
+        """
+        latest = self.list()
+        if not latest or latest[0].seq != snap.seq:
+            raise UserFacingError("Only the most recent snapshot can be restored.")
+        discard = staging / "discard"
+        discard.mkdir(parents=True, exist_ok=True)
+        for name in snap.added:
+            current = self.server_dir / name
+            if current.exists() or current.is_symlink():
+                os.rename(current, discard / name)
+        swap_in(
+            [n for n in snap.swapped if n not in snap.added],
+            snap.tree,
+            self.server_dir,
+            discard,
+        )
+        for name in (STATE_FILENAME, MANIFEST_FILENAME):
+            saved = snap.path / name
+            current = self.server_dir / STATE_DIRNAME / name
+            if saved.exists():
+                os.replace(saved, current)
+            elif current.exists():
+                current.unlink()
+        shutil.rmtree(snap.path, ignore_errors=True)
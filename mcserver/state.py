@@ -20,6 +20,15 @@ def utc_now_iso() -> str:
     )
 
 
+def utc_iso(timestamp: float) -> str:
+    return (
+        datetime.fromtimestamp(timestamp, timezone.utc)
+        .replace(microsecond=0)
+        .isoformat()
+        .replace("+00:00", "Z")
+    )
+
+
 @dataclass
 class ServerState:
     provider: str = "curseforge"
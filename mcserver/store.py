@@ -0,0 +1,276 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import stat
+import threading
+import time
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from .config import object_store_dir
+from .fs_ops import Copier
+
+
+# Pack directories whose files go through the store. Both hold jars that
+# neither the server nor admins edit; configs stay private to each server.
+STORE_DIRS = ("mods", "libraries")
+
+GC_GRACE_S = 60 * 60
+
+_READ_ONLY = stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH
+
+
+def store_members(pack_prefix: str) -> Callable[[str], bool]:
+    """Selects the ZIP members that are materialised from the store."""
+
+    def wanted(name: str) -> bool:
+        if not name.startswith(pack_prefix) or name.endswith("/"):
+            return False
+        top, sep, _rest = name[len(pack_prefix) :].partition("/")
+        return bool(sep) and top in STORE_DIRS
+
+    return wanted
+
+
+def _ref_name(server_dir: Path) -> str:
+    return hashlib.sha256(str(server_dir).encode("utf-8")).hexdigest()[:32] + ".json"
+
+
+@dataclass
+class GcResult:
+    objects_removed: int = 0
+    bytes_freed: int = 0
+    refs_removed: int = 0
+
+
+class ObjectStore:
+    """Files shared by every server dir, stored once by sha256 of content.
+
+    ``objects/<ab>/<sha256>`` are read-only and hardlinked into server dirs,
+    so a file's link count says whether any server (or rollback snapshot)
+    still uses it. ``index/<pack sha1>/<member>`` maps a member of a
+    verified server pack ZIP to the object its bytes hashed to when this
+    store inflated them, so known content is linked without being inflated
+    again, and ``refs/`` lists the server dirs that use the store.
+
+    ``pack_sha1`` names the ZIP being applied, as verified by the pack
+    cache; without it every member is inflated and hashed. A member's CRC
+    and size never identify an object: both are trivial to collide.
+    """
+
+    def __init__(
+        self,
+        root: Optional[Path] = None,
+        *,
+        copier: Optional[Copier] = None,
+        pack_sha1: Optional[str] = None,
+    ):
+        self.root = Path(root) if root else object_store_dir()
+        self.copier = copier or Copier()
+        self.pack_sha1 = pack_sha1
+        self.linked = 0
+        self.added = 0
+        self._lock = threading.Lock()
+
+    def object_path(self, digest: str) -> Path:
+        return self.root / "objects" / digest[:2] / digest
+
+    def _index_path(self, name: str) -> Optional[Path]:
+        if not self.pack_sha1:
+            return None
+        member = hashlib.sha256(name.encode("utf-8")).hexdigest()[:32]
+        return self.root / "index" / self.pack_sha1.lower() / member
+
+    def _write_atomic(self, path: Path, text: str) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, path)
+
+    def _write_new(self, path: Path, text: str) -> None:
+        """Write ``path`` unless it exists; an index entry is never replaced."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(text, encoding="utf-8")
+        try:
+            os.link(tmp, path)  # fails if another writer got there first
+        except FileExistsError:
+            pass
+        except OSError:
+            if not path.exists():
+                os.replace(tmp, path)
+                return
+        tmp.unlink()
+
+    def lookup(self, info: zipfile.ZipInfo) -> Optional[Path]:
+        """The object recorded for this member of the current pack, if any."""
+        index = self._index_path(info.filename)
+        if index is None:
+            return None
+        try:
+            digest = index.read_text(encoding="utf-8").strip()
+        except OSError:
+            return None
+        obj = self.object_path(digest)
+        try:
+            if obj.stat().st_size == info.file_size:
+                return obj
+        except OSError:
+            pass
+        return None
+
+    def _commit(self, tmp: Path, digest: str, *, member: Optional[str] = None) -> Path:
+        os.chmod(tmp, _READ_ONLY)
+        obj = self.object_path(digest)
+        obj.parent.mkdir(parents=True, exist_ok=True)
+        if obj.exists():
+            tmp.unlink()  # same content entered meanwhile, by another member or process
+        else:
+            os.replace(tmp, obj)
+            with self._lock:
+                self.added += 1
+        index = self._index_path(member) if member is not None else None
+        if index is not None:
+            self._write_new(index, digest + "\n")
+        return obj
+
+    def _tmp_path(self) -> Path:
+        tmp_dir = self.root / "tmp"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        return tmp_dir / f"{os.getpid()}.{threading.get_ident()}.part"
+
+    def add_member(self, zf: zipfile.ZipFile, info: zipfile.ZipInfo) -> Path:
+        """Inflate ``info`` into the store, hashing as it is written."""
+        tmp = self._tmp_path()
+        h = hashlib.sha256()
+        with zf.open(info) as src, open(tmp, "wb") as dst:
+            while True:
+                chunk = src.read(1024 * 1024)
+                if not chunk:
+                    break
+                h.update(chunk)
+                dst.write(chunk)
+        return self._commit(tmp, h.hexdigest(), member=info.filename)
+
+    def adopt(self, path: Path, info: zipfile.ZipInfo) -> Path:
+        """The object for ``info``, entering the local copy at ``path`` if new.
+
+        A file not yet in the store is hashed and linked in as the object
+        itself (and made read-only), so servers set up before the store join
+        it for free. Its digest is not indexed: only bytes this store
+        inflated from the verified pack are.
+        """
+        obj = self.lookup(info)
+        if obj is not None:
+            return obj
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(chunk)
+        tmp = self._tmp_path()
+        try:
+            os.link(path, tmp)
+        except OSError:
+            self.copier.copy(path, tmp)
+        return self._commit(tmp, h.hexdigest())
+
+    def link(self, obj: Path, dest: Path) -> None:
+        try:
+            os.link(obj, dest)
+        except OSError:
+            # Store on another filesystem: no sharing, but the install works.
+            self.copier.copy(obj, dest)
+            os.chmod(dest, 0o644)
+        with self._lock:
+            self.linked += 1
+
+    def materialize(self, zf: zipfile.ZipFile, info: zipfile.ZipInfo, dest: Path) -> None:
+        """Put the content of ``info`` at ``dest`` as a link to its object."""
+        obj = self.lookup(info) or self.add_member(zf, info)
+        self.link(obj, dest)
+
+    def add_ref(self, server_dir: Path) -> None:
+        self._write_atomic(
+            self.root / "refs" / _ref_name(server_dir),
+            json.dumps({"path": str(server_dir)}) + "\n",
+        )
+
+    def refs(self) -> List[Path]:
+        found: List[Path] = []
+        refs_dir = self.root / "refs"
+        if not refs_dir.is_dir():
+            return found
+        for ref in sorted(refs_dir.glob("*.json")):
+            try:
+                found.append(Path(json.loads(ref.read_text(encoding="utf-8"))["path"]))
+            except (OSError, ValueError, KeyError):
+                continue
+        return found
+
+    def objects(self) -> List[Path]:
+        objects_dir = self.root / "objects"
+        if not objects_dir.is_dir():
+            return []
+        return [p for p in objects_dir.glob("*/*") if p.is_file()]
+
+    def gc(self) -> GcResult:
+        """Delete objects no server dir links to any more, and stale records.
+
+        An object whose only link is its own store entry is unused: every
+        server file and rollback snapshot using it is another link.
+        """
+        result = GcResult()
+        # Anything touched this recently may belong to an install still in
+        # progress: entered in the store but not linked into its server yet.
+        cutoff = time.time() - GC_GRACE_S
+        for server_dir in self.refs():
+            if not server_dir.is_dir():
+                (self.root / "refs" / _ref_name(server_dir)).unlink()
+                result.refs_removed += 1
+        for obj in self.objects():
+            st = obj.stat()
+            if st.st_nlink <= 1 and st.st_ctime < cutoff:
+                obj.unlink()
+                result.objects_removed += 1
+                result.bytes_freed += st.st_size
+        index_dir = self.root / "index"
+        if index_dir.is_dir():
+            for pack_dir in index_dir.iterdir():
+                if not pack_dir.is_dir():
+                    pack_dir.unlink()  # CRC-keyed entry from an older store layout
+                    continue
+                for entry in pack_dir.iterdir():
+                    try:
+                        digest = entry.read_text(encoding="utf-8").strip()
+                    except OSError:
+                        continue
+                    if not self.object_path(digest).exists():
+                        entry.unlink()
+                if not any(pack_dir.iterdir()):
+                    pack_dir.rmdir()
+        tmp_dir = self.root / "tmp"
+        if tmp_dir.is_dir():
+            for tmp in tmp_dir.iterdir():
+                if tmp.stat().st_mtime < cutoff:
+                    tmp.unlink()
+        return result
+
+
+def detach(path: Path, *, copier: Optional[Copier] = None) -> bool:
+    """Give ``path`` a private, writable inode if it shares one.
+
+    Run before writing to a store-managed file in place; otherwise the edit
+    would land in every server sharing it. Returns whether it was linked.
+    """
+    st = path.lstat()
+    if not stat.S_ISREG(st.st_mode) or st.st_nlink <= 1:
+        return False
+    tmp = path.with_name(f".{path.name}.detach")
+    (copier or Copier()).copy(path, tmp)
+    os.chmod(tmp, stat.S_IMODE(st.st_mode) | stat.S_IWUSR)
+    os.replace(tmp, path)
+    return True
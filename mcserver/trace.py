@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import contextvars
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar
+
+
+TRACE_VERSION = 1
+
+_T = TypeVar("_T")
+
+
+@dataclass
+class Span:
+    id: int
+    name: str
+    parent: Optional[int]
+    # Seconds since the tracer started; duration is None while open.
+    start: float
+    duration: Optional[float] = None
+    bytes: int = 0
+    files: int = 0
+    requests: int = 0
+    attrs: Dict[str, Any] = field(default_factory=dict)
+
+
+class Tracer:
+    """Timed, nested spans with byte, file and request counters.
+
+    The current span lives in a context variable. Work handed to another
+    thread (download ranges, extraction workers, fleet servers) must be
+    wrapped with ``bind`` when it is submitted: it then runs under the span
+    that submitted it, whatever the submitting thread has moved on to since.
+    Unbound threads have no current span, and their counts are dropped.
+    """
+
+    def __init__(self) -> None:
+        self.spans: List[Span] = []
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+        self._current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar(
+            f"mcserver_trace_{id(self)}", default=None
+        )
+
+    @contextmanager
+    def span(self, name: str, **attrs: Any) -> Iterator[Span]:
+        parent = self._current.get()
+        with self._lock:
+            s = Span(
+                id=len(self.spans),
+                name=name,
+                parent=parent.id if parent else None,
+                start=time.perf_counter() - self._t0,
+                attrs=attrs,
+            )
+            self.spans.append(s)
+        token = self._current.set(s)
+        try:
+            yield s
+        finally:
+            self._current.reset(token)
+            with self._lock:
+                s.duration = time.perf_counter() - self._t0 - s.start
+
+    def count(self, *, bytes: int = 0, files: int = 0, requests: int = 0) -> None:
+        s = self._current.get()
+        if s is None:
+            return
+        with self._lock:
+            s.bytes += bytes
+            s.files += files
+            s.requests += requests
+
+    def _totals(self) -> Dict[int, Span]:
+        """Spans with the counts of their descendants added in."""
+        totals = {
+            s.id: Span(s.id, s.name, s.parent, s.start, s.duration, s.bytes, s.files, s.requests)
+            for s in self.spans
+        }
+        for s in reversed(self.spans):  # children always come after parents
+            if s.parent is not None:
+                t, p = totals[s.id], totals[s.parent]
+                p.bytes += t.bytes
+                p.files += t.files
+                p.requests += t.requests
+        return totals
+
+    def summary(self) -> List[str]:
+        """Indented lines, one per span name under each parent, repeats merged."""
+        from .download import format_bytes
+
+        totals = self._totals()
+        children: Dict[Optional[int], List[Span]] = {}
+        for s in self.spans:
+            children.setdefault(s.parent, []).append(totals[s.id])
+        lines: List[str] = []
+
+        def walk(parent_ids: List[Optional[int]], depth: int) -> None:
+            groups: Dict[str, List[Span]] = {}
+            for pid in parent_ids:
+                for child in children.get(pid, []):
+                    groups.setdefault(child.name, []).append(child)
+            for name, group in groups.items():
+                label = f"{name} x{len(group)}" if len(group) > 1 else name
+                seconds = sum(s.duration or 0.0 for s in group)
+                parts = [f"{'  ' * depth}{label:<{32 - 2 * depth}} {seconds:8.3f}s"]
+                nbytes = sum(s.bytes for s in group)
+                nfiles = sum(s.files for s in group)
+                nrequests = sum(s.requests for s in group)
+                if nbytes:
+                    parts.append(format_bytes(nbytes))
+                if nfiles:
+                    parts.append(f"{nfiles} files")
+                if nrequests:
+                    parts.append(f"{nrequests} requests")
+                lines.append("  ".join(parts))
+                walk([child.id for child in group], depth + 1)
+
+        walk([None], 0)
+        return lines
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "version": TRACE_VERSION,
+            "spans": [
+                {
+                    "id": s.id,
+                    "parent": s.parent,
+                    "name": s.name,
+                    "start": round(s.start, 6),
+                    "duration": None if s.duration is None else round(s.duration, 6),
+                    "bytes": s.bytes,
+                    "files": s.files,
+                    "requests": s.requests,
+                    "attrs": s.attrs,
+                }
+                for s in self.spans
+            ],
+        }
+
+    def write_json(self, path: Path) -> None:
+        path.write_text(json.dumps(self.to_json(), indent=2) + "\n", encoding="utf-8")
+
+
+# The active tracer, if tracing was asked for. Everything below is a no-op
+# (one global lookup) while it is None.
+_active: Optional[Tracer] = None
+
+
+class _NoSpan:
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+
+_NO_SPAN = _NoSpan()
+
+
+def enable() -> Tracer:
+    global _active
+    _active = Tracer()
+    return _active
+
+
+def disable() -> None:
+    global _active
+    _active = None
+
+
+def span(name: str, **attrs: Any) -> Any:
+    """Context manager timing ``name`` under the current span, if tracing."""
+    tracer = _active
+    if tracer is None:
+        return _NO_SPAN
+    return tracer.span(name, **attrs)
+
+
+def count(*, bytes: int = 0, files: int = 0, requests: int = 0) -> None:
+    """Add to the current span's counters, if tracing."""
+    tracer = _active
+    if tracer is not None:
+        tracer.count(bytes=bytes, files=files, requests=requests)
+
+
+def bind(fn: Callable[..., _T]) -> Callable[..., _T]:
+    """``fn`` set to run under the current span, for handing to another thread.
+
+    Wrap at submit time, once per task: ``pool.submit(trace.bind(fn), ...)``.
+    """
+    if _active is None:
+        return fn
+    return functools.partial(contextvars.copy_context().run, fn)
@@ -0,0 +1,11 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+# The package under test, and the helper modules beside the tests, import
+# from any working directory without installing anything.
+TESTS = Path(__file__).resolve().parent
+for path in (TESTS.parent, TESTS):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
@@ -0,0 +1,116 @@
+"""A local HTTP/1.1 server for download tests: Range, If-Range and ETag.
+
+It serves ``body`` at every path and records each request it gets, so a
+test can check which byte ranges a download asked for.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+
+class RangeServer:
+    """Serves ``body`` under ``etag``; use as a context manager.
+
+    ``truncate_at`` makes the next response covering that byte offset stop
+    there and drop the connection, like a download cut off mid-way.
+    ``head_etag`` overrides the ETag sent to HEAD only, as if the file
+    changed between a client's probe and its ranged GETs.
+    """
+
+    def __init__(self, body: bytes, *, etag: str = '"v1"'):
+        self.body = body
+        self.etag = etag
+        self.head_etag: Optional[str] = None
+        self.truncate_at: Optional[int] = None
+        # (method, request headers) of every request, in arrival order.
+        self.requests: List[Tuple[str, Dict[str, str]]] = []
+        self.bytes_sent = 0
+        self._active = 0
+        self._idle = threading.Condition()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), _handler(self))
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/pack.zip"
+
+    def __enter__(self) -> "RangeServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def ranges(self) -> List[str]:
+        """The Range header of every GET that sent one."""
+        return [h["Range"] for m, h in self.requests if m == "GET" and "Range" in h]
+
+    def reset_log(self) -> None:
+        """Forget what was served, once responses still being sent are done."""
+        with self._idle:
+            self._idle.wait_for(lambda: self._active == 0, timeout=10)
+            self.requests.clear()
+            self.bytes_sent = 0
+
+
+def _handler(server: RangeServer) -> type:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_HEAD(self) -> None:
+            self._serve(head=True)
+
+        def do_GET(self) -> None:
+            self._serve(head=False)
+
+        def log_message(self, *args) -> None:
+            pass
+
+        def _serve(self, *, head: bool) -> None:
+            with server._idle:
+                server.requests.append((self.command, dict(self.headers.items())))
+                server._active += 1
+            try:
+                self._respond(head=head)
+            finally:
+                with server._idle:
+                    server._active -= 1
+                    server._idle.notify_all()
+
+        def _respond(self, *, head: bool) -> None:
+            body, size = server.body, len(server.body)
+            start, end, status = 0, size - 1, 200
+            match = re.fullmatch(r"bytes=(\d+)-(\d*)", self.headers.get("Range") or "")
+            if_range = self.headers.get("If-Range")
+            if match and (if_range is None or if_range == server.etag):
+                start, end, status = int(match.group(1)), int(match.group(2) or end), 206
+            etag = server.head_etag if head and server.head_etag else server.etag
+
+            self.send_response(status)
+            self.send_header("Accept-Ranges", "bytes")
+            self.send_header("ETag", etag)
+            if status == 206:
+                self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+            self.send_header("Content-Length", str(end + 1 - start))
+            self.end_headers()
+            if head:
+                return
+
+            stop = end + 1
+            cut = server.truncate_at
+            if cut is not None and start <= cut < stop:
+                server.truncate_at = None
+                stop = cut
+                self.close_connection = True
+            self.wfile.write(body[start:stop])
+            with server._idle:
+                server.bytes_sent += stop - start
+
+    return Handler
@@ -0,0 +1,78 @@
+"""Synthetic server pack ZIPs for the tests and the benchmarks.
+
+``make_server_pack`` writes a server-pack-shaped ZIP of a given entry count
+and size. Packs made with the same seed and a different ``version`` differ in
+about ``changed`` of their files, which is what an update has to apply.
+"""
+
+from __future__ import annotations
+
+import random
+import zipfile
+from pathlib import Path
+from typing import Dict, List
+
+
+PACK_ROOT = "Pack-Server/"
+
+
+def make_server_pack(
+    path: Path,
+    *,
+    entries: int = 2000,
+    size_bytes: int = 64 * 1024 * 1024,
+    version: int = 1,
+    changed: float = 0.05,
+    seed: int = 0,
+) -> Dict[str, int]:
+    """Write a synthetic server pack ZIP to ``path``; returns its stats.
+
+    Roughly like a real pack: a few large, incompressible mod jars carry
+    most of the bytes; libraries, configs and scripts make up the entry
+    count. Everything lives under ``Pack-Server/`` with a ``run.sh``.
+    """
+    rng = random.Random(seed)
+    # Jars are already-compressed data; configs are text deflate can shrink.
+    noise = rng.randbytes(8 * 1024 * 1024)
+    words = [b"minecraft", b"forge", b"config", b"true", b"false", b"0.25", b"\n"]
+    text = b" ".join(rng.choice(words) for _ in range(200_000))
+
+    jars = max(1, entries // 20)
+    libraries = max(1, entries // 5)
+    configs = max(0, entries - jars - libraries - 2)
+    # Jars get ~80% of the bytes, libraries the rest; configs are small.
+    jar_size = max(1, int(size_bytes * 0.8) // jars)
+    lib_size = max(1, int(size_bytes * 0.2) // libraries)
+
+    layout: List[tuple] = [(f"{PACK_ROOT}forge-installer.jar", 256 * 1024, noise)]
+    layout += [(f"{PACK_ROOT}mods/mod{i:04d}.jar", jar_size, noise) for i in range(jars)]
+    layout += [
+        (f"{PACK_ROOT}libraries/lib{i % 97:02d}/part{i:05d}.jar", lib_size, noise)
+        for i in range(libraries)
+    ]
+    layout += [
+        (f"{PACK_ROOT}config/mod{i % 211:03d}/cfg{i:05d}.toml", 512 + i % 3584, text)
+        for i in range(configs)
+    ]
+
+    stats = {"entries": 0, "bytes": 0, "changed": 0}
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+        for index, (name, size, corpus) in enumerate(layout):
+            # Per-entry generator: which files change, and how, depends only
+            # on the seed and the entry, so versions share everything else.
+            entry_rng = random.Random(f"{seed}:{index}")
+            start = entry_rng.randrange(len(corpus) - min(size, len(corpus) - 1))
+            data = corpus[start : start + size]
+            data = (data * -(-size // max(1, len(data))))[:size]
+            if version > 1 and entry_rng.random() < changed:
+                data = f"v{version}".encode().ljust(8)[:size] + data[8:]
+                stats["changed"] += 1
+            zf.writestr(name, data)
+            stats["entries"] += 1
+            stats["bytes"] += size
+        info = zipfile.ZipInfo(f"{PACK_ROOT}run.sh")
+        info.external_attr = 0o755 << 16
+        zf.writestr(info, "#!/bin/sh\nexec java @user_jvm_args.txt \"$@\"\n")
+        zf.writestr(f"{PACK_ROOT}user_jvm_args.txt", "-Xmx4G\n")
+        stats["entries"] += 2
+    return stats
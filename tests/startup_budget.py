@@ -0,0 +1,112 @@
+"""Startup budget for local-only commands, measured with ``-X importtime``.
+
+Shared by tests/test_startup.py, which enforces it, and
+benchmarks/check_startup.py, which prints the numbers.
+
+``mcserver status``, ``config path`` and ``config show`` run the way the
+console script does, in fresh interpreters. They must not import any of
+``HEAVY_MODULES`` (the HTTP, download and extraction stack they never use),
+and the imports they add on top of a bare interpreter must fit in
+``BUDGET_MS`` (best of ``REPEAT`` runs). The module check is exact and
+machine-independent; the time budget catches new eager imports of modules
+not listed here.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# What the console script entry point does.
+_ENTRY = "import sys\nfrom mcserver.cli import main\nraise SystemExit(main(sys.argv[1:]))\n"
+
+HEAVY_MODULES = (
+    "concurrent.futures",
+    "http.client",
+    "ssl",
+    "socket",
+    "tempfile",
+    "urllib.request",
+    "zipfile",
+    "mcserver.cache",
+    "mcserver.curseforge",
+    "mcserver.download",
+    "mcserver.fs_ops",
+    "mcserver.http_client",
+    "mcserver.installer",
+    "mcserver.trace",
+)
+
+# argparse, pathlib and the dataclass-based config/state account for most
+# of what's left, 30-50ms on a slow machine; eager imports of the network
+# and ZIP stack took these commands past 100ms. A slow CI box can raise it
+# with MCSERVER_STARTUP_BUDGET_MS.
+BUDGET_MS = float(os.environ.get("MCSERVER_STARTUP_BUDGET_MS", "80"))
+REPEAT = 5
+
+
+def importtime(args: List[str], env: Dict[str, str]) -> Tuple[Dict[str, int], List[str]]:
+    """(cumulative microseconds of each top-level import, every module imported)."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        env=env,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    top: Dict[str, int] = {}
+    modules: List[str] = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _self, cumulative, name = line[len("import time:") :].split("|")
+        if not cumulative.strip().isdigit():
+            continue  # the header line
+        modules.append(name.strip())
+        if not name[1:].startswith(" "):  # nested imports are indented
+            top[name.strip()] = int(cumulative)
+    return top, modules
+
+
+def local_commands(root: Path) -> Tuple[Dict[str, List[str]], Dict[str, str]]:
+    """The commands to measure, and an environment isolated under ``root``."""
+    server_dir = root / "server"
+    (server_dir / ".mcserver").mkdir(parents=True, exist_ok=True)
+    (server_dir / ".mcserver" / "state.json").write_text(
+        json.dumps({"packId": 1, "installedFileId": 2}), encoding="utf-8"
+    )
+    env = dict(os.environ)
+    env.update(
+        PYTHONPATH=str(ROOT),
+        XDG_CONFIG_HOME=str(root / "config"),
+        XDG_CACHE_HOME=str(root / "cache"),
+    )
+    commands = {
+        "status": ["status", "--dir", str(server_dir)],
+        "config path": ["config", "path"],
+        "config show": ["config", "show"],
+    }
+    return commands, env
+
+
+def measure(
+    argv: List[str], env: Dict[str, str], *, repeat: int = REPEAT
+) -> Tuple[float, List[str]]:
+    """(best import ms over a bare interpreter, heavy modules imported) for ``argv``."""
+    bare, _modules = importtime(["-c", "pass"], env)
+    importtime(["-c", _ENTRY, *argv], env)  # untimed, so every .pyc is written
+    best = None
+    heavy: List[str] = []
+    for _ in range(max(1, repeat)):
+        top, modules = importtime(["-c", _ENTRY, *argv], env)
+        added = sum(us for mod, us in top.items() if mod not in bare)
+        best = added if best is None else min(best, added)
+        heavy = sorted(set(modules) & set(HEAVY_MODULES))
+    return (best or 0) / 1000, heavy
@@ -0,0 +1,128 @@
+"""Resumable downloads: download_to(resume=True) against a local server."""
+
+from __future__ import annotations
+
+import hashlib
+import random
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from mcserver import download
+from mcserver.download import _Partial, download_to, partial_paths
+from mcserver.errors import ChecksumMismatchError
+from mcserver.http_client import ConnectionPool
+from range_server import RangeServer
+
+SIZE = 256 * 1024
+CHUNK = 16 * 1024
+
+
+def _body(seed: int) -> bytes:
+    return random.Random(seed).randbytes(SIZE)
+
+
+@pytest.fixture(autouse=True)
+def _four_ranges(monkeypatch: pytest.MonkeyPatch) -> None:
+    # Split the small test body into four ranges, as a real pack would be.
+    monkeypatch.setattr(download, "MIN_SEGMENT_BYTES", SIZE // 4)
+    monkeypatch.setenv("no_proxy", "127.0.0.1")
+
+
+@pytest.fixture
+def server() -> Iterator[RangeServer]:
+    with RangeServer(_body(1)) as srv:
+        yield srv
+
+
+def _download(server: RangeServer, dest: Path, **kwargs) -> dict:
+    pool = ConnectionPool()
+    try:
+        return download_to(
+            server.url,
+            dest,
+            pool=pool,
+            segments=4,
+            resume=True,
+            label=None,
+            chunk_size=CHUNK,
+            **kwargs,
+        )
+    finally:
+        pool.close()
+
+
+def _interrupt(server: RangeServer, dest: Path, at: int) -> _Partial:
+    """Cut a download off at byte ``at``; returns the progress it recorded."""
+    server.truncate_at = at
+    with pytest.raises(OSError):
+        _download(server, dest)
+    part, sidecar = partial_paths(dest)
+    assert part.exists() and not dest.exists()
+    partial = _Partial.load(sidecar)
+    assert partial is not None and 0 < partial.done < SIZE
+    server.reset_log()
+    return partial
+
+
+def test_resume_fetches_only_what_is_missing(tmp_path: Path, server: RangeServer) -> None:
+    dest = tmp_path / "pack.zip"
+    partial = _interrupt(server, dest, at=100_000)
+
+    digests = _download(server, dest)
+
+    assert dest.read_bytes() == server.body
+    assert digests == {"sha1": hashlib.sha1(server.body).hexdigest()}
+    assert server.bytes_sent == SIZE - partial.done
+    assert "bytes=100000-131071" in server.ranges()
+    assert all(h.get("If-Range") == '"v1"' for m, h in server.requests if m == "GET")
+    assert not any(p.exists() for p in partial_paths(dest))
+
+
+def test_changed_validator_discards_partial(tmp_path: Path, server: RangeServer) -> None:
+    dest = tmp_path / "pack.zip"
+    _interrupt(server, dest, at=100_000)
+    server.body, server.etag = _body(2), '"v2"'
+
+    _download(server, dest)
+
+    assert dest.read_bytes() == server.body
+    assert server.bytes_sent == SIZE
+    assert sorted(server.ranges()) == sorted(
+        f"bytes={start}-{start + SIZE // 4 - 1}" for start in range(0, SIZE, SIZE // 4)
+    )
+    assert not any(p.exists() for p in partial_paths(dest))
+
+
+def test_if_range_mismatch_falls_back_to_one_stream(
+    tmp_path: Path, server: RangeServer
+) -> None:
+    dest = tmp_path / "pack.zip"
+    _interrupt(server, dest, at=100_000)
+    # The probe still sees the old ETag, but the file changed before the GETs:
+    # If-Range gets the whole new body back as a 200.
+    server.body, server.etag, server.head_etag = _body(2), '"v2"', '"v1"'
+
+    digests = _download(server, dest)
+
+    assert dest.read_bytes() == server.body
+    assert digests == {"sha1": hashlib.sha1(server.body).hexdigest()}
+    method, headers = server.requests[-1]
+    assert method == "GET" and "Range" not in headers
+    assert not any(p.exists() for p in partial_paths(dest))
+
+
+@pytest.mark.parametrize("interrupted", [False, True])
+def test_hash_mismatch_removes_partial(
+    tmp_path: Path, server: RangeServer, interrupted: bool
+) -> None:
+    dest = tmp_path / "pack.zip"
+    if interrupted:
+        _interrupt(server, dest, at=100_000)
+
+    with pytest.raises(ChecksumMismatchError):
+        _download(server, dest, expected_hashes={"sha1": "0" * 40})
+
+    assert not dest.exists()
+    assert not any(p.exists() for p in partial_paths(dest))
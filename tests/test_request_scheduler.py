@@ -0,0 +1,122 @@
+"""RequestScheduler's token bucket, 429 pause and retry policy, on a fake clock."""
+
+from __future__ import annotations
+
+import errno
+import socket
+import ssl
+from typing import Dict, List, Optional
+
+import pytest
+
+from mcserver.http_client import HttpStatusError, RequestScheduler, is_retryable
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _status(code: int, headers: Optional[Dict[str, str]] = None) -> HttpStatusError:
+    return HttpStatusError("https://api.example/v1/mods", code, "Reason", headers or {})
+
+
+def test_burst_then_steady_rate() -> None:
+    clock = _Clock()
+    scheduler = RequestScheduler(rate=2, burst=3, clock=clock)
+
+    assert [scheduler.reserve() for _ in range(5)] == [0, 0, 0, 0.5, 1.0]
+
+    # Sending each request when told to keeps it at the steady rate.
+    clock.now += 1.0
+    delays: List[float] = []
+    for _ in range(4):
+        delays.append(scheduler.reserve())
+        clock.now += delays[-1]
+    assert delays == [0.5, 0.5, 0.5, 0.5]
+
+    # An idle spell refills the bucket, but never beyond the burst.
+    clock.now += 60
+    assert [scheduler.reserve() for _ in range(4)] == [0, 0, 0, 0.5]
+
+
+def test_unlimited_rate_never_waits() -> None:
+    scheduler = RequestScheduler(rate=None, clock=_Clock())
+    assert {scheduler.reserve() for _ in range(100)} == {0}
+
+
+def test_429_pauses_every_caller() -> None:
+    clock = _Clock()
+    scheduler = RequestScheduler(rate=None, base_delay_s=0, clock=clock)
+
+    assert scheduler.retry_delay(1, _status(429, {"Retry-After": "5"})) == 5
+    assert scheduler.throttled == 1
+    # Other callers, not just the one that got the 429, hold back.
+    assert scheduler.reserve() == 5
+    clock.now += 2
+    assert scheduler.reserve() == 3
+    clock.now += 3
+    assert scheduler.reserve() == 0
+
+
+def test_retry_after_on_other_statuses_only_delays_that_request() -> None:
+    scheduler = RequestScheduler(rate=None, base_delay_s=0, clock=_Clock())
+    assert scheduler.retry_delay(1, _status(503, {"Retry-After": "5"})) == 5
+    assert scheduler.reserve() == 0
+    assert scheduler.throttled == 0
+
+
+def test_retry_after_beyond_max_delay_fails_the_request() -> None:
+    clock = _Clock()
+    scheduler = RequestScheduler(rate=None, max_delay_s=60, clock=clock)
+    assert scheduler.retry_delay(1, _status(429, {"Retry-After": "3600"})) is None
+    assert scheduler.reserve() == 0
+
+
+def test_backoff_grows_and_attempts_run_out() -> None:
+    scheduler = RequestScheduler(max_attempts=4, base_delay_s=1, clock=_Clock())
+    exc = ConnectionResetError()
+    for attempt in (1, 2, 3):
+        delay = scheduler.retry_delay(attempt, exc)
+        assert delay is not None and 0 <= delay <= 2 ** (attempt - 1)
+    assert scheduler.retry_delay(4, exc) is None
+    assert scheduler.retries == 3
+
+
+@pytest.mark.parametrize("code", [408, 425, 429, 500, 502, 503, 504])
+def test_transient_statuses_are_retried(code: int) -> None:
+    assert is_retryable(_status(code))
+    assert RequestScheduler(clock=_Clock()).retry_delay(1, _status(code)) is not None
+
+
+@pytest.mark.parametrize("code", [400, 401, 403, 404, 409, 410, 422])
+def test_other_client_errors_are_not_retried(code: int) -> None:
+    assert not is_retryable(_status(code))
+    assert RequestScheduler(clock=_Clock()).retry_delay(1, _status(code)) is None
+
+
+@pytest.mark.parametrize(
+    "exc",
+    [ConnectionResetError(), ConnectionRefusedError(), TimeoutError(), socket.timeout()],
+    ids=lambda exc: type(exc).__name__,
+)
+def test_transport_failures_are_retried(exc: OSError) -> None:
+    assert is_retryable(exc)
+
+
+@pytest.mark.parametrize(
+    "exc",
+    [
+        ssl.SSLCertVerificationError("certificate verify failed"),
+        PermissionError(errno.EACCES, "Permission denied"),
+        OSError(errno.ENOSPC, "No space left on device"),
+        FileNotFoundError(errno.ENOENT, "No such file"),
+    ],
+    ids=lambda exc: type(exc).__name__,
+)
+def test_persistent_os_errors_are_not_retried(exc: OSError) -> None:
+    assert not is_retryable(exc)
+    assert RequestScheduler(clock=_Clock()).retry_delay(1, exc) is None
@@ -0,0 +1,112 @@
+"""The single-pack and bulk lookups agree on each pack's latest server pack."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+import pytest
+
+from mcserver.async_curseforge import AsyncCurseForgeClient
+from mcserver.curseforge import CurseForgeClient, ModFile
+from mcserver.errors import NoServerPackError
+
+
+def _file(
+    file_id: int, day: int, *, points_to: Optional[int] = None, server: bool = False
+) -> Dict[str, Any]:
+    return {
+        "id": file_id,
+        "displayName": f"File {file_id}",
+        "fileDate": f"2024-01-{day:02d}T00:00:00Z",
+        "serverPackFileId": points_to,
+        "isServerPack": server,
+    }
+
+
+# (first listing page, newest first; the mod's latestFiles)
+CASES = {
+    "newest points to a server pack": (
+        [_file(30, 3, points_to=31), _file(20, 2, points_to=21)],
+        [_file(30, 3, points_to=31)],
+    ),
+    "newest has no server pack": (
+        [_file(30, 3), _file(20, 2, points_to=21)],
+        [_file(30, 3), _file(20, 2, points_to=21)],
+    ),
+    "server pack listed but missing from latestFiles": (
+        [_file(31, 4, server=True), _file(30, 3), _file(20, 2, points_to=21)],
+        [_file(30, 3), _file(20, 2, points_to=21)],
+    ),
+    "no latestFiles": (
+        [_file(30, 3, points_to=31)],
+        [],
+    ),
+}
+
+
+class _Client(CurseForgeClient):
+    def __init__(self, page: List[Dict[str, Any]], latest: List[Dict[str, Any]]):
+        super().__init__("test-key")
+        self.page = page
+        self.latest = latest
+
+    def iter_file_pages(self, pack_id: int, *, page_size: int = 50):
+        yield [ModFile.from_api(item) for item in self.page]
+
+    def get_mods(self, pack_ids, *, jobs: int = 1):
+        return {int(p): {"id": int(p), "latestFiles": self.latest} for p in pack_ids}
+
+
+class _AsyncClient(AsyncCurseForgeClient):
+    def __init__(self, page: List[Dict[str, Any]], latest: List[Dict[str, Any]]):
+        super().__init__("test-key")
+        self.page = page
+        self.latest = latest
+
+    async def iter_file_pages(self, pack_id: int, *, page_size: int = 50):
+        yield [ModFile.from_api(item) for item in self.page]
+
+    async def get_mods(self, pack_ids):
+        return {int(p): {"id": int(p), "latestFiles": self.latest} for p in pack_ids}
+
+
+@pytest.fixture(autouse=True)
+def _config_home(tmp_path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("XDG_CONFIG_HOME", str(tmp_path / "config"))
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+
+
+def _single(cf: CurseForgeClient) -> Optional[Tuple[int, str, str]]:
+    try:
+        return cf.choose_latest_server_pack(1)
+    except NoServerPackError:
+        return None
+
+
+@pytest.mark.parametrize("case", sorted(CASES))
+def test_bulk_lookup_matches_single_pack_lookup(case: str) -> None:
+    page, latest = CASES[case]
+    cf = _Client(page, latest)
+    assert cf.choose_latest_server_packs([1]).get(1) == _single(cf)
+
+
+@pytest.mark.parametrize("case", sorted(CASES))
+def test_async_lookups_match_blocking_ones(case: str) -> None:
+    page, latest = CASES[case]
+    expected = _single(_Client(page, latest))
+
+    async def both() -> Tuple[Any, Any]:
+        cf = _AsyncClient(page, latest)
+        try:
+            single = await cf.choose_latest_server_pack(1)
+        except NoServerPackError:
+            single = None
+        return single, (await cf.choose_latest_server_packs([1])).get(1)
+
+    assert asyncio.run(both()) == (expected, expected)
+
+
+def test_newest_release_without_server_pack_is_left_out() -> None:
+    page, latest = CASES["newest has no server pack"]
+    assert _Client(page, latest).choose_latest_server_packs([1]) == {}
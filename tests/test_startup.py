@@ -0,0 +1,27 @@
+"""Local-only commands start without the network stack, within budget.
+
+See startup_budget.py for what is measured and why.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Tuple
+
+import pytest
+
+from startup_budget import BUDGET_MS, local_commands, measure
+
+
+@pytest.fixture(scope="module")
+def commands(
+    tmp_path_factory: pytest.TempPathFactory,
+) -> Tuple[Dict[str, List[str]], Dict[str, str]]:
+    return local_commands(tmp_path_factory.mktemp("startup"))
+
+
+@pytest.mark.parametrize("name", ["status", "config path", "config show"])
+def test_local_command_startup(name: str, commands) -> None:
+    argv, env = commands[0][name], commands[1]
+    ms, heavy = measure(argv, env)
+    assert heavy == [], f"{name} imports {', '.join(heavy)}"
+    assert ms <= BUDGET_MS, f"{name}: imports took {ms:.1f}ms, budget {BUDGET_MS:g}ms"
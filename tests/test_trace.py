@@ -0,0 +1,61 @@
+"""Span nesting across the thread pools that tracing follows."""
+
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from mcserver import trace
+
+
+def test_work_nests_under_the_span_that_submitted_it() -> None:
+    tracer = trace.enable()
+    try:
+        started = threading.Event()
+        go = threading.Event()
+
+        def apply() -> None:
+            with trace.span("server"):
+                started.set()
+                go.wait(5)
+                with ThreadPoolExecutor(max_workers=1) as pool:
+                    pool.submit(trace.bind(trace.count), files=5).result()
+
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            with trace.span("fleet"):
+                with trace.span("download", file_id=1):
+                    pass
+                future = pool.submit(trace.bind(apply))
+                started.wait(5)
+                # The next pack downloads while the previous one is applied.
+                with trace.span("download", file_id=2):
+                    go.set()
+                    future.result()
+    finally:
+        trace.disable()
+
+    by_name = {}
+    for s in tracer.spans:
+        by_name.setdefault(s.name, []).append(s)
+    [fleet], [server] = by_name["fleet"], by_name["server"]
+    assert server.parent == fleet.id
+    assert server.files == 5
+    assert [d.files for d in by_name["download"]] == [0, 0]
+
+
+def test_unbound_threads_count_nowhere() -> None:
+    tracer = trace.enable()
+    try:
+        with trace.span("main") as main:
+            t = threading.Thread(target=trace.count, kwargs={"files": 3})
+            t.start()
+            t.join()
+    finally:
+        trace.disable()
+    assert main.files == 0
+    assert len(tracer.spans) == 1
+
+
+def test_bind_is_a_no_op_without_tracing() -> None:
+    trace.disable()
+    assert trace.bind(len) is len
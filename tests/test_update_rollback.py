@@ -0,0 +1,179 @@
+"""apply_update, rollback and the object store, on generated server packs."""
+
+from __future__ import annotations
+
+import os
+import stat
+import zipfile
+from pathlib import Path
+from typing import Dict
+
+import pytest
+
+from mcserver.fs_ops import REPLACE_DIRS, STAGING_DIRNAME, staging_dir
+from mcserver.installer import apply_server_pack
+from mcserver.manifest import Manifest
+from mcserver.pack_cache import file_hashes
+from mcserver.snapshots import SnapshotStore
+from mcserver.store import ObjectStore
+from server_packs import PACK_ROOT, make_server_pack
+
+
+def _quiet(_message: str) -> None:
+    pass
+
+
+@pytest.fixture(scope="module")
+def packs(tmp_path_factory: pytest.TempPathFactory) -> Dict[int, Path]:
+    root = tmp_path_factory.mktemp("packs")
+    made = {}
+    for version in (1, 2):
+        path = root / f"v{version}.zip"
+        stats = make_server_pack(
+            path, entries=80, size_bytes=512 * 1024, version=version, changed=0.3, seed=7
+        )
+        assert version == 1 or stats["changed"], "v2 must differ from v1"
+        made[version] = path
+    return made
+
+
+def _managed(rel: str) -> bool:
+    top, sep, _rest = rel.partition("/")
+    return (sep and top in REPLACE_DIRS) or (not sep and rel.endswith((".jar", ".sh")))
+
+
+def _pack_files(zip_path: Path) -> Dict[str, bytes]:
+    """Update-managed files of a pack, as they should be on disk."""
+    with zipfile.ZipFile(zip_path) as zf:
+        return {
+            info.filename[len(PACK_ROOT) :]: zf.read(info)
+            for info in zf.infolist()
+            if not info.is_dir() and _managed(info.filename[len(PACK_ROOT) :])
+        }
+
+
+def _server_files(server_dir: Path) -> Dict[str, bytes]:
+    found = {}
+    for path in server_dir.rglob("*"):
+        rel = path.relative_to(server_dir).as_posix()
+        if path.is_file() and _managed(rel):
+            found[rel] = path.read_bytes()
+    return found
+
+
+def _apply(server_dir: Path, zip_path: Path, file_id: int, **kwargs) -> None:
+    apply_server_pack(
+        server_dir,
+        zip_path,
+        pack_id=1,
+        server_file_id=file_id,
+        display_name=f"Pack {file_id}",
+        saved_state=None,
+        log=_quiet,
+        **kwargs,
+    )
+
+
+def _install(server_dir: Path, zip_path: Path, **kwargs) -> None:
+    _apply(server_dir, zip_path, 101, **kwargs)
+    # What the server writes on first start; it marks the dir for update mode.
+    (server_dir / "server.properties").write_text("motd=test\n", encoding="utf-8")
+    (server_dir / "world").mkdir()
+    (server_dir / "world" / "level.dat").write_bytes(b"world")
+
+
+def test_update_then_rollback(tmp_path: Path, packs: Dict[int, Path]) -> None:
+    server = tmp_path / "server"
+    _install(server, packs[1])
+    assert _server_files(server) == _pack_files(packs[1])
+
+    _apply(server, packs[2], 102)
+    assert _server_files(server) == _pack_files(packs[2])
+    assert Manifest.load(server).file_id == 102
+    assert (server / "world" / "level.dat").read_bytes() == b"world"
+    assert (server / "server.properties").exists()
+
+    snapshots = SnapshotStore(server)
+    [snap] = snapshots.list()
+    with staging_dir(server) as staging:
+        snapshots.restore(snap, staging)
+    assert _server_files(server) == _pack_files(packs[1])
+    assert Manifest.load(server).file_id == 101
+    assert snapshots.list() == []
+    assert (server / "world" / "level.dat").read_bytes() == b"world"
+
+
+def test_interrupted_swap_leaves_server_as_it_was(
+    tmp_path: Path, packs: Dict[int, Path], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    server = tmp_path / "server"
+    _install(server, packs[1])
+    before = _server_files(server)
+
+    real_rename = os.rename
+    swapped_in = []
+
+    def failing_rename(src, dst) -> None:
+        # Fail the second staged tree renamed into the server.
+        staged = Path(src).parent.parent.name == STAGING_DIRNAME
+        if staged and Path(dst).parent == server:
+            swapped_in.append(Path(dst).name)
+            if len(swapped_in) == 2:
+                raise OSError("simulated failure mid-swap")
+        real_rename(src, dst)
+
+    monkeypatch.setattr(os, "rename", failing_rename)
+    with pytest.raises(OSError, match="mid-swap"):
+        _apply(server, packs[2], 102)
+    monkeypatch.undo()
+
+    assert len(swapped_in) == 2
+    assert _server_files(server) == before
+    assert Manifest.load(server).file_id == 101
+    assert SnapshotStore(server).list() == []
+
+    # Nothing is left half-done: the same update then goes through.
+    _apply(server, packs[2], 102)
+    assert _server_files(server) == _pack_files(packs[2])
+
+
+def test_store_backed_update(tmp_path: Path, packs: Dict[int, Path]) -> None:
+    store_root = tmp_path / "store"
+    sha1 = {v: file_hashes(p)["sha1"] for v, p in packs.items()}
+    a, b = tmp_path / "a", tmp_path / "b"
+
+    first = ObjectStore(store_root)
+    _install(a, packs[1], store=first, pack_sha1=sha1[1])
+    second = ObjectStore(store_root)
+    _install(b, packs[1], store=second, pack_sha1=sha1[1])
+    assert first.added > 0
+    assert second.added == 0  # every stored member found through the index
+    assert second.linked == first.linked
+
+    jar = next((a / "mods").iterdir()).relative_to(a)
+    assert (a / jar).stat().st_ino == (b / jar).stat().st_ino
+    assert not (a / jar).stat().st_mode & stat.S_IWUSR
+    cfg = next(p for p in (a / "config").rglob("*") if p.is_file()).relative_to(a)
+    assert (a / cfg).stat().st_ino != (b / cfg).stat().st_ino  # configs stay private
+
+    _apply(a, packs[2], 102, store=ObjectStore(store_root), pack_sha1=sha1[2])
+    assert _server_files(a) == _pack_files(packs[2])
+    assert _server_files(b) == _pack_files(packs[1])
+
+    snapshots = SnapshotStore(a)
+    with staging_dir(a) as staging:
+        snapshots.restore(snapshots.list()[0], staging)
+    assert _server_files(a) == _pack_files(packs[1])
+
+
+def test_store_ignores_index_of_another_pack(tmp_path: Path, packs: Dict[int, Path]) -> None:
+    # Without the pack's verified sha1 nothing indexed for other packs is
+    # trusted: every member is inflated and hashed again.
+    store_root = tmp_path / "store"
+    _install(tmp_path / "a", packs[1], store=ObjectStore(store_root), pack_sha1="0" * 40)
+    again = ObjectStore(store_root)
+    _install(tmp_path / "b", packs[1], store=again)
+    assert again.added == 0  # same content, so the objects are shared anyway
+    assert again.linked > 0
+    assert [p.name for p in (store_root / "index").iterdir()] == ["0" * 40]
+    assert _server_files(tmp_path / "b") == _pack_files(packs[1])